@@ -1,20 +1,27 @@
 """API routes for NYVO Insurance Advisor Chatbot"""
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
-import json
+from typing import Dict, Iterable, Iterator, List
 
 from app.models import get_db, UserProfile
-from app.services import vector_store, content_ingestion
+from app.services import (
+    vector_store, content_ingestion, response_cache, policy_catalog, policy_responses,
+    turn_plans, chat_history
+)
+from app.services.policy_response_cache import EncodedResponse, etag_matches
+from app.utils.fast_json import SSE_DONE, dumps, trusted_response
+from app.api.sse import sse_shaper
 from app.services.chatbot import ChatbotService
 from app.services.recommendation_engine import RecommendationEngine
 from app.api.schemas import (
     ChatRequest, ChatResponse,
     HealthInsuranceRequest, TermInsuranceRequest, RecommendationResponse,
+    HealthInsuranceBatchRequest, TermInsuranceBatchRequest,
     PolicyDetailRequest, PolicyCompareRequest,
     UserProfileCreate, UserProfileResponse,
-    IngestionResponse, ContentStatsResponse
+    IngestionResponse, ContentStatsResponse, ResponseCacheStatsResponse
 )
 
 router = APIRouter()
@@ -39,7 +46,7 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         for msg in (request.conversation_history or [])
     ]
     
-    result = chatbot.chat(
+    result = await chatbot.chat(
         user_message=request.message,
         session_id=request.session_id,
         conversation_history=conversation_history
@@ -50,15 +57,24 @@ async def chat(request: ChatRequest, db: Session = Depends(get_db)):
         session_id=request.session_id,
         intent=result["intent"],
         recommendations=result["recommendations"],
-        context_used=result["context_used"]
+        context_used=result["context_used"],
+        cached=result["cached"],
+        timings=result.get("timings")
     )
 
 
 @router.post("/chat/stream")
-async def chat_stream(request: ChatRequest, db: Session = Depends(get_db)):
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    db: Session = Depends(get_db)
+):
     """
     Streaming chat endpoint for real-time responses.
     Returns Server-Sent Events (SSE) for progressive display.
+    
+    Tokens are coalesced into frames, `: ping` comments are sent while idle,
+    and the LLM request is aborted if the client disconnects.
     """
     chatbot = ChatbotService(db)
     
@@ -68,24 +84,38 @@ async def chat_stream(request: ChatRequest, db: Session = Depends(get_db)):
     ]
     
     async def generate():
-        async for chunk in chatbot.chat_stream(
+        upstream = chatbot.chat_stream(
             user_message=request.message,
             session_id=request.session_id,
             conversation_history=conversation_history
-        ):
-            yield f"data: {json.dumps({'content': chunk})}\n\n"
-        yield "data: [DONE]\n\n"
+        )
+        async for frame in sse_shaper.stream(upstream, http_request):
+            yield frame
+        yield SSE_DONE
     
     return StreamingResponse(
         generate(),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive"
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
         }
     )
 
 
+@router.get("/chat/cache/stats", response_model=ResponseCacheStatsResponse)
+async def get_response_cache_stats():
+    """Get hit/miss statistics for the chat response cache."""
+    return response_cache.get_stats()
+
+
+@router.get("/chat/history/stats")
+async def get_chat_history_stats():
+    """Get queue depth and batch statistics for chat history persistence."""
+    return chat_history.get_stats()
+
+
 # ============== Recommendation Endpoints ==============
 
 @router.post("/recommend/health", response_model=RecommendationResponse)
@@ -115,9 +145,9 @@ async def get_health_recommendations(
         city=request.city
     )
     
-    return RecommendationResponse(
-        recommendations=recommendations,
-        total_count=len(recommendations)
+    return trusted_response(
+        {"recommendations": recommendations, "total_count": len(recommendations)},
+        RecommendationResponse
     )
 
 
@@ -148,39 +178,158 @@ async def get_term_recommendations(
         budget_monthly=request.budget_monthly
     )
     
-    return RecommendationResponse(
-        recommendations=recommendations,
-        total_count=len(recommendations)
+    return trusted_response(
+        {"recommendations": recommendations, "total_count": len(recommendations)},
+        RecommendationResponse
+    )
+
+
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+
+def _ndjson_results(results: Iterable[List[Dict]]) -> Iterator[bytes]:
+    """Serialize per-lead results as NDJSON, sent in ~64KB chunks"""
+    buffer = []
+    size = 0
+    for index, recommendations in enumerate(results):
+        line = dumps({
+            "index": index,
+            "recommendations": recommendations,
+            "total_count": len(recommendations)
+        }) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+@router.post("/recommend/health/batch")
+async def get_health_recommendations_batch(
+    request: HealthInsuranceBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Health insurance recommendations for many leads in one call.
+    
+    Streams one NDJSON line per lead, in request order:
+    `{"index": 0, "recommendations": [...], "total_count": 5}`
+    """
+    engine = RecommendationEngine(db)
+    results = engine.batch_health_insurance_recommendations(
+        (lead.model_dump() for lead in request.requests),
+        limit=request.limit
+    )
+    return StreamingResponse(_ndjson_results(results), media_type="application/x-ndjson")
+
+
+@router.post("/recommend/term/batch")
+async def get_term_recommendations_batch(
+    request: TermInsuranceBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Term insurance recommendations for many leads in one call.
+    
+    Streams one NDJSON line per lead, in request order.
+    """
+    engine = RecommendationEngine(db)
+    results = engine.batch_term_insurance_recommendations(
+        (lead.model_dump() for lead in request.requests),
+        limit=request.limit
     )
+    return StreamingResponse(_ndjson_results(results), media_type="application/x-ndjson")
 
 
 # ============== Policy Endpoints ==============
 
+def _policy_version(policy_ids: List[int]):
+    """updated_at of each policy in the catalog snapshot, or None if any is unknown"""
+    by_id = policy_catalog.snapshot.by_id
+    records = [by_id.get(policy_id) for policy_id in policy_ids]
+    if any(record is None or record.updated_at is None for record in records):
+        return None
+    return tuple(record.updated_at for record in records)
+
+
+def _conditional_response(encoded: EncodedResponse, request: Request) -> Response:
+    """200 with the cached body, or 304 if the client already has it"""
+    headers = {"ETag": encoded.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
+
+
 @router.get("/policy/{policy_id}")
-async def get_policy_details(policy_id: int, db: Session = Depends(get_db)):
-    """Get detailed information about a specific policy."""
+async def get_policy_details(policy_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Get detailed information about a specific policy.
+    
+    Responses carry an ETag; send it back as If-None-Match to get a 304.
+    Edits made through this process show up immediately. Edits made
+    elsewhere (another worker, a script, direct SQL) can be served stale
+    until the catalog poller picks them up, i.e. for up to
+    CATALOG_REFRESH_INTERVAL_SECONDS (60s by default), or until
+    POST /catalog/refresh is called.
+    """
     engine = RecommendationEngine(db)
-    details = engine.get_policy_details(policy_id)
+    encoded = policy_responses.get_or_build(
+        ("detail", policy_id),
+        _policy_version([policy_id]),
+        lambda: engine.get_policy_details(policy_id)
+    )
     
-    if not details:
+    if encoded is None:
         raise HTTPException(status_code=404, detail="Policy not found")
     
-    return details
+    return _conditional_response(encoded, request)
 
 
 @router.post("/policy/compare")
 async def compare_policies(
     request: PolicyCompareRequest,
+    http_request: Request,
     db: Session = Depends(get_db)
 ):
     """Compare multiple policies side by side."""
     engine = RecommendationEngine(db)
-    comparison = engine.compare_policies(request.policy_ids)
     
-    if not comparison:
+    def build():
+        comparison = engine.compare_policies(request.policy_ids)
+        if not comparison:
+            return None
+        return {"policies": comparison, "count": len(comparison)}
+    
+    encoded = policy_responses.get_or_build(
+        ("compare", tuple(request.policy_ids)),
+        _policy_version(request.policy_ids),
+        build
+    )
+    
+    if encoded is None:
         raise HTTPException(status_code=404, detail="No policies found")
     
-    return {"policies": comparison, "count": len(comparison)}
+    return _conditional_response(encoded, http_request)
+
+
+@router.get("/catalog/stats")
+async def get_catalog_stats():
+    """Get version and size of the in-memory policy catalog and its response cache."""
+    return {
+        **policy_catalog.snapshot.get_stats(),
+        "response_cache": policy_responses.get_stats()
+    }
+
+
+@router.post("/catalog/refresh")
+async def refresh_catalog():
+    """Reload the policy catalog after policies were edited in the database."""
+    catalog = await run_in_threadpool(policy_catalog.refresh)
+    policy_responses.clear()
+    return catalog.get_stats()
 
 
 # ============== User Profile Endpoints ==============
@@ -229,9 +378,19 @@ async def get_profile(session_id: str, db: Session = Depends(get_db)):
 async def ingest_content():
     """
     Ingest NYVO content library into vector store.
-    Call this after adding new content files.
+    Call this after adding, editing or removing content files; only
+    changed files are re-indexed. Returns 409 while another ingest is running.
+    
+    Chunks are identified by their content, so an edited file is counted in
+    files_updated and its edits show up as chunks_added plus chunks_removed
+    (there is no per-chunk "updated" count).
     """
-    result = content_ingestion.ingest_content_library()
+    result = await run_in_threadpool(content_ingestion.ingest_content_library)
+    if result["status"] == "busy":
+        raise HTTPException(status_code=409, detail=result["message"])
+    
+    response_cache.clear()
+    turn_plans.clear()
     
     if result["status"] == "error":
         raise HTTPException(status_code=400, detail=result["message"])
@@ -247,9 +406,14 @@ async def get_content_stats():
 
 @router.delete("/content/clear")
 async def clear_content():
-    """Clear all indexed content. Use with caution."""
-    vector_store.clear_collection()
-    return {"status": "success", "message": "Content cleared"}
+    """Clear all indexed content. Use with caution. Returns 409 while an ingest is running."""
+    result = await run_in_threadpool(content_ingestion.clear_content_library)
+    if result["status"] == "busy":
+        raise HTTPException(status_code=409, detail=result["message"])
+    
+    response_cache.clear()
+    turn_plans.clear()
+    return result
 
 
 # ============== Health Check ==============
@@ -15,7 +15,8 @@ class ChatRequest(BaseModel):
     session_id: str = Field(..., description="Unique session identifier")
     conversation_history: Optional[List[ChatMessage]] = Field(
         default=[], 
-        description="Previous conversation messages"
+        description="Previous conversation messages. Optional: when omitted, the "
+                    "server continues the conversation from its own session memory"
     )
 
 
@@ -28,6 +29,11 @@ class ChatResponse(BaseModel):
         description="Policy recommendations if applicable"
     )
     context_used: bool = Field(default=False, description="Whether knowledge base was used")
+    cached: bool = Field(default=False, description="Whether the response was served from cache")
+    timings: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Per-stage durations in ms (intent, retrieval, memory, recommendations, pre_llm, llm)"
+    )
 
 
 # Recommendation Schemas
@@ -62,6 +68,10 @@ class PolicyRecommendation(BaseModel):
     coverage_range: Dict[str, float]
     base_premium: float
     premium_frequency: str
+    quoted_premium: Optional[float] = Field(
+        default=None,
+        description="Yearly premium quoted for this applicant's age, family, city and sum insured"
+    )
     key_features: List
     riders_available: List
     claim_settlement_ratio: Optional[float]
@@ -71,6 +81,19 @@ class PolicyRecommendation(BaseModel):
     description: Optional[str]
 
 
+MAX_BATCH_REQUESTS = 10000
+
+
+class HealthInsuranceBatchRequest(BaseModel):
+    requests: List[HealthInsuranceRequest] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+    limit: int = Field(default=5, ge=1, le=50, description="Recommendations per lead")
+
+
+class TermInsuranceBatchRequest(BaseModel):
+    requests: List[TermInsuranceRequest] = Field(..., min_length=1, max_length=MAX_BATCH_REQUESTS)
+    limit: int = Field(default=5, ge=1, le=50, description="Recommendations per lead")
+
+
 class RecommendationResponse(BaseModel):
     recommendations: List[PolicyRecommendation]
     total_count: int
@@ -122,8 +145,25 @@ class IngestionResponse(BaseModel):
     status: str
     files_processed: int
     chunks_created: int
+    files_unchanged: int = 0
+    files_updated: int = 0  # of files_processed, those that were indexed before
+    files_removed: int = 0
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    files_failed: int = 0
+    errors: List[Dict] = []  # {"source", "error"} per file that could not be read
 
 
 class ContentStatsResponse(BaseModel):
     name: str
     count: int
+    embedding_cache: Optional[Dict] = None
+
+
+class ResponseCacheStatsResponse(BaseModel):
+    size: int
+    max_entries: int
+    hits: int
+    semantic_hits: int
+    misses: int
+    hit_rate: float
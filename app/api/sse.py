@@ -0,0 +1,168 @@
+"""Shaping of the chat SSE stream: coalescing, backpressure, heartbeats"""
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from typing import AsyncIterator, List, Optional
+
+from starlette.requests import Request
+
+from app.core import settings
+from app.utils.fast_json import sse_content_frame
+
+logger = logging.getLogger(__name__)
+
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+_END = object()
+
+
+class SSEStreamShaper:
+    """
+    Turns a stream of text deltas into SSE frames for a client.
+    
+    A producer task reads the upstream deltas and coalesces them into one
+    frame per ``flush_interval`` or ``max_chunk_bytes``, whichever comes
+    first; the first delta is sent at once so time to first token is not
+    held back by the window. Frames go through a small bounded queue; while it is full (slow
+    client) the producer keeps merging deltas into the pending frame instead
+    of queueing more, and only stops reading upstream once that frame
+    reaches ``max_pending_bytes``. An idle stream gets heartbeat comments so
+    proxies keep the connection open. The client connection is checked
+    before every frame, and on disconnect (or when the response is torn
+    down) the upstream generator is closed immediately.
+    """
+    
+    def __init__(
+        self,
+        flush_interval: float = 0.05,
+        max_chunk_bytes: int = 512,
+        max_pending_bytes: int = 64 * 1024,
+        max_buffered_frames: int = 16,
+        heartbeat_interval: float = 15.0
+    ):
+        self.flush_interval = flush_interval
+        self.max_chunk_bytes = max_chunk_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self.max_buffered_frames = max_buffered_frames
+        self.heartbeat_interval = heartbeat_interval
+    
+    async def stream(
+        self,
+        source: AsyncIterator[str],
+        request: Optional[Request] = None
+    ) -> AsyncIterator[bytes]:
+        """Yield encoded SSE frames (content and heartbeats) for ``source``"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_buffered_frames)
+        producer = asyncio.create_task(self._produce(source, queue))
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    item = None
+                
+                if request is not None and await request.is_disconnected():
+                    logger.info("SSE client disconnected, stopping stream")
+                    return
+                if item is None:
+                    yield HEARTBEAT_FRAME
+                    continue
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield sse_content_frame(item)
+        finally:
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+    
+    async def _produce(self, source: AsyncIterator[str], queue: asyncio.Queue) -> None:
+        pending: List[str] = []
+        pending_bytes = 0
+        window_start = 0.0
+        sent_first = False
+        
+        async def flush(block: bool) -> None:
+            nonlocal pending_bytes, sent_first
+            if not pending:
+                return
+            text = "".join(pending)
+            if block:
+                await queue.put(text)
+            else:
+                try:
+                    queue.put_nowait(text)
+                except asyncio.QueueFull:
+                    return  # client is behind; keep coalescing
+            pending.clear()
+            pending_bytes = 0
+            sent_first = True
+        
+        iterator = source.__aiter__()
+        next_delta: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if next_delta is None:
+                    next_delta = asyncio.ensure_future(iterator.__anext__())
+                
+                timeout = None
+                if pending:
+                    timeout = max(window_start + self.flush_interval - time.monotonic(), 0)
+                done, _ = await asyncio.wait({next_delta}, timeout=timeout)
+                
+                if not done:
+                    # Window elapsed with no new delta: send what we have
+                    await flush(block=False)
+                    if pending:
+                        window_start = time.monotonic()
+                    continue
+                
+                try:
+                    text = next_delta.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    next_delta = None
+                
+                if not text:
+                    continue
+                if not pending:
+                    window_start = time.monotonic()
+                pending.append(text)
+                pending_bytes += len(text.encode("utf-8"))
+                
+                if pending_bytes >= self.max_pending_bytes:
+                    await flush(block=True)
+                elif pending_bytes >= self.max_chunk_bytes or not sent_first:
+                    await flush(block=False)
+            
+            await flush(block=True)
+            await queue.put(_END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Upstream stream failed: {e}")
+            await queue.put(e)
+        finally:
+            # Stop the upstream (and the LLM request behind it) right away
+            if next_delta is not None and not next_delta.done():
+                next_delta.cancel()
+                with suppress(BaseException):
+                    await next_delta
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                with suppress(Exception):
+                    await aclose()
+
+
+# Singleton instance
+sse_shaper = SSEStreamShaper(
+    flush_interval=settings.stream_flush_interval_ms / 1000,
+    max_chunk_bytes=settings.stream_max_chunk_bytes,
+    max_pending_bytes=settings.stream_max_pending_bytes,
+    max_buffered_frames=settings.stream_max_buffered_frames,
+    heartbeat_interval=settings.stream_heartbeat_seconds
+)
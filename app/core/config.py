@@ -11,13 +11,88 @@ class Settings(BaseSettings):
     openai_api_key: str
     openai_model: str = "gpt-3.5-turbo"
     openai_embedding_model: str = "text-embedding-3-small"
+    openai_max_tokens: int = 1500  # max tokens in a chat reply
+    
+    # OpenAI HTTP connection pool
+    openai_timeout: float = 60.0
+    openai_connect_timeout: float = 10.0
+    openai_max_retries: int = 2
+    openai_max_connections: int = 100
+    openai_max_keepalive_connections: int = 20
+    openai_keepalive_expiry: float = 30.0
+    openai_http2: bool = True
     
     # Database
     database_url: str = "sqlite:///./data/nyvo.db"
+    database_echo: bool = False  # log every SQL statement
+    
+    # SQLite profile (applied to each connection when DATABASE_URL is sqlite)
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kb: int = 65536
+    sqlite_mmap_size_mb: int = 256
+    sqlite_pool_size: int = 10
+    sqlite_max_overflow: int = 20
+    
+    # Server database profile (Postgres etc.) connection pool
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
     
     # Vector Database
     chroma_persist_dir: str = "./data/chroma_db"
     
+    # Query embedding cache
+    embedding_cache_max_entries: int = 2048
+    embedding_cache_persist: bool = False
+    embedding_cache_path: str = "./data/embedding_cache.sqlite3"
+    
+    # Prompt token budget (0 = model context window minus the reply)
+    prompt_max_tokens: int = 6000
+    prompt_max_history_messages: int = 20
+    prompt_history_share: float = 0.5
+    prompt_summary_tokens: int = 200
+    
+    # Server-side conversation memory
+    memory_enabled: bool = True
+    memory_max_sessions: int = 1000
+    memory_max_turns: int = 10
+    memory_summary_items: int = 10
+    memory_ttl_seconds: float = 1800
+    
+    # Response cache
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_seconds: float = 3600
+    response_cache_similarity_threshold: float = 0.95
+    
+    # Chat history write-behind (false = insert each turn on the request path)
+    chat_history_write_behind: bool = True
+    chat_history_batch_size: int = 200
+    chat_history_flush_interval_ms: float = 200
+    chat_history_max_pending: int = 10000
+    
+    # Unfinished turn plans kept for retries (0 entries disables)
+    turn_plan_cache_max_entries: int = 1000
+    turn_plan_cache_ttl_seconds: float = 120
+    
+    # Policy catalog snapshot (0 disables background change polling)
+    catalog_refresh_interval_seconds: float = 60
+    policy_response_cache_max_entries: int = 2000
+    
+    # Chat SSE stream shaping
+    stream_flush_interval_ms: float = 50
+    stream_max_chunk_bytes: int = 512
+    stream_max_pending_bytes: int = 65536
+    stream_max_buffered_frames: int = 16
+    stream_heartbeat_seconds: float = 15
+    
+    # Serialization (orjson-backed responses, needs the orjson package)
+    fast_json_enabled: bool = False
+    
     # Application
     app_name: str = "NYVO Insurance Advisor"
     app_env: str = "development"
@@ -26,6 +101,19 @@ class Settings(BaseSettings):
     
     # Content Library
     nyvo_content_path: str = "./nyvo-content"
+    ingestion_manifest_path: str = "./data/ingestion_manifest.json"
+    ingestion_extract_workers: int = 0  # 0 = one per CPU core
+    ingestion_embed_workers: int = 4
+    ingestion_batch_size: int = 100
+    ingestion_max_pending_batches: int = 8
+    ingestion_max_buffer_mb: int = 64  # ceiling on extracted/chunk text in flight
+    ingestion_checkpoint_batches: int = 10  # save manifest every N committed writes
+    
+    # Chunking (token counts use tiktoken)
+    chunk_max_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    chunk_min_tokens: int = 32
+    chunk_encoding: str = "cl100k_base"
     
     # API
     api_host: str = "0.0.0.0"
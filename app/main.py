@@ -3,12 +3,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 
 from app.core import settings
 from app.models import init_db
 from app.api import router
+from app.services import llm_clients, policy_catalog, chat_history
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +20,16 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _poll_policy_catalog(interval: float):
+    """Reload the policy catalog whenever the policy tables change"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(policy_catalog.refresh_if_changed)
+        except Exception as e:
+            logger.warning(f"Policy catalog refresh failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown events"""
@@ -25,11 +37,26 @@ async def lifespan(app: FastAPI):
     logger.info("Starting NYVO Insurance Advisor Chatbot...")
     init_db()
     logger.info("Database initialized")
+    try:
+        policy_catalog.refresh()
+    except Exception as e:
+        logger.warning(f"Policy catalog not loaded at startup: {e}")
+    catalog_poller = None
+    if settings.catalog_refresh_interval_seconds > 0:
+        catalog_poller = asyncio.create_task(
+            _poll_policy_catalog(settings.catalog_refresh_interval_seconds)
+        )
+    llm_clients.startup()
+    chat_history.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down NYVO Insurance Advisor Chatbot...")
+    if catalog_poller:
+        catalog_poller.cancel()
+    await chat_history.stop()
+    await llm_clients.shutdown()
 
 
 # Create FastAPI app
@@ -1,27 +1,15 @@
 """Database models for NYVO Insurance products and policies"""
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Text, JSON, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, JSON, ForeignKey, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import enum
-import os
-from pathlib import Path
 
 from app.core import settings
+from app.models.db_profile import create_configured_engine
 
-# Ensure data directory exists for SQLite
-if "sqlite" in settings.database_url:
-    db_path = settings.database_url.replace("sqlite:///", "")
-    db_dir = os.path.dirname(db_path)
-    if db_dir:
-        Path(db_dir).mkdir(parents=True, exist_ok=True)
-
-# Database setup
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+# Database setup (pragmas and pooling per backend, see db_profile)
+engine = create_configured_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -105,6 +93,19 @@ class InsurancePolicy(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     provider = relationship("InsuranceProvider", back_populates="policies")
+    
+    __table_args__ = (
+        # Eligibility lookups: type + active, then age band, then cover
+        Index(
+            "ix_insurance_policies_eligibility",
+            "insurance_type", "is_active", "min_age", "max_age", "max_coverage"
+        ),
+        Index(
+            "ix_insurance_policies_type_coverage",
+            "insurance_type", "is_active", "max_coverage"
+        ),
+        Index("ix_insurance_policies_provider_id", "provider_id"),
+    )
 
 
 class UserProfile(Base):
@@ -158,6 +159,10 @@ class ChatSession(Base):
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add indexes introduced later
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def get_db():
@@ -0,0 +1,107 @@
+"""Engine setup per database backend: SQLite pragmas and connection pooling"""
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import StaticPool
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def _is_sqlite_memory(database_url: str) -> bool:
+    database = make_url(database_url).database
+    return not database or database == ":memory:"
+
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """PRAGMAs applied to every new SQLite connection, from settings"""
+    return {
+        # WAL lets readers proceed while a writer holds the lock
+        "journal_mode": settings.sqlite_journal_mode,
+        # NORMAL is durable across app crashes in WAL mode, only the last
+        # transactions can be lost on power failure
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        # Negative cache_size is in KiB
+        "cache_size": -settings.sqlite_cache_size_kb,
+        "mmap_size": settings.sqlite_mmap_size_mb * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+
+def engine_options(database_url: str) -> Dict[str, Any]:
+    """create_engine keyword arguments for the backend of ``database_url``"""
+    options: Dict[str, Any] = {"echo": settings.database_echo}
+    if is_sqlite(database_url):
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        }
+        if _is_sqlite_memory(database_url):
+            # One shared connection, or every checkout sees an empty database
+            options["poolclass"] = StaticPool
+        else:
+            # File connections are cheap; keep enough for the worker threads
+            options["pool_size"] = settings.sqlite_pool_size
+            options["max_overflow"] = settings.sqlite_max_overflow
+    else:
+        options.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+    return options
+
+
+def install_sqlite_pragmas(engine: Engine) -> None:
+    """Apply sqlite_pragmas() on every new connection of ``engine``"""
+    pragmas = sqlite_pragmas()
+    
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_configured_engine(database_url: str) -> Engine:
+    """Engine for ``database_url`` with the matching backend profile"""
+    if is_sqlite(database_url) and not _is_sqlite_memory(database_url):
+        # Ensure data directory exists for SQLite
+        db_dir = os.path.dirname(make_url(database_url).database)
+        if db_dir:
+            Path(db_dir).mkdir(parents=True, exist_ok=True)
+    
+    engine = create_engine(database_url, **engine_options(database_url))
+    if is_sqlite(database_url):
+        install_sqlite_pragmas(engine)
+    return engine
+
+
+def get_profile_stats(engine: Engine) -> Dict[str, Any]:
+    """Backend, pool state and (for SQLite) the pragmas actually in effect"""
+    stats: Dict[str, Any] = {
+        "backend": engine.url.get_backend_name(),
+        "pool": engine.pool.status(),
+    }
+    if engine.url.get_backend_name() == "sqlite":
+        with engine.connect() as connection:
+            stats["pragmas"] = {
+                name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+            }
+    return stats
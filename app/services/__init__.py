@@ -1,9 +1,27 @@
 from .vector_store import vector_store, content_ingestion, VectorStoreService, ContentIngestionService
+from .policy_catalog import policy_catalog, PolicyCatalogService
+from .policy_response_cache import policy_responses, PolicyResponseCache
 from .recommendation_engine import RecommendationEngine
+from .llm_client import llm_clients, LLMClientRegistry
+from .response_cache import response_cache, SemanticResponseCache
+from .conversation_memory import conversation_memory, ConversationMemoryStore
+from .intent_classifier import intent_classifier, IntentClassifier
+from .user_details import user_detail_extractor, UserDetailExtractor
+from .chat_history import chat_history, ChatHistoryWriter
+from .turn_plan import turn_plans, TurnPlanCache
 from .chatbot import ChatbotService
 
 __all__ = [
     "vector_store", "content_ingestion", 
     "VectorStoreService", "ContentIngestionService",
-    "RecommendationEngine", "ChatbotService"
+    "RecommendationEngine", "ChatbotService",
+    "policy_catalog", "PolicyCatalogService",
+    "policy_responses", "PolicyResponseCache",
+    "llm_clients", "LLMClientRegistry",
+    "response_cache", "SemanticResponseCache",
+    "conversation_memory", "ConversationMemoryStore",
+    "intent_classifier", "IntentClassifier",
+    "user_detail_extractor", "UserDetailExtractor",
+    "turn_plans", "TurnPlanCache",
+    "chat_history", "ChatHistoryWriter"
 ]
@@ -0,0 +1,212 @@
+"""Write-behind persistence of chat turns in batched transactions"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.core import settings
+from app.models import ChatSession, SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """
+    Queues chat turns and inserts them in the background.
+    
+    The chat path only enqueues a row (``created_at`` is stamped then, so
+    ordering reflects the turn, not the flush). A writer task collects rows
+    for up to ``flush_interval`` seconds or ``batch_size`` rows and inserts
+    them in one transaction from a worker thread, so commits (and SQLite's
+    write lock and fsync) are shared by many turns and never sit on the
+    request path. The queue is bounded: when the database falls
+    ``max_pending`` rows behind, submitters wait. Until ``start`` (or after
+    ``stop``) rows are written synchronously. Rows not yet committed can be
+    read back per session with ``pending_turns``.
+    """
+    
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 0.2,
+        max_pending: int = 10000,
+        enabled: bool = True
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enabled = enabled
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[Dict]] = defaultdict(list)
+        self._pending_lock = threading.Lock()
+        self.written = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.last_batch_ms = 0.0
+    
+    def start(self) -> None:
+        """Start the writer task (call from the running event loop)"""
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Chat history writer started")
+    
+    async def stop(self) -> None:
+        """Flush everything queued and stop the writer task"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(_STOP)
+        await task
+        # Rows that raced in behind the stop marker
+        leftovers = self._drain(self._queue.qsize())
+        if leftovers:
+            await asyncio.to_thread(self._write, leftovers)
+        logger.info(f"Chat history writer stopped ({self.written} rows written)")
+    
+    async def submit(self, row: Dict) -> None:
+        """Queue one ChatSession row (column -> value)"""
+        row.setdefault("created_at", datetime.utcnow())
+        if self._task is None:
+            await asyncio.to_thread(self._write, [row])
+            return
+        with self._pending_lock:
+            self._pending[row["session_id"]].append(row)
+        await self._queue.put(row)
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+    
+    def pending_turns(self, session_id: str) -> List[Dict]:
+        """Queued or in-flight rows for a session, oldest first"""
+        with self._pending_lock:
+            return list(self._pending.get(session_id, ()))
+    
+    def _release(self, rows: List[Dict]) -> None:
+        with self._pending_lock:
+            for row in rows:
+                pending = self._pending.get(row["session_id"])
+                if not pending:
+                    continue
+                pending[:] = [r for r in pending if r is not row]
+                if not pending:
+                    del self._pending[row["session_id"]]
+    
+    def _drain(self, limit: int) -> List[Dict]:
+        rows = []
+        while len(rows) < limit:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is not _STOP:
+                rows.append(item)
+        return rows
+    
+    def _drop(self, rows: List[Dict], error: Exception) -> None:
+        self.dropped += len(rows)
+        self._release(rows)
+        logger.exception(f"Chat history writer error, dropped {len(rows)} chat turns: {error}")
+    
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Dict] = []
+            try:
+                item = await self._queue.get()
+                stopping = item is _STOP
+                if not stopping:
+                    batch.append(item)
+                
+                if not stopping and self._queue.qsize() < self.batch_size - 1:
+                    # Let more turns arrive so they share the transaction
+                    await asyncio.sleep(self.flush_interval)
+                while len(batch) < self.batch_size and not stopping:
+                    try:
+                        item = self._queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                
+                if batch:
+                    await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                # Keep the writer alive for the turns still to come
+                self._drop(batch, e)
+        
+        # Flush whatever is still queued in full batches, then exit
+        while True:
+            rest = self._drain(self.batch_size)
+            if not rest:
+                return
+            try:
+                await asyncio.to_thread(self._write, rest)
+            except Exception as e:
+                self._drop(rest, e)
+    
+    def _insert(self, rows: List[Dict]) -> bool:
+        db = SessionLocal()
+        try:
+            db.execute(insert(ChatSession), rows)
+            db.commit()
+            self.written += len(rows)
+            return True
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to save {len(rows)} chat turns: {e}")
+            return False
+        finally:
+            db.close()
+    
+    def _write(self, rows: List[Dict]) -> None:
+        start = time.perf_counter()
+        try:
+            self.batches += 1
+            if self._insert(rows):
+                return
+            # One bad row (or a transient error) fails the whole transaction:
+            # retry row by row so only the rows that fail again are dropped
+            self.failed_batches += 1
+            for row in rows:
+                if not self._insert([row]):
+                    self.dropped += 1
+        finally:
+            self._release(rows)
+            self.last_batch_ms = round((time.perf_counter() - start) * 1000, 2)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "avg_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "last_batch_ms": self.last_batch_ms
+        }
+
+
+# Singleton instance
+chat_history = ChatHistoryWriter(
+    batch_size=settings.chat_history_batch_size,
+    flush_interval=settings.chat_history_flush_interval_ms / 1000,
+    max_pending=settings.chat_history_max_pending,
+    enabled=settings.chat_history_write_behind
+)
@@ -1,13 +1,27 @@
 """Main chatbot service with OpenAI integration and RAG"""
+import asyncio
 import json
-from typing import List, Dict, Optional, AsyncGenerator
-from openai import OpenAI
+import logging
+import time
+from dataclasses import replace
+from types import MappingProxyType
+from typing import Any, Awaitable, List, Dict, Optional, AsyncGenerator, Tuple
 from sqlalchemy.orm import Session
 
 from app.core import settings
 from app.services.vector_store import vector_store
+from app.services.llm_client import llm_clients
+from app.services.response_cache import response_cache, context_fingerprint
+from app.services.prompt_builder import PromptBuilder
+from app.services.conversation_memory import conversation_memory, SessionMemory
 from app.services.recommendation_engine import RecommendationEngine
-from app.models import ChatSession, UserProfile
+from app.services.intent_classifier import intent_classifier
+from app.services.user_details import user_detail_extractor, DEFAULT_USER_DETAILS
+from app.services.turn_plan import TurnPlan, turn_plans, history_key
+from app.services.chat_history import chat_history
+from app.models import UserProfile
+
+logger = logging.getLogger(__name__)
 
 
 SYSTEM_PROMPT = """You are NYVO's AI Insurance Advisor, a knowledgeable and friendly assistant helping customers in India understand and purchase insurance products.
@@ -64,21 +78,39 @@ You have access to NYVO's content library for educational information and a data
 
 Current date context: Prices and policies are subject to change. Always recommend verifying current rates with NYVO."""
 
+# Shared by every request, so the system prompt is tokenized once per process
+prompt_builder = PromptBuilder(SYSTEM_PROMPT)
+
+
+async def _timed(timings: Dict[str, float], stage: str, awaitable: Awaitable) -> Any:
+    """Await ``awaitable`` and record its wall time in ms under ``stage``"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+
 
 class ChatbotService:
     """Main chatbot service orchestrating RAG and recommendations"""
     
     def __init__(self, db: Session):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self.client = llm_clients.get_client()
         self.db = db
         self.recommendation_engine = RecommendationEngine(db)
+        self.prompt_builder = prompt_builder
     
-    def _get_relevant_context(self, query: str, n_results: int = 5) -> str:
-        """Retrieve relevant context from vector store"""
-        results = vector_store.search(query, n_results=n_results)
+    def _get_relevant_context(
+        self,
+        query: str,
+        n_results: int = 5,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[str]:
+        """Retrieve relevant context chunks from vector store, best match first"""
+        results = vector_store.search(query, n_results=n_results, query_embedding=query_embedding)
         
         if not results["documents"]:
-            return ""
+            return []
         
         context_parts = []
         for doc, meta in zip(results["documents"], results["metadatas"]):
@@ -86,220 +118,270 @@ class ChatbotService:
             category = meta.get("category", "general")
             context_parts.append(f"[Source: {source} | Category: {category}]\n{doc}")
         
-        return "\n\n---\n\n".join(context_parts)
+        return context_parts
     
     def _detect_intent(self, message: str) -> Dict:
         """Detect user intent from message"""
-        message_lower = message.lower()
-        
-        intent = {
-            "type": "general_query",
-            "insurance_type": None,
-            "needs_recommendation": False,
-            "needs_comparison": False,
-            "asking_about_policy": False
-        }
-        
-        # Detect insurance type
-        if any(word in message_lower for word in ["health", "medical", "hospitalization", "mediclaim"]):
-            intent["insurance_type"] = "health"
-        elif any(word in message_lower for word in ["term", "life", "death benefit"]):
-            intent["insurance_type"] = "term_life"
-        elif any(word in message_lower for word in ["car", "motor", "vehicle", "bike"]):
-            intent["insurance_type"] = "motor"
-        
-        # Detect if recommendation needed
-        if any(phrase in message_lower for phrase in [
-            "recommend", "suggest", "best policy", "which policy", 
-            "what should i buy", "help me choose", "find me", "looking for"
-        ]):
-            intent["needs_recommendation"] = True
-        
-        # Detect comparison intent
-        if any(word in message_lower for word in ["compare", "comparison", "versus", "vs", "difference between"]):
-            intent["needs_comparison"] = True
-        
-        # Detect policy-specific questions
-        if any(phrase in message_lower for phrase in [
-            "claim process", "how to claim", "documents required",
-            "exclusion", "waiting period", "premium", "coverage"
-        ]):
-            intent["asking_about_policy"] = True
-        
-        return intent
+        return intent_classifier.classify(message)
     
     def _extract_user_details(self, message: str, conversation_history: List[Dict]) -> Dict:
         """Extract user details from conversation for recommendations"""
-        # This would ideally use NER or a separate LLM call
-        # Simplified extraction for now
-        details = {
-            "age": None,
-            "coverage_needed": None,
-            "budget_monthly": None,
-            "family_size": 1,
-            "annual_income": None,
-            "smoker": False
-        }
-        
-        # Simple pattern matching (production would use NER)
-        import re
-        
-        all_text = message + " " + " ".join([m.get("content", "") for m in conversation_history])
-        
-        # Age extraction
-        age_match = re.search(r'(\d{2})\s*(?:years?|yrs?)?\s*old|age[:\s]+(\d{2})', all_text.lower())
-        if age_match:
-            details["age"] = int(age_match.group(1) or age_match.group(2))
-        
-        # Coverage extraction (in lakhs)
-        coverage_match = re.search(r'(\d+)\s*(?:lakhs?|lacs?|L)\s*(?:coverage|cover|sum assured)?', all_text, re.IGNORECASE)
-        if coverage_match:
-            details["coverage_needed"] = float(coverage_match.group(1)) * 100000
-        
-        # Budget extraction
-        budget_match = re.search(r'budget[:\s]+(?:₹|rs\.?|inr)?\s*(\d+[,\d]*)', all_text, re.IGNORECASE)
-        if budget_match:
-            details["budget_monthly"] = float(budget_match.group(1).replace(",", ""))
+        # Only what the user said: assistant replies quote example ages and
+        # amounts, which would otherwise override the user's own details
+        texts = [m.get("content", "") for m in conversation_history if m.get("role") == "user"]
+        texts.append(message)
+        return user_detail_extractor.extract(texts)
+    
+    def _remember_user_details(self, memory: SessionMemory, user_message: str) -> None:
+        """Fold details from the new message into the session's cached details"""
+        if not memory.details_initialized:
+            earlier = list(memory.earlier_questions) + [
+                m["content"] for m in memory.messages if m["role"] == "user"
+            ]
+            user_detail_extractor.merge(earlier, memory.user_details)
+            memory.details_initialized = True
+        memory.user_details.update(user_detail_extractor.parse(user_message))
+    
+    def _get_user_details(
+        self,
+        user_message: str,
+        conversation_history: List[Dict],
+        memory: Optional[SessionMemory]
+    ) -> Dict:
+        """User details from server-side memory, or by parsing client-sent history"""
+        if memory is None:
+            return self._extract_user_details(user_message, conversation_history)
+        return {**DEFAULT_USER_DETAILS, **memory.user_details}
+    
+    async def _load_memory(
+        self,
+        session_id: str,
+        user_message: str,
+        conversation_history: List[Dict]
+    ) -> Optional[SessionMemory]:
+        """Load server-side memory when the client didn't send its own history"""
+        if conversation_history or not settings.memory_enabled:
+            return None
+        memory = await asyncio.to_thread(conversation_memory.get, session_id, self.db)
+        self._remember_user_details(memory, user_message)
+        return memory
+    
+    def _retrieve_context(self, query: str, n_results: int = 5) -> Tuple[List[str], List[float]]:
+        """Embed the query once and use it for both retrieval and cache lookup"""
+        query_embedding = vector_store.embed_query(query)
+        return self._get_relevant_context(query, n_results, query_embedding), query_embedding
+    
+    async def _get_relevant_context_async(
+        self, query: str, n_results: int = 5
+    ) -> Tuple[List[str], List[float]]:
+        """Retrieve context without blocking the event loop (Chroma is sync)"""
+        return await asyncio.to_thread(self._retrieve_context, query, n_results)
+    
+    async def _load_memory_and_recommendations(
+        self,
+        session_id: str,
+        user_message: str,
+        conversation_history: List[Dict],
+        intent: Dict,
+        timings: Dict[str, float]
+    ) -> Tuple[Optional[SessionMemory], List[Dict], Optional[List[Dict]]]:
+        """Memory, then recommendations (they need the remembered details)"""
+        memory = await _timed(
+            timings, "memory", self._load_memory(session_id, user_message, conversation_history)
+        )
+        if memory is not None:
+            conversation_history = memory.history()
         
-        # Family size
-        family_match = re.search(r'family\s+(?:of\s+)?(\d+)|(\d+)\s*(?:members?|people)', all_text, re.IGNORECASE)
-        if family_match:
-            details["family_size"] = int(family_match.group(1) or family_match.group(2))
+        recommendations = None
+        if intent["needs_recommendation"] and intent["insurance_type"]:
+            user_details = self._get_user_details(user_message, conversation_history, memory)
+            recommendations = await _timed(
+                timings, "recommendations", self._get_recommendations(intent, user_details)
+            )
+        return memory, conversation_history, recommendations
+    
+    async def _plan_turn(
+        self,
+        user_message: str,
+        session_id: str,
+        conversation_history: List[Dict]
+    ) -> TurnPlan:
+        """
+        Everything up to the LLM call, shared by chat and chat_stream.
+        
+        Intent detection is a few string scans and decides what else runs, so
+        it goes first. Vector retrieval (embedding + Chroma) then runs
+        alongside memory loading and the recommendation query, and the turn
+        is ready once the slower of the two branches finishes. A plan left by
+        a failed attempt at the same turn is reused instead.
+        """
+        start = time.perf_counter()
+        history = history_key(conversation_history)
+        plan = turn_plans.get(session_id, user_message, history)
+        if plan is not None:
+            logger.debug(f"Reusing turn plan for session {session_id}")
+            # Report this attempt's (near-zero) planning time, not the original's
+            return replace(plan, timings=MappingProxyType({
+                "pre_llm": round((time.perf_counter() - start) * 1000, 2)
+            }))
+        
+        timings: Dict[str, float] = {}
         
-        # Income extraction (in lakhs per annum)
-        income_match = re.search(r'(?:income|salary|earn)[:\s]+(?:₹|rs\.?|inr)?\s*(\d+)\s*(?:lakhs?|lacs?|L)?\s*(?:per\s+(?:annum|year)|pa|p\.a\.)?', all_text, re.IGNORECASE)
-        if income_match:
-            income_val = float(income_match.group(1))
-            if income_val < 100:  # Likely in lakhs
-                details["annual_income"] = income_val * 100000
-            else:
-                details["annual_income"] = income_val
+        intent = self._detect_intent(user_message)
+        timings["intent"] = round((time.perf_counter() - start) * 1000, 2)
         
-        # Smoker status
-        if any(word in all_text.lower() for word in ["smoker", "smoking", "smoke", "tobacco"]):
-            if "non-smoker" in all_text.lower() or "non smoker" in all_text.lower():
-                details["smoker"] = False
-            else:
-                details["smoker"] = True
+        (context, query_embedding), (memory, conversation_history, recommendations) = await asyncio.gather(
+            _timed(timings, "retrieval", self._get_relevant_context_async(user_message)),
+            self._load_memory_and_recommendations(
+                session_id, user_message, conversation_history, intent, timings
+            )
+        )
         
-        return details
+        # Answer repeated knowledge-base questions from the cache
+        cacheable = self._is_cacheable(intent, conversation_history)
+        fingerprint = context_fingerprint(context)
+        cached_response = None
+        if cacheable:
+            cached_response = response_cache.get(user_message, fingerprint, query_embedding)
+        
+        messages = []
+        if cached_response is None:
+            messages = self._build_messages(
+                user_message, conversation_history, context, recommendations, memory
+            )
+        timings["pre_llm"] = round((time.perf_counter() - start) * 1000, 2)
+        
+        plan = TurnPlan.create(
+            user_message=user_message,
+            intent=intent,
+            context=context,
+            query_embedding=query_embedding,
+            fingerprint=fingerprint,
+            recommendations=recommendations,
+            cacheable=cacheable,
+            cached_response=cached_response,
+            messages=messages,
+            timings=timings
+        )
+        turn_plans.put(session_id, user_message, history, plan)
+        return plan
+    
+    def _is_cacheable(self, intent: Dict, conversation_history: List[Dict]) -> bool:
+        """Only stand-alone knowledge-base questions get shared cached answers"""
+        return (
+            settings.response_cache_enabled
+            and not conversation_history
+            and not intent["needs_recommendation"]
+        )
+    
+    async def _get_recommendations(self, intent: Dict, user_details: Dict) -> Optional[List[Dict]]:
+        """Run the (synchronous) recommendation queries off the event loop"""
+        if not user_details["age"]:
+            return None
+        
+        if intent["insurance_type"] == "health":
+            return await asyncio.to_thread(
+                self.recommendation_engine.get_health_insurance_recommendations,
+                age=user_details["age"],
+                coverage_needed=user_details["coverage_needed"] or 500000,
+                budget_monthly=user_details["budget_monthly"],
+                family_size=user_details["family_size"]
+            )
+        elif intent["insurance_type"] == "term_life":
+            return await asyncio.to_thread(
+                self.recommendation_engine.get_term_insurance_recommendations,
+                age=user_details["age"],
+                coverage_needed=user_details["coverage_needed"] or 5000000,
+                annual_income=user_details["annual_income"],
+                smoker=user_details["smoker"],
+                budget_monthly=user_details["budget_monthly"]
+            )
+        return None
+    
+    async def _save_chat_record(
+        self,
+        session_id: str,
+        user_message: str,
+        assistant_response: str,
+        intent: Dict,
+        context: List[str],
+        recommendations: Optional[List[Dict]]
+    ) -> None:
+        """Record a chat turn in memory now and queue it for the chat history table"""
+        conversation_memory.add_turn(session_id, user_message, assistant_response)
+        turn_plans.discard(session_id)
+        await chat_history.submit({
+            "session_id": session_id,
+            "user_message": user_message,
+            "assistant_response": assistant_response,
+            "context_used": {"intent": intent, "context_retrieved": bool(context)},
+            "recommendations": [r["policy_id"] for r in recommendations] if recommendations else None
+        })
     
     def _build_messages(
         self,
         user_message: str,
         conversation_history: List[Dict],
-        context: str,
-        recommendations: Optional[List[Dict]] = None
+        context: List[str],
+        recommendations: Optional[List[Dict]] = None,
+        memory: Optional[SessionMemory] = None
     ) -> List[Dict]:
-        """Build message list for OpenAI API"""
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        
-        # Add conversation history (limited to last 10 exchanges)
-        for msg in conversation_history[-20:]:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-        
-        # Build user message with context
-        user_content = user_message
-        
-        if context:
-            user_content = f"""User Question: {user_message}
-
----
-Relevant Information from NYVO Knowledge Base:
-{context}
----
-
-Please answer the user's question using the above context when relevant."""
-        
-        if recommendations:
-            rec_text = "\n\nRecommended Policies from NYVO Database:\n"
-            for i, rec in enumerate(recommendations, 1):
-                rec_text += f"""
-{i}. {rec['name']} by {rec['provider']}
-   - Match Score: {rec['match_score']}%
-   - Coverage: ₹{rec['coverage_range']['min']/100000:.0f}L - ₹{rec['coverage_range']['max']/100000:.0f}L
-   - Base Premium: ₹{rec['base_premium']:,.0f}/{rec['premium_frequency']}
-   - Claim Settlement Ratio: {rec['claim_settlement_ratio']}%
-   - Key Features: {', '.join(rec['key_features'][:3]) if rec['key_features'] else 'N/A'}
-"""
-            user_content += rec_text + "\nPlease present these recommendations to the user in a helpful way, explaining why each might be suitable."
-        
-        messages.append({"role": "user", "content": user_content})
-        
-        return messages
+        """Build message list for OpenAI API within the model's token budget"""
+        return self.prompt_builder.build(
+            user_message, conversation_history, context, recommendations,
+            earlier_questions=list(memory.earlier_questions) if memory else None
+        )
     
-    def chat(
+    async def _finish_turn(
+        self,
+        plan: TurnPlan,
+        session_id: str,
+        assistant_message: str
+    ) -> None:
+        """Cache the answer when shareable and save the turn"""
+        if plan.cacheable and plan.cached_response is None:
+            response_cache.put(
+                plan.user_message, plan.fingerprint, assistant_message,
+                list(plan.query_embedding) if plan.query_embedding is not None else None
+            )
+        await self._save_chat_record(
+            session_id, plan.user_message, assistant_message, plan.intent_dict(), list(plan.context),
+            None if plan.cached_response is not None else plan.recommendation_list()
+        )
+    
+    async def chat(
         self,
         user_message: str,
         session_id: str,
         conversation_history: Optional[List[Dict]] = None
     ) -> Dict:
         """Process a chat message and generate response"""
-        conversation_history = conversation_history or []
-        
-        # Detect intent
-        intent = self._detect_intent(user_message)
-        
-        # Get relevant context from knowledge base
-        context = self._get_relevant_context(user_message)
-        
-        # Get recommendations if needed
-        recommendations = None
-        if intent["needs_recommendation"] and intent["insurance_type"]:
-            user_details = self._extract_user_details(user_message, conversation_history)
-            
-            if intent["insurance_type"] == "health":
-                if user_details["age"]:
-                    recommendations = self.recommendation_engine.get_health_insurance_recommendations(
-                        age=user_details["age"],
-                        coverage_needed=user_details["coverage_needed"] or 500000,
-                        budget_monthly=user_details["budget_monthly"],
-                        family_size=user_details["family_size"]
-                    )
-            elif intent["insurance_type"] == "term_life":
-                if user_details["age"]:
-                    recommendations = self.recommendation_engine.get_term_insurance_recommendations(
-                        age=user_details["age"],
-                        coverage_needed=user_details["coverage_needed"] or 5000000,
-                        annual_income=user_details["annual_income"],
-                        smoker=user_details["smoker"],
-                        budget_monthly=user_details["budget_monthly"]
-                    )
-        
-        # Build messages for OpenAI
-        messages = self._build_messages(
-            user_message, conversation_history, context, recommendations
-        )
-        
-        # Generate response
-        response = self.client.chat.completions.create(
-            model=settings.openai_model,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1500
-        )
-        
-        assistant_message = response.choices[0].message.content
+        # Without client-sent history, the turn continues from server-side memory
+        plan = await self._plan_turn(user_message, session_id, conversation_history or [])
+        timings = dict(plan.timings)
+        
+        if plan.cached_response is not None:
+            assistant_message = plan.cached_response
+        else:
+            response = await _timed(timings, "llm", self.client.chat.completions.create(
+                model=settings.openai_model,
+                messages=plan.message_list(),
+                temperature=0.7,
+                max_tokens=settings.openai_max_tokens
+            ))
+            assistant_message = response.choices[0].message.content
+        logger.debug(f"Chat turn timings (ms): {timings}")
         
         # Save to chat history
-        chat_record = ChatSession(
-            session_id=session_id,
-            user_message=user_message,
-            assistant_response=assistant_message,
-            context_used={"intent": intent, "context_retrieved": bool(context)},
-            recommendations=[r["policy_id"] for r in recommendations] if recommendations else None
-        )
-        self.db.add(chat_record)
-        self.db.commit()
+        await self._finish_turn(plan, session_id, assistant_message)
         
         return {
             "response": assistant_message,
-            "intent": intent,
-            "recommendations": recommendations,
-            "context_used": bool(context)
+            "intent": plan.intent_dict(),
+            "recommendations": None if plan.cached_response is not None else plan.recommendation_list(),
+            "context_used": bool(plan.context),
+            "cached": plan.cached_response is not None,
+            "timings": timings
         }
     
     async def chat_stream(
@@ -309,58 +391,38 @@ Please answer the user's question using the above context when relevant."""
         conversation_history: Optional[List[Dict]] = None
     ) -> AsyncGenerator[str, None]:
         """Stream chat response for real-time output"""
-        conversation_history = conversation_history or []
-        
-        intent = self._detect_intent(user_message)
-        context = self._get_relevant_context(user_message)
+        plan = await self._plan_turn(user_message, session_id, conversation_history or [])
         
-        # Get recommendations if needed (same logic as chat)
-        recommendations = None
-        if intent["needs_recommendation"] and intent["insurance_type"]:
-            user_details = self._extract_user_details(user_message, conversation_history)
-            
-            if intent["insurance_type"] == "health" and user_details["age"]:
-                recommendations = self.recommendation_engine.get_health_insurance_recommendations(
-                    age=user_details["age"],
-                    coverage_needed=user_details["coverage_needed"] or 500000,
-                    budget_monthly=user_details["budget_monthly"],
-                    family_size=user_details["family_size"]
-                )
-            elif intent["insurance_type"] == "term_life" and user_details["age"]:
-                recommendations = self.recommendation_engine.get_term_insurance_recommendations(
-                    age=user_details["age"],
-                    coverage_needed=user_details["coverage_needed"] or 5000000,
-                    annual_income=user_details["annual_income"],
-                    smoker=user_details["smoker"],
-                    budget_monthly=user_details["budget_monthly"]
-                )
+        if plan.cached_response is not None:
+            yield plan.cached_response
+            await self._finish_turn(plan, session_id, plan.cached_response)
+            return
         
-        messages = self._build_messages(
-            user_message, conversation_history, context, recommendations
-        )
-        
-        stream = self.client.chat.completions.create(
+        timings = dict(plan.timings)
+        request_start = time.perf_counter()
+        stream = await self.client.chat.completions.create(
             model=settings.openai_model,
-            messages=messages,
+            messages=plan.message_list(),
             temperature=0.7,
-            max_tokens=1500,
+            max_tokens=settings.openai_max_tokens,
             stream=True
         )
         
-        full_response = ""
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                content = chunk.choices[0].delta.content
-                full_response += content
-                yield content
+        parts = []
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content = chunk.choices[0].delta.content
+                    if not parts:
+                        timings["llm_first_token"] = round(
+                            (time.perf_counter() - request_start) * 1000, 2
+                        )
+                        logger.debug(f"Chat stream timings (ms): {timings}")
+                    parts.append(content)
+                    yield content
+        finally:
+            # Closing early (client gone) aborts the completion request
+            await stream.close()
         
         # Save to chat history after streaming completes
-        chat_record = ChatSession(
-            session_id=session_id,
-            user_message=user_message,
-            assistant_response=full_response,
-            context_used={"intent": intent, "context_retrieved": bool(context)},
-            recommendations=[r["policy_id"] for r in recommendations] if recommendations else None
-        )
-        self.db.add(chat_record)
-        self.db.commit()
+        await self._finish_turn(plan, session_id, "".join(parts))
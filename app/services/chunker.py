@@ -0,0 +1,166 @@
+"""Token-aware, markdown-structure-aware text chunker for content ingestion"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.utils.tokens import get_encoding
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+@dataclass
+class Chunk:
+    """A chunk of text plus the markdown heading path it was found under"""
+    text: str
+    heading_path: List[str] = field(default_factory=list)
+    token_count: int = 0
+    
+    @property
+    def heading_path_str(self) -> str:
+        return " > ".join(self.heading_path)
+
+
+def iter_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """Re-split a stream of arbitrary text pieces into lines (without newlines)"""
+    carry = ""
+    for piece in pieces:
+        if not piece:
+            continue
+        lines = (carry + piece).split("\n")
+        carry = lines.pop()
+        yield from lines
+    if carry:
+        yield carry
+
+
+class MarkdownTokenChunker:
+    """
+    Splits text into chunks of at most ``max_tokens`` tokens.
+    
+    Markdown headings start a new chunk (unless the running chunk is still
+    below ``min_tokens``) and the heading path is carried on each chunk.
+    Chunks break on line boundaries; a single line longer than the budget is
+    cut into token windows. Each line is tokenized once and the trailing
+    ``overlap_tokens`` worth of lines are carried into the next chunk, so the
+    whole pass is linear in the input size.
+    """
+    
+    def __init__(
+        self,
+        max_tokens: int = 256,
+        overlap_tokens: int = 32,
+        min_tokens: int = 32,
+        encoding_name: str = "cl100k_base"
+    ):
+        self.max_tokens = max(16, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+        self.min_tokens = max(0, min(min_tokens, self.max_tokens))
+        self.encoding_name = encoding_name
+        self._encoding = None
+    
+    @property
+    def signature(self) -> str:
+        """Identifies the chunking configuration (chunk IDs depend on it)"""
+        # The encoding actually loaded: tiktoken may have fallen back to
+        # ApproximateEncoding, which splits text differently
+        encoding = getattr(self.encoding, "name", self.encoding_name)
+        return f"md-token-v1:{encoding}:{self.max_tokens}:{self.overlap_tokens}:{self.min_tokens}"
+    
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            self._encoding = get_encoding(self.encoding_name)
+        return self._encoding
+    
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def chunk_text(self, text: str, markdown: bool = True) -> List[Chunk]:
+        """Chunk a complete text"""
+        return list(self.iter_chunks([text], markdown=markdown))
+    
+    def _split_long_line(self, line: str) -> Iterator[Tuple[str, int]]:
+        tokens = self.encoding.encode(line, disallowed_special=())
+        step = self.max_tokens - self.overlap_tokens
+        for start in range(0, len(tokens), step):
+            window = tokens[start:start + self.max_tokens]
+            yield self.encoding.decode(window), len(window)
+            if start + self.max_tokens >= len(tokens):
+                break
+    
+    def iter_chunks(self, pieces: Iterable[str], markdown: bool = True) -> Iterator[Chunk]:
+        """Chunk a stream of text pieces (pages, blocks) without buffering the whole text"""
+        headings: List[Tuple[int, str]] = []
+        lines: List[Tuple[str, int]] = []  # (line, tokens incl. newline)
+        tokens = 0
+        has_body = False
+        path: Optional[List[str]] = None
+        in_fence = False
+        
+        def emit() -> Optional[Chunk]:
+            text = "\n".join(line for line, _ in lines).strip()
+            if not has_body or not text:
+                return None
+            return Chunk(text=text, heading_path=list(path or []), token_count=tokens)
+        
+        def carry_overlap() -> Tuple[List[Tuple[str, int]], int]:
+            kept, kept_tokens = [], 0
+            for line, n in reversed(lines):
+                if kept_tokens + n > self.overlap_tokens:
+                    break
+                kept.append((line, n))
+                kept_tokens += n
+            kept.reverse()
+            return kept, kept_tokens
+        
+        for raw_line in iter_lines(pieces):
+            heading = None
+            if markdown:
+                if _FENCE.match(raw_line):
+                    in_fence = not in_fence
+                elif not in_fence:
+                    heading = _HEADING.match(raw_line)
+            
+            if heading:
+                # New section: close the running chunk once it carries enough body
+                if has_body and tokens >= self.min_tokens:
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    lines, tokens, has_body, path = [], 0, False, None
+                
+                level = len(heading.group(1))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, heading.group(2).strip()))
+            
+            if not raw_line.strip():
+                if lines:
+                    lines.append((raw_line, 1))
+                    tokens += 1
+                continue
+            
+            n = self.count_tokens(raw_line) + 1
+            pieces_of_line = [(raw_line, n)] if n <= self.max_tokens else list(self._split_long_line(raw_line))
+            
+            for line, n in pieces_of_line:
+                if tokens + n > self.max_tokens and has_body:
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    lines, tokens = carry_overlap()
+                    if tokens + n > self.max_tokens:
+                        lines, tokens = [], 0
+                
+                lines.append((line, n))
+                tokens += n
+                if not heading:
+                    if not has_body:
+                        path = [title for _, title in headings]
+                    has_body = True
+        
+        chunk = emit()
+        if chunk:
+            yield chunk
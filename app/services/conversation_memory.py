@@ -0,0 +1,156 @@
+"""Server-side conversation memory keyed by session_id"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core import settings
+from app.models import ChatSession
+from app.services.chat_history import chat_history
+
+
+class SessionMemory:
+    """
+    Recent turns of one conversation plus a rolling record of older ones.
+    
+    ``messages`` holds at most ``max_turns`` user/assistant pairs. When a turn
+    falls out of the window its user question is kept in ``earlier_questions``
+    (bounded) so the prompt can still summarize it. ``user_details`` holds
+    details already extracted from earlier user messages, so each turn only
+    parses the new message.
+    """
+    
+    def __init__(self, max_turns: int, max_summary_items: int):
+        self.messages: Deque[Dict] = deque(maxlen=max_turns * 2)
+        self.earlier_questions: Deque[str] = deque(maxlen=max_summary_items)
+        self.user_details: Dict = {}
+        self.details_initialized = False
+        self.last_used = time.monotonic()
+    
+    def add_turn(self, user_message: str, assistant_response: str) -> None:
+        """Append a completed turn, rolling the oldest one into the summary"""
+        if len(self.messages) == self.messages.maxlen:
+            oldest = self.messages[0]
+            if oldest["role"] == "user":
+                self.earlier_questions.append(oldest["content"])
+            # Drop the full oldest pair so the window stays aligned
+            self.messages.popleft()
+            if self.messages and self.messages[0]["role"] == "assistant":
+                self.messages.popleft()
+        self.messages.append({"role": "user", "content": user_message})
+        self.messages.append({"role": "assistant", "content": assistant_response})
+    
+    def history(self) -> List[Dict]:
+        return list(self.messages)
+
+
+class ConversationMemoryStore:
+    """In-process LRU of SessionMemory objects backed by the chat_sessions table"""
+    
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_turns: int = 10,
+        max_summary_items: int = 10,
+        ttl_seconds: float = 1800
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.max_summary_items = max_summary_items
+        self.ttl_seconds = ttl_seconds
+        
+        self._sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+    
+    def _get_cached(self, session_id: str) -> Optional[SessionMemory]:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                return None
+            if self.ttl_seconds > 0 and time.monotonic() - memory.last_used > self.ttl_seconds:
+                # Idle too long; another worker may have written turns since
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            memory.last_used = time.monotonic()
+            self.hits += 1
+            return memory
+    
+    def _store(self, session_id: str, memory: SessionMemory) -> SessionMemory:
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                return existing
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return memory
+    
+    def _load_from_db(self, session_id: str, db: Session) -> SessionMemory:
+        """Rebuild a session from the chat history table and the write-behind queue"""
+        memory = SessionMemory(self.max_turns, self.max_summary_items)
+        # Read the queue first: a row committed in between then shows up in
+        # both places and is skipped below, rather than in neither
+        pending = chat_history.pending_turns(session_id)
+        limit = self.max_turns + self.max_summary_items
+        rows = (
+            db.query(ChatSession.user_message, ChatSession.assistant_response, ChatSession.created_at)
+            .filter(ChatSession.session_id == session_id)
+            .order_by(ChatSession.id.desc())
+            .limit(limit)
+            .all()
+        )
+        turns = [(row.user_message, row.assistant_response) for row in reversed(rows)]
+        stored = {(row.created_at, row.user_message) for row in rows}
+        turns += [
+            (row["user_message"], row["assistant_response"])
+            for row in pending
+            if (row.get("created_at"), row["user_message"]) not in stored
+        ]
+        for user_message, assistant_response in turns[-limit:]:
+            memory.add_turn(user_message or "", assistant_response or "")
+        return memory
+    
+    def get(self, session_id: str, db: Session) -> SessionMemory:
+        """Return the session's memory, loading recent turns from the DB on a miss"""
+        memory = self._get_cached(session_id)
+        if memory is not None:
+            return memory
+        
+        memory = self._load_from_db(session_id, db)
+        with self._lock:
+            self.loads += 1
+        return self._store(session_id, memory)
+    
+    def add_turn(self, session_id: str, user_message: str, assistant_response: str) -> None:
+        """Record a completed turn for a cached session"""
+        memory = self._get_cached(session_id)
+        if memory is not None:
+            with self._lock:
+                memory.add_turn(user_message, assistant_response)
+    
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "hits": self.hits,
+                "loads": self.loads
+            }
+
+
+# Singleton instance
+conversation_memory = ConversationMemoryStore(
+    max_sessions=settings.memory_max_sessions,
+    max_turns=settings.memory_max_turns,
+    max_summary_items=settings.memory_summary_items,
+    ttl_seconds=settings.memory_ttl_seconds
+)
@@ -0,0 +1,57 @@
+"""Interval index answering (age, coverage) eligibility without a full scan"""
+from typing import List, Tuple
+
+import numpy as np
+
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class EligibilityIndex:
+    """
+    Age-band interval index over the policies of one insurance type.
+    
+    The min/max ages of all policies cut the age axis into elementary
+    segments; every age inside a segment is covered by exactly the same
+    policies. Each segment stores those policies sorted by max cover
+    (highest first), so a lookup is a binary search for the segment, a
+    binary search for the cover cut-off and a sort of the matching prefix
+    back into catalog order. Cost depends on the number of matches, not on
+    the size of the catalog.
+    """
+    
+    def __init__(
+        self,
+        min_age: np.ndarray,
+        max_age: np.ndarray,
+        max_coverage: np.ndarray,
+        is_listed: np.ndarray
+    ):
+        # NaN (missing) bounds never match, like the SQL predicates
+        valid = is_listed & ~np.isnan(min_age) & ~np.isnan(max_age) & ~np.isnan(max_coverage)
+        # A segment starts at every min_age and right after every max_age
+        upper = np.nextafter(max_age[valid], np.inf)
+        self._bounds = np.unique(np.concatenate([min_age[valid], upper]))
+        
+        self._segments: List[Tuple[np.ndarray, np.ndarray]] = []
+        for start in self._bounds[:-1]:
+            members = np.flatnonzero(valid & (min_age <= start) & (max_age >= start))
+            members = members[np.argsort(-max_coverage[members], kind="stable")]
+            # Negated so the cover column is ascending for searchsorted
+            self._segments.append((members, -max_coverage[members]))
+    
+    def candidates(self, age: float, coverage_needed: float) -> np.ndarray:
+        """Catalog positions with min_age <= age <= max_age and max_coverage >= coverage_needed"""
+        segment = int(np.searchsorted(self._bounds, age, side="right")) - 1
+        if segment < 0 or segment >= len(self._segments):
+            return _EMPTY
+        
+        members, neg_coverage = self._segments[segment]
+        count = int(np.searchsorted(neg_coverage, -coverage_needed, side="right"))
+        return np.sort(members[:count])
+    
+    def get_stats(self) -> dict:
+        return {
+            "segments": len(self._segments),
+            "entries": sum(len(members) for members, _ in self._segments)
+        }
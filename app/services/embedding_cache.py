@@ -0,0 +1,168 @@
+"""Bounded query-embedding cache with an optional persistent tier"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_namespace(embedding_function) -> str:
+    """Cache namespace for an embedding function: its class and, if known, its model"""
+    model = getattr(embedding_function, "model_name", None) or getattr(embedding_function, "_model_name", None)
+    if model is None and callable(getattr(embedding_function, "get_config", None)):
+        try:
+            model = embedding_function.get_config().get("model_name")
+        except Exception:
+            model = None
+    name = type(embedding_function).__name__
+    return f"{name}:{model}" if model else name
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache in front of a query embedding function.
+    
+    The first tier is an in-process LRU. The optional second tier is a small
+    SQLite file so embeddings of common queries survive restarts. Keys
+    include ``namespace`` (the embedding model), so a different model never
+    reads another's vectors. Disk errors are logged and treated as misses.
+    """
+    
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = 2048,
+        persist_path: Optional[str] = None
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        if persist_path:
+            self._open_disk_tier(persist_path)
+    
+    def _open_disk_tier(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(key TEXT PRIMARY KEY, embedding BLOB NOT NULL)"
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache disk tier disabled ({path}): {e}")
+            self._conn = None
+    
+    def _key(self, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.namespace}:{normalized}".encode("utf-8")).hexdigest()
+    
+    def _remember(self, key: str, embedding: List[float]) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _read_disk(self, key: str) -> Optional[List[float]]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT embedding FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            return array("f", row[0]).tolist()
+        except (sqlite3.Error, ValueError) as e:
+            # Locked, corrupt or truncated: recompute rather than fail the query
+            logger.warning(f"Failed to read cached query embedding: {e}")
+            return None
+    
+    def _write_disk(self, key: str, embedding: List[float]) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, embedding) VALUES (?, ?)",
+                (key, array("f", embedding).tobytes())
+            )
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist query embedding: {e}")
+    
+    def get_or_compute(self, text: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding for text, computing and storing it on a miss"""
+        key = self._key(text)
+        
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+            
+            embedding = self._read_disk(key)
+            if embedding is not None:
+                self._remember(key, embedding)
+                self.disk_hits += 1
+                return embedding
+            
+            self.misses += 1
+        
+        # Compute outside the lock so concurrent misses don't serialize
+        embedding = compute(text)
+        
+        with self._lock:
+            self._remember(key, embedding)
+            self._write_disk(key, embedding)
+        
+        return embedding
+    
+    def clear(self) -> None:
+        """Drop all cached embeddings from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM query_embeddings")
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to clear persisted query embeddings: {e}")
+    
+    def get_stats(self) -> Dict:
+        """Get cache size and hit rates"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._conn is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+    
+    def close(self) -> None:
+        """Close the persistent tier"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,130 @@
+"""Content-hash manifest for incremental content ingestion"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of raw bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """SHA-256 hex digest of text"""
+    return hash_bytes(text.encode("utf-8"))
+
+
+class IngestionManifest:
+    """
+    Persistent record of what has been indexed.
+    
+    Layout::
+    
+        {"files": {"<source>": {"file_hash": "...", "chunker": "...", "complete": true,
+                                "chunks": {"<chunk_id>": "<chunk_hash>"}}}}
+    
+    ``chunks`` always mirrors what is committed to the vector store, and
+    ``complete`` is false while a file is only partially re-indexed, so an
+    interrupted ingest resumes from the last checkpoint instead of starting over.
+    ``chunker`` records the chunking configuration, since changing it changes
+    chunk boundaries even when the file itself did not change.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self.load()
+    
+    def load(self) -> None:
+        """Load the manifest from disk, starting empty if missing or unreadable"""
+        self.files = {}
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == self.VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable ingestion manifest {self.path}: {e}")
+    
+    def save(self) -> None:
+        """Atomically write the manifest to disk"""
+        with self._lock:
+            payload = json.dumps({"version": self.VERSION, "files": self.files})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(payload, encoding="utf-8")
+        os.replace(tmp_path, self.path)
+    
+    def get(self, source: str) -> Optional[Dict]:
+        return self.files.get(source)
+    
+    def is_current(self, source: str, file_hash: str, chunker: str) -> bool:
+        """Whether source is fully indexed at this content hash and chunker"""
+        entry = self.files.get(source)
+        return (
+            bool(entry)
+            and entry.get("file_hash") == file_hash
+            and entry.get("chunker") == chunker
+            and entry.get("complete", True)
+        )
+    
+    def begin_file(self, source: str, file_hash: str, chunker: str) -> Dict[str, str]:
+        """Mark source as being re-indexed and return its committed chunk hashes"""
+        with self._lock:
+            entry = self.files.get(source) or {"chunks": {}}
+            entry["file_hash"] = file_hash
+            entry["chunker"] = chunker
+            entry["complete"] = False
+            self.files[source] = entry
+            return dict(entry["chunks"])
+    
+    def commit_chunks(self, source: str, chunks: Dict[str, str]) -> None:
+        """Record chunks that are now stored in the vector store"""
+        with self._lock:
+            entry = self.files.get(source)
+            if entry is not None:
+                entry["chunks"].update(chunks)
+    
+    def drop_chunks(self, source: str, chunk_ids: Iterable[str]) -> None:
+        """Forget chunks that were deleted from the vector store"""
+        with self._lock:
+            entry = self.files.get(source)
+            if entry is not None:
+                for chunk_id in chunk_ids:
+                    entry["chunks"].pop(chunk_id, None)
+    
+    def finish_file(self, source: str) -> None:
+        """Mark source as fully indexed"""
+        with self._lock:
+            entry = self.files.get(source)
+            if entry is not None:
+                entry["complete"] = True
+    
+    def remove(self, source: str) -> Optional[Dict]:
+        with self._lock:
+            return self.files.pop(source, None)
+    
+    def reset(self) -> None:
+        """Forget everything (e.g. after the collection was cleared)"""
+        with self._lock:
+            self.files = {}
+        self.save()
@@ -0,0 +1,149 @@
+"""Pipelined embedding and vector-store writes for content ingestion"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class EmbeddingWriter:
+    """
+    Buffers chunks into batches, embeds batches concurrently on a thread pool
+    and writes them to the vector store on a single writer thread.
+    
+    Embedding of batch N+1 overlaps with the Chroma write of batch N. At most
+    ``max_pending_batches`` batches and roughly ``max_buffer_bytes`` of chunk
+    text are in flight; ``add`` blocks beyond that so a fast producer cannot
+    outrun the embedder or grow memory without bound.
+    
+    ``on_upsert(ids, metadatas)`` and ``on_delete(ids, tag)`` are called on
+    the writer thread once a write has been committed to the vector store.
+    """
+    
+    def __init__(
+        self,
+        vector_store,
+        batch_size: int = 100,
+        embed_workers: int = 4,
+        max_pending_batches: int = 8,
+        max_buffer_bytes: int = 64 * 1024 * 1024,
+        on_upsert: Optional[Callable[[List[str], List[Dict]], None]] = None,
+        on_delete: Optional[Callable[[List[str], Optional[str]], None]] = None
+    ):
+        self.vector_store = vector_store
+        self.batch_size = max(1, batch_size)
+        self.max_buffer_bytes = max(1, max_buffer_bytes)
+        self.on_upsert = on_upsert
+        self.on_delete = on_delete
+        
+        self._embed_pool = ThreadPoolExecutor(
+            max_workers=max(1, embed_workers), thread_name_prefix="ingest-embed"
+        )
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-write")
+        self._slots = threading.BoundedSemaphore(max(1, max_pending_batches))
+        self._budget = threading.Condition()
+        self._inflight_bytes = 0
+        self._error: Optional[BaseException] = None
+        
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._buffered_bytes = 0
+    
+    def add(self, chunk_id: str, document: str, metadata: Dict) -> None:
+        """Queue a chunk for upsert, submitting a batch once it is full"""
+        self._ids.append(chunk_id)
+        self._documents.append(document)
+        self._metadatas.append(metadata)
+        self._buffered_bytes += len(document.encode("utf-8"))
+        if len(self._ids) >= self.batch_size:
+            self.flush()
+    
+    def delete(self, ids: List[str], tag: Optional[str] = None) -> None:
+        """Queue deletion of chunk IDs on the writer thread"""
+        if ids:
+            self._track(self._write_pool.submit(self._delete, ids, tag))
+    
+    def flush(self) -> None:
+        """Submit the partially filled batch"""
+        if not self._ids:
+            return
+        self._raise_if_failed()
+        
+        batch = (self._ids, self._documents, self._metadatas, self._buffered_bytes)
+        self._ids, self._documents, self._metadatas = [], [], []
+        self._buffered_bytes = 0
+        
+        self._slots.acquire()
+        self._reserve(batch[3])
+        self._track(self._embed_pool.submit(self._embed_and_write, *batch))
+    
+    @property
+    def inflight_bytes(self) -> int:
+        """Approximate bytes of chunk text submitted but not yet written"""
+        return self._inflight_bytes
+    
+    def _reserve(self, nbytes: int) -> None:
+        with self._budget:
+            # A single oversized batch is still allowed through on its own
+            while self._inflight_bytes and self._inflight_bytes + nbytes > self.max_buffer_bytes:
+                self._budget.wait()
+            self._inflight_bytes += nbytes
+    
+    def _release(self, nbytes: int) -> None:
+        with self._budget:
+            self._inflight_bytes -= nbytes
+            self._budget.notify_all()
+        self._slots.release()
+    
+    def _embed_and_write(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        nbytes: int
+    ) -> None:
+        try:
+            embeddings = self.vector_store.embed_documents(documents)
+        except BaseException:
+            self._release(nbytes)
+            raise
+        
+        write = self._write_pool.submit(self._write, ids, documents, metadatas, embeddings)
+        write.add_done_callback(lambda _: self._release(nbytes))
+        self._track(write)
+    
+    def _write(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict],
+        embeddings: List[List[float]]
+    ) -> None:
+        self.vector_store.upsert_documents(documents, metadatas, ids, embeddings)
+        if self.on_upsert is not None:
+            self.on_upsert(ids, metadatas)
+    
+    def _delete(self, ids: List[str], tag: Optional[str]) -> None:
+        self.vector_store.delete_documents(ids=ids)
+        if self.on_delete is not None:
+            self.on_delete(ids, tag)
+    
+    def _track(self, future: Future) -> None:
+        future.add_done_callback(self._record_error)
+    
+    def _record_error(self, future: Future) -> None:
+        if not future.cancelled() and future.exception() is not None and self._error is None:
+            self._error = future.exception()
+    
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise self._error
+    
+    def close(self) -> None:
+        """Flush remaining chunks, wait for all writes and re-raise the first error"""
+        try:
+            self.flush()
+        finally:
+            # Embedding tasks schedule writes, so drain the embed pool first
+            self._embed_pool.shutdown(wait=True)
+            self._write_pool.shutdown(wait=True)
+        self._raise_if_failed()
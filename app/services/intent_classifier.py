@@ -0,0 +1,156 @@
+"""Keyword-automaton intent classification of chat messages"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+# Insurance types in priority order: when a message mentions several, the
+# first one listed wins. Keywords match whole words; a trailing "*" also
+# matches longer words with that prefix, and phrases match across any
+# whitespace. Inflected forms are listed explicitly where a prefix would
+# over-match ("health*" would catch "healthy", "life*" "lifestyle").
+INSURANCE_TYPE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("health", (
+        "health", "healthcare", "health care", "medical", "medicals",
+        "hospitali*", "mediclaim*"
+    )),
+    ("term_life", ("term", "terms", "life", "death benefit", "death benefits")),
+    ("motor", ("car", "cars", "motor*", "vehicle*", "bike*", "two wheeler*")),
+    ("travel", ("travel*", "trip", "trips", "overseas")),
+)
+
+INTENT_FLAG_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "needs_recommendation": (
+        "recommend*", "suggest*", "best policy", "best policies", "which policy",
+        "which policies", "what should i buy", "help me choose", "find me", "looking for"
+    ),
+    "needs_comparison": ("compar*", "versus", "vs", "difference between", "differences between"),
+    "asking_about_policy": (
+        "claim process", "claims process", "how to claim", "documents required",
+        "document required", "exclusion*", "waiting period*", "premium*",
+        "coverage", "coverages"
+    ),
+}
+
+_END = ""
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    One regex alternation for all keywords, factored as a character trie so
+    the engine follows a single branch per character instead of trying
+    every keyword at every position.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+    
+    def emit(node: dict) -> str:
+        branches = []
+        for char in sorted(node):
+            if char == _END:
+                continue
+            if char == "*":
+                piece = r"\w*"
+            elif char == " ":
+                piece = r"\s+"
+            else:
+                piece = re.escape(char)
+            branches.append(piece + emit(node[char]))
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if _END in node:
+            pattern = "(?:" + pattern + ")?" if len(branches) == 1 else pattern + "?"
+        return pattern
+    
+    return emit(trie)
+
+
+class IntentClassifier:
+    """
+    Classifies a message in one pass over its text.
+    
+    Every keyword of every intent is compiled into a single word-bounded
+    automaton (a trie-shaped regex), so classification is one ``findall``
+    over the lowercased message plus a dict lookup per hit, with each
+    intent a bit in an int. This is for accuracy, not speed: word
+    boundaries keep "vs" from firing inside other words and "term" from
+    matching "determine", at a cost similar to the substring scans on short
+    messages and higher on long ones (see scripts/benchmark_intent.py).
+    Adding an insurance type or keyword is a table edit.
+    """
+    
+    def __init__(
+        self,
+        insurance_types: Iterable[Tuple[str, Iterable[str]]] = INSURANCE_TYPE_KEYWORDS,
+        flags: Optional[Dict[str, Iterable[str]]] = None
+    ):
+        flags = INTENT_FLAG_KEYWORDS if flags is None else flags
+        
+        # Each intent gets a bit; a keyword maps to the bits it sets
+        bits: Dict[str, int] = {}
+        self._types: List[Tuple[str, int]] = []
+        self._flags: List[Tuple[str, int]] = []
+        for insurance_type, keywords in insurance_types:
+            bit = 1 << (len(self._types) + len(self._flags))
+            self._types.append((insurance_type, bit))
+            for keyword in keywords:
+                key = " ".join(keyword.lower().split())
+                bits[key] = bits.get(key, 0) | bit
+        for flag, keywords in flags.items():
+            bit = 1 << (len(self._types) + len(self._flags))
+            self._flags.append((flag, bit))
+            for keyword in keywords:
+                key = " ".join(keyword.lower().split())
+                bits[key] = bits.get(key, 0) | bit
+        
+        self._exact = {k: b for k, b in bits.items() if not k.endswith("*")}
+        # Longest prefix first, so "waiting period*" beats a shorter prefix
+        self._prefixes = sorted(
+            ((k[:-1], b) for k, b in bits.items() if k.endswith("*")),
+            key=lambda item: len(item[0]), reverse=True
+        )
+        self._pattern = re.compile(r"\b" + _trie_pattern(bits) + r"\b")
+    
+    def _bits_of(self, matched: str) -> int:
+        bits = self._exact.get(matched)
+        if bits is not None:
+            return bits
+        if not matched.isalpha():
+            matched = " ".join(matched.split())
+            bits = self._exact.get(matched)
+            if bits is not None:
+                return bits
+        for prefix, bits in self._prefixes:
+            if matched.startswith(prefix):
+                return bits
+        return 0
+    
+    def matches(self, message: str) -> Set[str]:
+        """Names of every insurance type and flag whose keywords appear in ``message``"""
+        found = self._scan(message)
+        return {name for name, bit in self._types + self._flags if found & bit}
+    
+    def _scan(self, message: str) -> int:
+        found = 0
+        for matched in self._pattern.findall(message.lower()):
+            found |= self._bits_of(matched)
+        return found
+    
+    def classify(self, message: str) -> Dict:
+        """Intent dict in the shape the chatbot and API return"""
+        found = self._scan(message)
+        insurance_type = None
+        if found:
+            insurance_type = next((t for t, bit in self._types if found & bit), None)
+        intent = {"type": "general_query", "insurance_type": insurance_type}
+        for flag, bit in self._flags:
+            intent[flag] = bool(found & bit)
+        return intent
+
+
+# Singleton instance
+intent_classifier = IntentClassifier()
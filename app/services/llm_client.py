@@ -0,0 +1,74 @@
+"""Process-wide pooled OpenAI client shared across requests"""
+import logging
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientRegistry:
+    """Owns a single AsyncOpenAI client and its keep-alive HTTP connection pool"""
+    
+    def __init__(self):
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncOpenAI] = None
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled httpx client used by the OpenAI SDK"""
+        http2 = settings.openai_http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+                http2 = False
+        
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                settings.openai_timeout,
+                connect=settings.openai_connect_timeout
+            )
+        )
+    
+    def startup(self) -> None:
+        """Create the shared client (called from the app lifespan)"""
+        if self._client is not None:
+            return
+        
+        self._http_client = self._build_http_client()
+        self._client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=self._http_client,
+            max_retries=settings.openai_max_retries
+        )
+        logger.info("LLM client pool started")
+    
+    async def shutdown(self) -> None:
+        """Close the shared client and drain its connection pool"""
+        if self._client is not None:
+            await self._client.close()
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+        logger.info("LLM client pool closed")
+    
+    def get_client(self) -> AsyncOpenAI:
+        """Return the shared client, creating it lazily outside the app lifespan"""
+        if self._client is None:
+            self.startup()
+        return self._client
+
+
+# Singleton instance
+llm_clients = LLMClientRegistry()
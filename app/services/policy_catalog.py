@@ -0,0 +1,280 @@
+"""Immutable in-memory snapshot of the policy catalog for recommendations"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import SessionLocal, InsurancePolicy, InsuranceProvider
+from app.services.policy_scoring import PolicyMatrix
+
+logger = logging.getLogger(__name__)
+
+
+VALUABLE_TERM_RIDERS = ('critical_illness', 'accidental_death', 'waiver_of_premium')
+
+
+def _health_csr_bonus(csr: Optional[float]) -> float:
+    if not csr:
+        return 0
+    if csr >= 95:
+        return 20
+    elif csr >= 90:
+        return 15
+    elif csr >= 85:
+        return 10
+    return 0
+
+
+def _term_csr_bonus(csr: Optional[float]) -> float:
+    if not csr:
+        return 0
+    if csr >= 98:
+        return 25
+    elif csr >= 95:
+        return 20
+    elif csr >= 90:
+        return 10
+    return 0
+
+
+def _waiting_bonus(waiting_period_days: Optional[int]) -> float:
+    if not waiting_period_days:
+        return 0
+    if waiting_period_days <= 30:
+        return 5
+    elif waiting_period_days <= 90:
+        return 3
+    return 0
+
+
+def _covers_pre_existing(coverage_details) -> bool:
+    if not isinstance(coverage_details, dict):
+        return False
+    pec_coverage = coverage_details.get('pre_existing_coverage', {})
+    return isinstance(pec_coverage, dict) and bool(pec_coverage.get('covered_after_waiting'))
+
+
+def _valuable_rider_hits(riders) -> int:
+    if not riders:
+        return 0
+    rider_types = [r.get('type', '').lower() for r in riders if isinstance(r, dict)]
+    return sum(1 for rider in VALUABLE_TERM_RIDERS if rider in rider_types)
+
+
+@dataclass(frozen=True)
+class PolicyRecord:
+    """Compact, read-only view of a policy and its provider"""
+    id: int
+    name: str
+    insurance_type: str
+    description: Optional[str]
+    min_coverage: Optional[float]
+    max_coverage: Optional[float]
+    min_age: Optional[int]
+    max_age: Optional[int]
+    base_premium: Optional[float]
+    premium_frequency: Optional[str]
+    premium_factors: Optional[dict]
+    waiting_period_days: Optional[int]
+    key_features: tuple
+    riders_available: tuple
+    nyvo_rating: Optional[float]
+    customer_rating: Optional[float]
+    is_active: bool
+    is_featured: bool
+    has_provider: bool
+    provider_name: str
+    provider_logo: Optional[str]
+    claim_settlement_ratio: Optional[float]
+    
+    # Precomputed, request-independent scoring inputs
+    health_csr_bonus: float
+    term_csr_bonus: float
+    waiting_bonus: float
+    covers_pre_existing: bool
+    valuable_rider_hits: int
+    
+    # Row version, used to key cached policy responses
+    updated_at: Optional[str] = None
+    
+    @classmethod
+    def from_orm(cls, policy: InsurancePolicy) -> "PolicyRecord":
+        provider = policy.provider
+        csr = provider.claim_settlement_ratio if provider else None
+        return cls(
+            id=policy.id,
+            name=policy.name,
+            insurance_type=policy.insurance_type.value,
+            description=policy.description,
+            min_coverage=policy.min_coverage,
+            max_coverage=policy.max_coverage,
+            min_age=policy.min_age,
+            max_age=policy.max_age,
+            base_premium=policy.base_premium,
+            premium_frequency=policy.premium_frequency,
+            premium_factors=policy.premium_factors,
+            waiting_period_days=policy.waiting_period_days,
+            key_features=tuple(policy.key_features or []),
+            riders_available=tuple(policy.riders_available or []),
+            nyvo_rating=policy.nyvo_rating,
+            customer_rating=policy.customer_rating,
+            is_active=bool(policy.is_active),
+            is_featured=bool(policy.is_featured),
+            has_provider=provider is not None,
+            provider_name=provider.name if provider else "Unknown",
+            provider_logo=provider.logo_url if provider else None,
+            claim_settlement_ratio=csr,
+            health_csr_bonus=_health_csr_bonus(csr),
+            term_csr_bonus=_term_csr_bonus(csr),
+            waiting_bonus=_waiting_bonus(policy.waiting_period_days),
+            covers_pre_existing=_covers_pre_existing(policy.coverage_details),
+            valuable_rider_hits=_valuable_rider_hits(policy.riders_available),
+            updated_at=policy.updated_at.isoformat() if policy.updated_at else None
+        )
+
+
+@dataclass(frozen=True)
+class PolicyCatalog:
+    """A versioned, immutable snapshot of all policies"""
+    version: int
+    fingerprint: tuple
+    loaded_at: float
+    policies: Tuple[PolicyRecord, ...]
+    by_id: Dict[int, PolicyRecord]
+    by_type: Dict[str, Tuple[PolicyRecord, ...]]
+    matrices: Dict[str, PolicyMatrix]
+    
+    def policies_of_type(self, insurance_type: str) -> Tuple[PolicyRecord, ...]:
+        return self.by_type.get(insurance_type, ())
+    
+    def matrix_of_type(self, insurance_type: str) -> PolicyMatrix:
+        matrix = self.matrices.get(insurance_type)
+        if matrix is None:
+            matrix = PolicyMatrix.from_records(())
+        return matrix
+    
+    def quote(
+        self,
+        policy: PolicyRecord,
+        age: int,
+        family_size: int = 1,
+        city: Optional[str] = None,
+        smoker: Optional[bool] = None,
+        sum_insured: Optional[float] = None
+    ) -> Optional[float]:
+        """Yearly premium for a policy and applicant (see premium_tables)"""
+        return self.matrices[policy.insurance_type].premiums.quote(
+            policy, age, family_size, city, smoker, sum_insured
+        )
+    
+    @classmethod
+    def from_records(
+        cls,
+        policies: Tuple[PolicyRecord, ...],
+        version: int = 0,
+        fingerprint: tuple = ()
+    ) -> "PolicyCatalog":
+        by_type: Dict[str, List[PolicyRecord]] = {}
+        for record in policies:
+            by_type.setdefault(record.insurance_type, []).append(record)
+        
+        return cls(
+            version=version,
+            fingerprint=fingerprint,
+            loaded_at=time.time(),
+            policies=policies,
+            by_id={p.id: p for p in policies},
+            by_type={k: tuple(v) for k, v in by_type.items()},
+            matrices={k: PolicyMatrix.from_records(v) for k, v in by_type.items()}
+        )
+    
+    def get_stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "policies": len(self.policies),
+            "by_type": {k: len(v) for k, v in self.by_type.items()},
+            "premium_tables": {k: m.premiums.get_stats() for k, m in self.matrices.items()},
+            "loaded_at": self.loaded_at
+        }
+
+
+class PolicyCatalogService:
+    """
+    Holds the current PolicyCatalog and swaps in a new one on refresh.
+    
+    Readers grab ``snapshot`` once per request and work on that immutable
+    object, so a concurrent refresh never exposes a half-built catalog.
+    """
+    
+    def __init__(self):
+        self._snapshot: Optional[PolicyCatalog] = None
+        self._version = 0
+        self._refresh_lock = threading.Lock()
+    
+    @staticmethod
+    def _fingerprint(db: Session) -> tuple:
+        """Cheap summary of the policy tables used to detect re-seeding"""
+        policies = db.query(
+            func.count(InsurancePolicy.id),
+            func.max(InsurancePolicy.id),
+            func.max(InsurancePolicy.updated_at)
+        ).one()
+        providers = db.query(
+            func.count(InsuranceProvider.id),
+            func.max(InsuranceProvider.id)
+        ).one()
+        return tuple(str(v) for v in (*policies, *providers))
+    
+    def _build(self, db: Session, version: int, fingerprint: tuple) -> PolicyCatalog:
+        rows = (
+            db.query(InsurancePolicy)
+            .options(joinedload(InsurancePolicy.provider))
+            .order_by(InsurancePolicy.id)
+            .all()
+        )
+        policies = tuple(PolicyRecord.from_orm(p) for p in rows)
+        return PolicyCatalog.from_records(policies, version, fingerprint)
+    
+    def refresh(self, db: Optional[Session] = None, force: bool = True) -> PolicyCatalog:
+        """Reload the catalog from the DB (only if it changed unless force)"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            with self._refresh_lock:
+                fingerprint = self._fingerprint(db)
+                current = self._snapshot
+                if current is not None and not force and current.fingerprint == fingerprint:
+                    return current
+                
+                self._version += 1
+                version = self._version
+                catalog = self._build(db, version, fingerprint)
+                self._snapshot = catalog
+                logger.info(f"Policy catalog v{version} loaded ({len(catalog.policies)} policies)")
+                return catalog
+        finally:
+            if own_session:
+                db.close()
+    
+    def refresh_if_changed(self) -> PolicyCatalog:
+        return self.refresh(force=False)
+    
+    @property
+    def snapshot(self) -> PolicyCatalog:
+        """Current catalog, loading it on first use"""
+        catalog = self._snapshot
+        if catalog is None:
+            catalog = self.refresh()
+        return catalog
+    
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next read reloads from the DB"""
+        self._snapshot = None
+
+
+# Singleton instance
+policy_catalog = PolicyCatalogService()
@@ -0,0 +1,151 @@
+"""Pre-encoded, ETag-tagged policy detail and comparison responses"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core import settings
+from app.models import InsurancePolicy, InsuranceProvider
+from app.utils.fast_json import dumps
+
+
+@dataclass(frozen=True)
+class EncodedResponse:
+    """A JSON body encoded once, with its strong ETag"""
+    body: bytes
+    etag: str
+    
+    @classmethod
+    def from_content(cls, content: Any) -> "EncodedResponse":
+        body = dumps(content)
+        return cls(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class PolicyResponseCache:
+    """
+    LRU cache of encoded policy responses.
+    
+    Keys are ``("detail", policy_id)`` or ``("compare", policy_ids)``; each
+    entry remembers the version (the policies' ``updated_at``) it was built
+    from, and a lookup with a different version rebuilds it. Commits that
+    touch policies or providers evict the affected entries.
+    """
+    
+    def __init__(self, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Hashable, EncodedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get_or_build(
+        self,
+        key: Tuple,
+        version: Optional[Hashable],
+        build: Callable[[], Any]
+    ) -> Optional[EncodedResponse]:
+        """
+        Return the cached response for ``key`` at ``version``, or build,
+        encode and store it. A ``None`` version is never cached; ``build``
+        returning ``None`` (not found) yields ``None``.
+        """
+        if version is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+        
+        content = build()
+        if content is None:
+            return None
+        encoded = EncodedResponse.from_content(content)
+        
+        if version is not None and self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (version, encoded)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return encoded
+    
+    def invalidate_policies(self, policy_ids) -> None:
+        """Evict every detail and comparison that includes these policies"""
+        policy_ids = set(policy_ids)
+        with self._lock:
+            for key in list(self._entries):
+                kind, ids = key
+                if (ids in policy_ids) if kind == "detail" else not policy_ids.isdisjoint(ids):
+                    del self._entries[key]
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+policy_responses = PolicyResponseCache(
+    max_entries=settings.policy_response_cache_max_entries
+)
+
+
+# Invalidation: note changed rows at flush, evict once the commit succeeds
+
+@event.listens_for(InsurancePolicy, "after_insert")
+@event.listens_for(InsurancePolicy, "after_update")
+@event.listens_for(InsurancePolicy, "after_delete")
+def _policy_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_policy_ids", set()).add(target.id)
+
+
+@event.listens_for(InsuranceProvider, "after_update")
+@event.listens_for(InsuranceProvider, "after_delete")
+def _provider_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["providers_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_committed_changes(session):
+    if session.info.pop("providers_changed", False):
+        policy_responses.clear()
+    policy_ids = session.info.pop("changed_policy_ids", None)
+    if policy_ids:
+        policy_responses.invalidate_policies(policy_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back_changes(session, previous_transaction):
+    session.info.pop("providers_changed", None)
+    session.info.pop("changed_policy_ids", None)
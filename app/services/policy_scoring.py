@@ -0,0 +1,197 @@
+"""Vectorized policy scoring over a columnar view of the policy catalog"""
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.services.eligibility_index import EligibilityIndex
+from app.services.premium_tables import PremiumTable
+
+if TYPE_CHECKING:
+    from app.services.policy_catalog import PolicyRecord
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+def _column(values: Sequence, dtype=np.float64) -> np.ndarray:
+    """Build a read-only column, mapping None to NaN for float columns"""
+    if dtype is np.float64:
+        values = [np.nan if v is None else v for v in values]
+    return _readonly(np.asarray(values, dtype=dtype))
+
+
+@dataclass(frozen=True)
+class PolicyMatrix:
+    """
+    Column-per-attribute view of the policies of one insurance type.
+    
+    Missing numeric values are NaN so that comparisons against them are
+    False, matching the ``IS NOT NULL AND ...`` semantics of the old query.
+    """
+    records: Tuple["PolicyRecord", ...]
+    min_age: np.ndarray
+    max_age: np.ndarray
+    max_coverage: np.ndarray
+    health_base_score: np.ndarray
+    term_base_score: np.ndarray
+    waiting_bonus: np.ndarray
+    pre_existing_bonus: np.ndarray
+    valuable_rider_hits: np.ndarray
+    featured_bonus: np.ndarray
+    is_listed: np.ndarray
+    eligibility: EligibilityIndex
+    premiums: PremiumTable
+    
+    @classmethod
+    def from_records(cls, records: Sequence["PolicyRecord"]) -> "PolicyMatrix":
+        records = tuple(records)
+        # Falsy ratings are skipped by the scorer, same as None
+        nyvo_rating = _column([r.nyvo_rating or None for r in records])
+        rating_bonus = np.where(np.isnan(nyvo_rating), 0.0, nyvo_rating * 3)
+        # The first two score terms do not depend on the request
+        health_base = 50.0 + _column([r.health_csr_bonus for r in records]) + rating_bonus
+        term_base = 50.0 + _column([r.term_csr_bonus for r in records]) + rating_bonus
+        min_age = _column([r.min_age for r in records])
+        max_age = _column([r.max_age for r in records])
+        max_coverage = _column([r.max_coverage for r in records])
+        is_listed = _column([r.is_active and r.has_provider for r in records], bool)
+        return cls(
+            records=records,
+            min_age=min_age,
+            max_age=max_age,
+            max_coverage=max_coverage,
+            health_base_score=_readonly(health_base),
+            term_base_score=_readonly(term_base),
+            waiting_bonus=_column([r.waiting_bonus for r in records]),
+            pre_existing_bonus=_column([8.0 if r.covers_pre_existing else 0.0 for r in records]),
+            valuable_rider_hits=_column([r.valuable_rider_hits for r in records], np.int64),
+            featured_bonus=_column([5.0 if r.is_featured else 0.0 for r in records]),
+            is_listed=is_listed,
+            eligibility=EligibilityIndex(min_age, max_age, max_coverage, is_listed),
+            premiums=PremiumTable(records)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def eligible(self, age: int, coverage_needed: float) -> np.ndarray:
+        """Positions of active policies whose age band and cover fit the request"""
+        return self.eligibility.candidates(age, coverage_needed)
+    
+    def eligible_scan(self, age: int, coverage_needed: float) -> np.ndarray:
+        """Full-scan equivalent of ``eligible``, kept as its reference"""
+        mask = (
+            self.is_listed
+            & (self.min_age <= age)
+            & (self.max_age >= age)
+            & (self.max_coverage >= coverage_needed)
+        )
+        return np.flatnonzero(mask)
+
+
+# Every score is accumulated term by term in the same order as the original
+# per-policy Python code, adding 0.0 where a branch did not fire, so the
+# float64 results are bit-for-bit identical to the scalar implementation.
+# Branches are boolean masks times a constant (cheaper than np.where), and
+# tiers are mutually exclusive masks so at most one constant is non-zero.
+
+def score_health(
+    matrix: PolicyMatrix,
+    idx: np.ndarray,
+    age: int,
+    coverage_needed: float,
+    budget_monthly: Optional[float],
+    family_size: int,
+    pre_existing_conditions: Optional[List[str]],
+    city: Optional[str]
+) -> np.ndarray:
+    """Health match scores for the policies at positions ``idx``"""
+    score = matrix.health_base_score[idx]
+    
+    if coverage_needed:
+        max_coverage = matrix.max_coverage[idx]
+        coverage_ratio = max_coverage / coverage_needed
+        covered = max_coverage != 0
+        score += (covered & (coverage_ratio >= 1) & (coverage_ratio <= 2)) * 10.0
+        score += (covered & (coverage_ratio > 2)) * 5.0
+    
+    if budget_monthly:
+        # NaN quotes (unpriced policies) fail both comparisons
+        monthly_premium = matrix.premiums.quote_rows(
+            idx, age, family_size, city, None, coverage_needed
+        ) / 12
+        within_budget = monthly_premium <= budget_monthly
+        score += within_budget * 10.0
+        score += (~within_budget & (monthly_premium <= budget_monthly * 1.2)) * 5.0
+    
+    score += matrix.waiting_bonus[idx]
+    
+    if pre_existing_conditions:
+        score += matrix.pre_existing_bonus[idx]
+    
+    score += matrix.featured_bonus[idx]
+    return score
+
+
+def score_term(
+    matrix: PolicyMatrix,
+    idx: np.ndarray,
+    age: int,
+    coverage_needed: float,
+    annual_income: Optional[float],
+    smoker: bool,
+    budget_monthly: Optional[float]
+) -> np.ndarray:
+    """Term match scores for the policies at positions ``idx``"""
+    score = matrix.term_base_score[idx]
+    
+    if annual_income and coverage_needed:
+        recommended_coverage = annual_income * 12
+        if coverage_needed >= recommended_coverage * 0.8:
+            score += 10.0
+    
+    if budget_monthly:
+        monthly_premium = matrix.premiums.quote_rows(
+            idx, age, 1, None, smoker, coverage_needed
+        ) / 12
+        score += (monthly_premium <= budget_monthly) * 10.0
+    
+    # One +3 per valuable rider, added one at a time like the original loop
+    hits = matrix.valuable_rider_hits[idx]
+    for k in range(int(hits.max()) if len(hits) else 0):
+        score += (hits > k) * 3.0
+    
+    score += matrix.featured_bonus[idx]
+    return score
+
+
+def top_k(idx: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    """
+    Best ``k`` (position, score) pairs, highest score first.
+    
+    Ranking uses the capped score and ties keep catalog order, like the
+    stable ``list.sort`` this replaces. ``argpartition`` finds the k-th best
+    score in linear time; only the candidates at or above it are sorted.
+    """
+    n = len(idx)
+    if n == 0 or k <= 0:
+        return []
+    
+    ranked = np.minimum(scores, 100.0)
+    candidates = np.arange(n)
+    if k < n:
+        kth = np.argpartition(-ranked, k - 1)[:k]
+        candidates = np.flatnonzero(ranked >= ranked[kth].min())
+    
+    # candidates are in catalog order, so a stable sort keeps ties in it
+    order = candidates[np.argsort(-ranked[candidates], kind="stable")][:k]
+    return [(int(idx[i]), capped_score(scores[i])) for i in order]
+
+
+def capped_score(score: np.floating) -> Union[float, int]:
+    """Python equivalent of ``min(score, 100)`` on the scalar path"""
+    score = float(score)
+    return score if score <= 100 else 100
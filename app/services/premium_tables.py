@@ -0,0 +1,197 @@
+"""Premium quoting from policy premium_factors, compiled into dense lookup tables
+
+``premium_factors`` on a policy is an optional JSON object; every key is
+optional and a missing key means "no adjustment" (multiplier 1.0)::
+
+    {
+        "age_bands": [[18, 35, 1.0], [36, 45, 1.35], [46, 65, 2.1]],
+        "family_size": {"1": 1.0, "2": 1.65, "3": 1.9, "4": 2.2},
+        "city_tier": {"1": 1.15, "2": 1.0, "3": 0.9},
+        "smoker": 1.6,
+        "sum_insured_slabs": [[500000, 1.0], [1000000, 1.45], [2500000, 2.1]]
+    }
+
+- age_bands: ``[min_age, max_age, multiplier]``, inclusive
+- family_size: members covered; larger families use the largest size listed
+- city_tier: 1 = metro, 2 = other large cities, 3 = everything else listed
+  in CITY_TIERS; unknown or missing cities are not adjusted
+- sum_insured_slabs: ``[up_to, multiplier]``; the first slab whose ``up_to``
+  is >= the sum insured applies, and the last slab applies above all of them
+
+quote = base_premium x age x family x city tier x smoker x sum insured
+"""
+import json
+import logging
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.services.policy_catalog import PolicyRecord
+
+logger = logging.getLogger(__name__)
+
+
+MAX_AGE = 120
+MAX_FAMILY_SIZE = 10
+
+CITY_TIERS = {
+    **{city: 1 for city in (
+        "mumbai", "delhi", "new delhi", "bangalore", "bengaluru", "chennai",
+        "kolkata", "hyderabad", "pune", "ahmedabad", "gurgaon", "gurugram", "noida"
+    )},
+    **{city: 2 for city in (
+        "jaipur", "lucknow", "chandigarh", "indore", "kochi", "coimbatore", "nagpur",
+        "surat", "bhopal", "visakhapatnam", "vadodara", "patna", "bhubaneswar", "mysore"
+    )},
+}
+
+
+def city_tier(city: Optional[str]) -> int:
+    """Tier 1-3 for a known city, 0 (no adjustment) otherwise"""
+    if not city:
+        return 0
+    return CITY_TIERS.get(city.strip().lower(), 0)
+
+
+def _age_row(factors: dict) -> Tuple[float, ...]:
+    row = [1.0] * (MAX_AGE + 1)
+    for band in factors.get("age_bands") or []:
+        low, high, multiplier = band
+        for age in range(max(int(low), 0), min(int(high), MAX_AGE) + 1):
+            row[age] = float(multiplier)
+    return tuple(row)
+
+
+def _family_row(factors: dict) -> Tuple[float, ...]:
+    sizes = {int(k): float(v) for k, v in (factors.get("family_size") or {}).items()}
+    row = [1.0] * (MAX_FAMILY_SIZE + 1)
+    current = 1.0
+    for size in range(1, MAX_FAMILY_SIZE + 1):
+        current = sizes.get(size, current)
+        row[size] = current
+    return tuple(row)
+
+
+def _tier_row(factors: dict) -> Tuple[float, ...]:
+    tiers = {int(k): float(v) for k, v in (factors.get("city_tier") or {}).items()}
+    return (1.0,) + tuple(tiers.get(tier, 1.0) for tier in (1, 2, 3))
+
+
+def _slabs(factors: dict) -> Tuple[Tuple[float, float], ...]:
+    return tuple(sorted((float(up_to), float(m)) for up_to, m in factors.get("sum_insured_slabs") or []))
+
+
+def _dedupe(rows: Sequence[tuple]) -> Tuple[np.ndarray, np.ndarray]:
+    """Unique rows as a dense table, plus each input's row number in it"""
+    if not rows:
+        return np.ones((0, 0)), np.empty(0, dtype=np.int64)
+    positions: Dict[tuple, int] = {}
+    ids = np.fromiter((positions.setdefault(row, len(positions)) for row in rows), dtype=np.int64, count=len(rows))
+    table = np.array(list(positions), dtype=np.float64).reshape(len(positions), -1)
+    return table, ids
+
+
+class PremiumTable:
+    """
+    Quotes for the policies of one insurance type.
+    
+    Each factor kind is compiled into a dense table of distinct schedules
+    (most policies share them), so a quote is a handful of array lookups:
+    age, family size and tier index their table directly, and the sum
+    insured maps to a cell of one catalog-wide slab grid.
+    """
+    
+    def __init__(self, records: Sequence["PolicyRecord"]):
+        self._row_of = {r.id: i for i, r in enumerate(records)}
+        self.base_premium = np.array(
+            [r.base_premium or np.nan for r in records], dtype=np.float64
+        )
+        
+        # Many policies share identical factors; parse each distinct one once
+        parsed_by_key: Dict[str, tuple] = {}
+        parsed = []
+        for r in records:
+            key = json.dumps(r.premium_factors, sort_keys=True, default=str)
+            if key not in parsed_by_key:
+                parsed_by_key[key] = self._parse(r)
+            parsed.append(parsed_by_key[key])
+        
+        self._age_table, self._age_ids = _dedupe([p[0] for p in parsed])
+        self._family_table, self._family_ids = _dedupe([p[1] for p in parsed])
+        self._tier_table, self._tier_ids = _dedupe([p[2] for p in parsed])
+        self._smoker = np.array([p[3] for p in parsed], dtype=np.float64)
+        
+        # Sum insured grid: cell j holds (grid[j-1], grid[j]], the last cell
+        # everything above the largest slab boundary of any policy
+        self._grid = np.unique([up_to for p in parsed for up_to, _ in p[4]])
+        bounds = list(self._grid) + [np.inf]
+        slab_rows: Dict[tuple, tuple] = {}
+        for slabs in {p[4] for p in parsed}:
+            slab_rows[slabs] = tuple(
+                next((m for up_to, m in slabs if up_to >= bound), slabs[-1][1]) if slabs else 1.0
+                for bound in bounds
+            )
+        self._slab_table, self._slab_ids = _dedupe([slab_rows[p[4]] for p in parsed])
+    
+    @staticmethod
+    def _parse(record: "PolicyRecord") -> tuple:
+        factors = record.premium_factors if isinstance(record.premium_factors, dict) else {}
+        try:
+            return (
+                _age_row(factors), _family_row(factors), _tier_row(factors),
+                float(factors.get("smoker", 1.0)), _slabs(factors)
+            )
+        except (AttributeError, TypeError, ValueError) as e:
+            # e.g. family_size given as a list: quote the base premium instead
+            logger.warning(f"Ignoring malformed premium_factors on policy {record.id}: {e}")
+            return _age_row({}), _family_row({}), _tier_row({}), 1.0, ()
+    
+    def quote_rows(
+        self,
+        rows: np.ndarray,
+        age: int,
+        family_size: int = 1,
+        city: Optional[str] = None,
+        smoker: Optional[bool] = None,
+        sum_insured: Optional[float] = None
+    ) -> np.ndarray:
+        """Annual premiums for the policies at positions ``rows`` (NaN if unpriced)"""
+        if len(rows) == 0:
+            return np.empty(0)
+        age = min(max(int(age), 0), MAX_AGE)
+        family_size = min(max(int(family_size or 1), 1), MAX_FAMILY_SIZE)
+        
+        premium = self.base_premium[rows] * self._age_table[self._age_ids[rows], age]
+        premium *= self._family_table[self._family_ids[rows], family_size]
+        premium *= self._tier_table[self._tier_ids[rows], city_tier(city)]
+        if smoker:
+            premium *= self._smoker[rows]
+        if sum_insured is not None and len(self._grid):
+            cell = int(np.searchsorted(self._grid, sum_insured, side="left"))
+            premium *= self._slab_table[self._slab_ids[rows], cell]
+        return premium
+    
+    def quote(
+        self,
+        policy: "PolicyRecord",
+        age: int,
+        family_size: int = 1,
+        city: Optional[str] = None,
+        smoker: Optional[bool] = None,
+        sum_insured: Optional[float] = None
+    ) -> Optional[float]:
+        """Annual premium for one policy, or None if it has no base premium"""
+        premium = self.quote_rows(
+            np.array([self._row_of[policy.id]]), age, family_size, city, smoker, sum_insured
+        )[0]
+        return None if np.isnan(premium) else float(premium)
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "age_schedules": len(self._age_table),
+            "family_schedules": len(self._family_table),
+            "tier_schedules": len(self._tier_table),
+            "slab_schedules": len(self._slab_table),
+            "sum_insured_cells": len(self._grid) + 1
+        }
@@ -0,0 +1,291 @@
+"""Token-budgeted prompt assembly for chat completions"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.core import settings
+from app.utils.tokens import get_encoding
+
+logger = logging.getLogger(__name__)
+
+
+# Context window sizes (tokens) for models we run against; unknown models
+# fall back to DEFAULT_CONTEXT_WINDOW.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat format overhead per message and for priming the assistant reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_REPLY_PRIMING = 3
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+def context_window_for(model: str) -> int:
+    """Context window for a model, matching dated variants by prefix"""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def format_recommendations(recommendations: List[Dict]) -> str:
+    """Render recommended policies for the LLM prompt"""
+    rec_text = "\n\nRecommended Policies from NYVO Database:\n"
+    for i, rec in enumerate(recommendations, 1):
+        rec_text += f"""
+{i}. {rec['name']} by {rec['provider']}
+   - Match Score: {rec['match_score']}%
+   - Coverage: ₹{rec['coverage_range']['min']/100000:.0f}L - ₹{rec['coverage_range']['max']/100000:.0f}L
+   - Base Premium: ₹{rec['base_premium']:,.0f}/{rec['premium_frequency']}
+   - Claim Settlement Ratio: {rec['claim_settlement_ratio']}%
+   - Key Features: {', '.join(rec['key_features'][:3]) if rec['key_features'] else 'N/A'}
+"""
+    return rec_text + "\nPlease present these recommendations to the user in a helpful way, explaining why each might be suitable."
+
+
+def format_user_content(
+    user_message: str,
+    context_chunks: List[str],
+    recommendations: Optional[List[Dict]] = None
+) -> str:
+    """Build the final user turn with knowledge-base context and recommendations"""
+    user_content = user_message
+    
+    if context_chunks:
+        user_content = f"""User Question: {user_message}
+
+---
+Relevant Information from NYVO Knowledge Base:
+{CONTEXT_SEPARATOR.join(context_chunks)}
+---
+
+Please answer the user's question using the above context when relevant."""
+
+    if recommendations:
+        user_content += format_recommendations(recommendations)
+    
+    return user_content
+
+
+@dataclass
+class PromptUsage:
+    """Token accounting for one assembled prompt"""
+    budget: int
+    system_tokens: int = 0
+    user_tokens: int = 0
+    history_tokens: int = 0
+    summary_tokens: int = 0
+    context_tokens: int = 0
+    history_kept: int = 0
+    history_dropped: int = 0
+    context_kept: int = 0
+    context_dropped: int = 0
+    
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.system_tokens + self.user_tokens + self.history_tokens
+            + self.summary_tokens + TOKENS_REPLY_PRIMING
+        )
+    
+    def as_dict(self) -> Dict:
+        return {**self.__dict__, "total_tokens": self.total_tokens}
+
+
+class PromptBuilder:
+    """
+    Assembles chat messages under a per-model token budget.
+    
+    The system prompt and the current user turn (with recommendations) are
+    always sent. The remaining budget is shared between knowledge-base
+    context, filled best-ranked first so the lowest-ranked chunks are dropped
+    first, and conversation history, filled newest first. History that does
+    not fit is replaced by a short summary of the earlier user turns.
+    """
+    
+    def __init__(
+        self,
+        system_prompt: str,
+        model: Optional[str] = None,
+        max_response_tokens: Optional[int] = None,
+        max_prompt_tokens: Optional[int] = None,
+        max_history_messages: Optional[int] = None,
+        history_share: Optional[float] = None,
+        summary_tokens: Optional[int] = None
+    ):
+        self.system_prompt = system_prompt
+        self.model = model or settings.openai_model
+        self.max_response_tokens = max_response_tokens or settings.openai_max_tokens
+        self.max_prompt_tokens = max_prompt_tokens or settings.prompt_max_tokens
+        self.max_history_messages = max_history_messages or settings.prompt_max_history_messages
+        self.history_share = settings.prompt_history_share if history_share is None else history_share
+        self.summary_tokens = settings.prompt_summary_tokens if summary_tokens is None else summary_tokens
+        self._encoding = None
+        self._system_tokens: Optional[int] = None
+        # Usage of the most recent build; a shared builder overwrites it per request
+        self.last_usage: Optional[PromptUsage] = None
+    
+    @property
+    def budget(self) -> int:
+        """Prompt tokens allowed: model window minus the reply, capped by settings"""
+        window_budget = context_window_for(self.model) - self.max_response_tokens
+        if self.max_prompt_tokens:
+            return min(window_budget, self.max_prompt_tokens)
+        return window_budget
+    
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            self._encoding = get_encoding(model=self.model)
+        return self._encoding
+    
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def _message_tokens(self, content: str) -> int:
+        return self.count_tokens(content) + TOKENS_PER_MESSAGE
+    
+    def _summarize_history(
+        self,
+        dropped: List[Dict],
+        budget: int,
+        earlier_questions: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """Compact extractive summary of the user turns that were trimmed"""
+        questions = list(earlier_questions or []) + [
+            m.get("content", "") for m in dropped if m.get("role") == "user"
+        ]
+        questions = [q.strip() for q in questions]
+        questions = [q if len(q) <= 160 else q[:157] + "..." for q in questions if q]
+        if not questions or budget <= TOKENS_PER_MESSAGE:
+            return None
+        
+        header = "Summary of earlier conversation (older messages omitted). The user previously asked:"
+        used = self._message_tokens(header)
+        # Prefer the most recent of the dropped questions
+        lines: List[str] = []
+        for question in reversed(questions):
+            line = f"- {question}"
+            cost = self.count_tokens("\n" + line)
+            if used + cost > budget:
+                break
+            lines.insert(0, line)
+            used += cost
+        return "\n".join([header] + lines) if lines else None
+    
+    def build(
+        self,
+        user_message: str,
+        conversation_history: List[Dict],
+        context_chunks: List[str],
+        recommendations: Optional[List[Dict]] = None,
+        earlier_questions: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Build the message list for the chat completion within budget.
+        
+        ``earlier_questions`` are user questions from turns that are no longer
+        in ``conversation_history`` (e.g. rolled out of server-side memory);
+        they are folded into the history summary.
+        """
+        budget = self.budget
+        usage = PromptUsage(budget=budget)
+        
+        if self._system_tokens is None:
+            self._system_tokens = self._message_tokens(self.system_prompt)
+        usage.system_tokens = self._system_tokens
+        
+        base_user_content = format_user_content(user_message, [], recommendations)
+        base_user_tokens = self._message_tokens(base_user_content)
+        usage.user_tokens = base_user_tokens
+        remaining = max(budget - usage.total_tokens, 0)
+        
+        history = conversation_history[-self.max_history_messages:]
+        history_costs = [self._message_tokens(msg.get("content", "")) for msg in history]
+        
+        # Keep room for a summary if some history is going to be trimmed
+        summary_reserve = 0
+        if self.summary_tokens and (
+            earlier_questions
+            or len(history) < len(conversation_history)
+            or sum(history_costs) > remaining * self.history_share
+        ):
+            summary_reserve = min(self.summary_tokens, remaining // 4)
+            remaining -= summary_reserve
+        
+        # Newest history first, up to its share of the remaining budget
+        history_cap = int(remaining * self.history_share)
+        history_tokens = 0
+        index = len(history)
+        while index > 0 and history_tokens + history_costs[index - 1] <= history_cap:
+            index -= 1
+            history_tokens += history_costs[index]
+        
+        # Context fills what's left, best-ranked chunk first
+        context_budget = remaining - history_tokens
+        if context_chunks:
+            # Wrapping the question in the context template costs a few tokens
+            context_budget -= self._message_tokens(format_user_content(user_message, [""])) - self._message_tokens(user_message)
+        kept_context: List[str] = []
+        for chunk in context_chunks:
+            cost = self.count_tokens(chunk + CONTEXT_SEPARATOR)
+            if cost > context_budget:
+                break
+            kept_context.append(chunk)
+            context_budget -= cost
+        usage.context_kept = len(kept_context)
+        usage.context_dropped = len(context_chunks) - len(kept_context)
+        
+        # Leftover budget goes back to older history
+        leftover = max(context_budget, 0)
+        while index > 0 and history_costs[index - 1] <= leftover:
+            index -= 1
+            history_tokens += history_costs[index]
+            leftover -= history_costs[index]
+        
+        kept_history = history[index:]
+        dropped_history = conversation_history[:len(conversation_history) - len(kept_history)]
+        usage.history_kept = len(kept_history)
+        usage.history_dropped = len(dropped_history)
+        usage.history_tokens = history_tokens
+        
+        messages = [{"role": "system", "content": self.system_prompt}]
+        
+        if (dropped_history or earlier_questions) and summary_reserve:
+            summary = self._summarize_history(dropped_history, summary_reserve + leftover, earlier_questions)
+            if summary:
+                messages.append({"role": "system", "content": summary})
+                usage.summary_tokens = self._message_tokens(summary)
+        
+        for msg in kept_history:
+            messages.append({
+                "role": msg.get("role", "user"),
+                "content": msg.get("content", "")
+            })
+        
+        user_content = format_user_content(user_message, kept_context, recommendations)
+        usage.user_tokens = self._message_tokens(user_content)
+        usage.context_tokens = usage.user_tokens - base_user_tokens
+        messages.append({"role": "user", "content": user_content})
+        
+        self.last_usage = usage
+        logger.info(
+            "Prompt tokens: total=%d budget=%d system=%d user=%d (context=%d) history=%d summary=%d "
+            "context_chunks=%d/%d history_messages=%d/%d",
+            usage.total_tokens, budget, usage.system_tokens, usage.user_tokens,
+            usage.context_tokens, usage.history_tokens, usage.summary_tokens,
+            usage.context_kept, len(context_chunks),
+            usage.history_kept, len(conversation_history)
+        )
+        
+        return messages
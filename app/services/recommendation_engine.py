@@ -1,16 +1,27 @@
 """Policy recommendation engine based on user requirements"""
-from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
+import numpy as np
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
 
 from app.models import InsurancePolicy, InsuranceProvider, UserProfile, InsuranceType
+from app.services.policy_catalog import policy_catalog, PolicyCatalog, PolicyRecord
+from app.services.policy_scoring import PolicyMatrix, score_health, score_term, top_k
 
 
 class RecommendationEngine:
     """Engine for generating personalized insurance policy recommendations"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, catalog: Optional[PolicyCatalog] = None):
         self.db = db
+        self._catalog = catalog
+    
+    @property
+    def catalog(self) -> PolicyCatalog:
+        """Policy catalog snapshot, pinned for the lifetime of this engine"""
+        if self._catalog is None:
+            self._catalog = policy_catalog.snapshot
+        return self._catalog
     
     def get_health_insurance_recommendations(
         self,
@@ -24,34 +35,19 @@ class RecommendationEngine:
     ) -> List[Dict]:
         """Get health insurance recommendations based on user requirements"""
         
-        query = self.db.query(InsurancePolicy).join(InsuranceProvider).filter(
-            InsurancePolicy.insurance_type == InsuranceType.HEALTH,
-            InsurancePolicy.is_active == True,
-            InsurancePolicy.min_age <= age,
-            InsurancePolicy.max_age >= age,
-            InsurancePolicy.max_coverage >= coverage_needed
-        )
-        
-        policies = query.all()
-        
-        # Score and rank policies
-        scored_policies = []
-        for policy in policies:
-            score = self._calculate_health_score(
-                policy, age, coverage_needed, budget_monthly, 
-                family_size, pre_existing_conditions, city
-            )
-            scored_policies.append((policy, score))
-        
-        # Sort by score descending
-        scored_policies.sort(key=lambda x: x[1], reverse=True)
+        matrix = self.catalog.matrix_of_type(InsuranceType.HEALTH.value)
+        idx = matrix.eligible(age, coverage_needed)
         
-        # Return top recommendations
-        recommendations = []
-        for policy, score in scored_policies[:limit]:
-            recommendations.append(self._format_policy_recommendation(policy, score))
+        # Score all eligible policies at once and keep the best `limit`
+        scores = score_health(
+            matrix, idx, age, coverage_needed, budget_monthly,
+            family_size, pre_existing_conditions, city
+        )
         
-        return recommendations
+        return self._format_ranked(
+            matrix, top_k(idx, scores, limit),
+            (age, family_size, city, None, coverage_needed)
+        )
     
     def get_term_insurance_recommendations(
         self,
@@ -65,38 +61,85 @@ class RecommendationEngine:
     ) -> List[Dict]:
         """Get term insurance recommendations based on user requirements"""
         
-        query = self.db.query(InsurancePolicy).join(InsuranceProvider).filter(
-            InsurancePolicy.insurance_type == InsuranceType.TERM_LIFE,
-            InsurancePolicy.is_active == True,
-            InsurancePolicy.min_age <= age,
-            InsurancePolicy.max_age >= age,
-            InsurancePolicy.max_coverage >= coverage_needed
-        )
+        matrix = self.catalog.matrix_of_type(InsuranceType.TERM_LIFE.value)
+        idx = matrix.eligible(age, coverage_needed)
         
-        policies = query.all()
+        # Score all eligible policies at once and keep the best `limit`
+        scores = score_term(
+            matrix, idx, age, coverage_needed, annual_income, smoker, budget_monthly
+        )
         
-        # Score and rank policies
-        scored_policies = []
-        for policy in policies:
-            score = self._calculate_term_score(
-                policy, age, coverage_needed, annual_income,
-                smoker, policy_term, budget_monthly
-            )
-            scored_policies.append((policy, score))
+        return self._format_ranked(
+            matrix, top_k(idx, scores, limit),
+            (age, 1, None, smoker, coverage_needed)
+        )
+    
+    def batch_health_insurance_recommendations(
+        self,
+        requests: Iterable[Dict],
+        limit: int = 5
+    ) -> Iterator[List[Dict]]:
+        """
+        Health recommendations for many leads, yielded in request order.
         
-        # Sort by score descending
-        scored_policies.sort(key=lambda x: x[1], reverse=True)
+        Every lead is scored against the same catalog snapshot, and the
+        eligibility mask is computed once per distinct (age, coverage) pair.
+        Each request takes the keyword arguments of
+        get_health_insurance_recommendations.
+        """
+        matrix = self.catalog.matrix_of_type(InsuranceType.HEALTH.value)
+        eligible = {}
         
-        # Return top recommendations
-        recommendations = []
-        for policy, score in scored_policies[:limit]:
-            recommendations.append(self._format_policy_recommendation(policy, score))
+        for request in requests:
+            key = (request["age"], request["coverage_needed"])
+            idx = eligible.get(key)
+            if idx is None:
+                idx = eligible[key] = matrix.eligible(*key)
+            
+            quote_args = (
+                request["age"], request.get("family_size", 1), request.get("city"),
+                None, request["coverage_needed"]
+            )
+            scores = score_health(
+                matrix, idx, request["age"], request["coverage_needed"],
+                request.get("budget_monthly"), request.get("family_size", 1),
+                request.get("pre_existing_conditions"), request.get("city")
+            )
+            yield self._format_ranked(matrix, top_k(idx, scores, limit), quote_args)
+    
+    def batch_term_insurance_recommendations(
+        self,
+        requests: Iterable[Dict],
+        limit: int = 5
+    ) -> Iterator[List[Dict]]:
+        """Term counterpart of batch_health_insurance_recommendations"""
+        matrix = self.catalog.matrix_of_type(InsuranceType.TERM_LIFE.value)
+        eligible = {}
         
-        return recommendations
+        for request in requests:
+            key = (request["age"], request["coverage_needed"])
+            idx = eligible.get(key)
+            if idx is None:
+                idx = eligible[key] = matrix.eligible(*key)
+            
+            quote_args = (
+                request["age"], 1, None, request.get("smoker", False), request["coverage_needed"]
+            )
+            scores = score_term(
+                matrix, idx, request["age"], request["coverage_needed"],
+                request.get("annual_income"), request.get("smoker", False),
+                request.get("budget_monthly")
+            )
+            yield self._format_ranked(matrix, top_k(idx, scores, limit), quote_args)
+    
+    # Per-policy reference implementations of the vectorized scorers in
+    # policy_scoring; scripts/benchmark_scoring.py checks that both agree,
+    # and tests/test_recommendation_scoring.py pins both to the scores of
+    # the original ORM implementation.
     
     def _calculate_health_score(
         self,
-        policy: InsurancePolicy,
+        policy: PolicyRecord,
         age: int,
         coverage_needed: float,
         budget_monthly: Optional[float],
@@ -108,14 +151,7 @@ class RecommendationEngine:
         score = 50.0  # Base score
         
         # Provider claim settlement ratio (very important for health)
-        if policy.provider and policy.provider.claim_settlement_ratio:
-            csr = policy.provider.claim_settlement_ratio
-            if csr >= 95:
-                score += 20
-            elif csr >= 90:
-                score += 15
-            elif csr >= 85:
-                score += 10
+        score += policy.health_csr_bonus
         
         # NYVO rating
         if policy.nyvo_rating:
@@ -131,24 +167,20 @@ class RecommendationEngine:
         
         # Budget consideration
         if budget_monthly and policy.base_premium:
-            monthly_premium = policy.base_premium / 12
+            monthly_premium = self.catalog.quote(
+                policy, age, family_size, city, None, coverage_needed
+            ) / 12
             if monthly_premium <= budget_monthly:
                 score += 10
             elif monthly_premium <= budget_monthly * 1.2:
                 score += 5
         
         # Waiting period (lower is better)
-        if policy.waiting_period_days:
-            if policy.waiting_period_days <= 30:
-                score += 5
-            elif policy.waiting_period_days <= 90:
-                score += 3
+        score += policy.waiting_bonus
         
         # Pre-existing condition handling
-        if pre_existing_conditions and policy.coverage_details:
-            pec_coverage = policy.coverage_details.get('pre_existing_coverage', {})
-            if pec_coverage.get('covered_after_waiting'):
-                score += 8
+        if pre_existing_conditions and policy.covers_pre_existing:
+            score += 8
         
         # Featured policy bonus
         if policy.is_featured:
@@ -158,7 +190,7 @@ class RecommendationEngine:
     
     def _calculate_term_score(
         self,
-        policy: InsurancePolicy,
+        policy: PolicyRecord,
         age: int,
         coverage_needed: float,
         annual_income: Optional[float],
@@ -170,14 +202,7 @@ class RecommendationEngine:
         score = 50.0  # Base score
         
         # Provider claim settlement ratio (critical for term)
-        if policy.provider and policy.provider.claim_settlement_ratio:
-            csr = policy.provider.claim_settlement_ratio
-            if csr >= 98:
-                score += 25
-            elif csr >= 95:
-                score += 20
-            elif csr >= 90:
-                score += 10
+        score += policy.term_csr_bonus
         
         # NYVO rating
         if policy.nyvo_rating:
@@ -191,17 +216,15 @@ class RecommendationEngine:
         
         # Budget consideration
         if budget_monthly and policy.base_premium:
-            monthly_premium = policy.base_premium / 12
+            monthly_premium = self.catalog.quote(
+                policy, age, 1, None, smoker, coverage_needed
+            ) / 12
             if monthly_premium <= budget_monthly:
                 score += 10
         
         # Riders availability
-        if policy.riders_available:
-            riders = policy.riders_available
-            valuable_riders = ['critical_illness', 'accidental_death', 'waiver_of_premium']
-            for rider in valuable_riders:
-                if rider in [r.get('type', '').lower() for r in riders if isinstance(r, dict)]:
-                    score += 3
+        for _ in range(policy.valuable_rider_hits):
+            score += 3
         
         # Featured policy bonus
         if policy.is_featured:
@@ -209,14 +232,35 @@ class RecommendationEngine:
         
         return min(score, 100)  # Cap at 100
     
-    def _format_policy_recommendation(self, policy: InsurancePolicy, score: float) -> Dict:
+    def _format_ranked(
+        self,
+        matrix: PolicyMatrix,
+        ranked: List[Tuple[int, float]],
+        quote_args: tuple
+    ) -> List[Dict]:
+        """Format top_k output, quoting the chosen policies in one lookup"""
+        rows = np.fromiter((i for i, _ in ranked), dtype=np.int64, count=len(ranked))
+        quotes = matrix.premiums.quote_rows(rows, *quote_args)
+        return [
+            self._format_policy_recommendation(
+                matrix.records[i], score, None if np.isnan(quote) else float(quote)
+            )
+            for (i, score), quote in zip(ranked, quotes)
+        ]
+    
+    def _format_policy_recommendation(
+        self,
+        policy: PolicyRecord,
+        score: float,
+        quoted_premium: Optional[float] = None
+    ) -> Dict:
         """Format policy as recommendation response"""
         return {
             "policy_id": policy.id,
             "name": policy.name,
-            "provider": policy.provider.name if policy.provider else "Unknown",
-            "provider_logo": policy.provider.logo_url if policy.provider else None,
-            "insurance_type": policy.insurance_type.value,
+            "provider": policy.provider_name,
+            "provider_logo": policy.provider_logo,
+            "insurance_type": policy.insurance_type,
             "match_score": round(score, 1),
             "coverage_range": {
                 "min": policy.min_coverage,
@@ -224,24 +268,35 @@ class RecommendationEngine:
             },
             "base_premium": policy.base_premium,
             "premium_frequency": policy.premium_frequency,
-            "key_features": policy.key_features or [],
-            "riders_available": policy.riders_available or [],
-            "claim_settlement_ratio": policy.provider.claim_settlement_ratio if policy.provider else None,
+            "quoted_premium": quoted_premium,
+            "key_features": list(policy.key_features),
+            "riders_available": list(policy.riders_available),
+            "claim_settlement_ratio": policy.claim_settlement_ratio,
             "nyvo_rating": policy.nyvo_rating,
             "customer_rating": policy.customer_rating,
             "waiting_period_days": policy.waiting_period_days,
             "description": policy.description
         }
     
+    def _load_policies(self, policy_ids: List[int]) -> List[InsurancePolicy]:
+        """Load policies with their providers in a single query"""
+        return self.db.query(InsurancePolicy).options(
+            joinedload(InsurancePolicy.provider)
+        ).filter(
+            InsurancePolicy.id.in_(policy_ids)
+        ).all()
+    
     def get_policy_details(self, policy_id: int) -> Optional[Dict]:
         """Get detailed information about a specific policy"""
-        policy = self.db.query(InsurancePolicy).filter(
-            InsurancePolicy.id == policy_id
-        ).first()
+        policies = self._load_policies([policy_id])
         
-        if not policy:
+        if not policies:
             return None
         
+        return self._format_policy_details(policies[0])
+    
+    def _format_policy_details(self, policy: InsurancePolicy) -> Dict:
+        """Format a policy (with its provider already loaded) as a detail response"""
         return {
             "policy_id": policy.id,
             "name": policy.name,
@@ -285,8 +340,6 @@ class RecommendationEngine:
     
     def compare_policies(self, policy_ids: List[int]) -> List[Dict]:
         """Compare multiple policies side by side"""
-        policies = self.db.query(InsurancePolicy).filter(
-            InsurancePolicy.id.in_(policy_ids)
-        ).all()
+        policies = self._load_policies(policy_ids)
         
-        return [self.get_policy_details(p.id) for p in policies]
+        return [self._format_policy_details(p) for p in policies]
@@ -0,0 +1,182 @@
+"""Semantic response cache for repeated knowledge-base questions"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core import settings
+
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = _NON_WORD.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def context_fingerprint(context: Union[str, List[str]]) -> str:
+    """Stable fingerprint of the retrieved knowledge-base context"""
+    if not isinstance(context, str):
+        context = "\x1e".join(context)
+    return hashlib.sha1(context.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    """A cached assistant answer and the lookup data that produced it"""
+    response: str
+    fingerprint: str
+    embedding: Optional[np.ndarray]
+    created_at: float
+
+
+class SemanticResponseCache:
+    """
+    LRU + TTL cache of assistant responses.
+    
+    Entries are keyed by (normalized question, context fingerprint). On an
+    exact-key miss, entries sharing the same context fingerprint are scanned
+    for a query embedding with cosine similarity above the threshold, so
+    near-duplicate phrasings of the same question also hit.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._by_fingerprint: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _normalize_embedding(embedding: Optional[List[float]]) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def _is_expired(self, entry: CachedResponse, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+    
+    def _remove(self, key: Tuple[str, str]) -> None:
+        self._entries.pop(key, None)
+        keys = self._by_fingerprint.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_fingerprint[key[1]]
+    
+    def get(
+        self,
+        question: str,
+        fingerprint: str,
+        embedding: Optional[List[float]] = None
+    ) -> Optional[str]:
+        """Return a cached response for the question/context pair, if any"""
+        key = (normalize_question(question), fingerprint)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_expired(entry, now):
+                    self._remove(key)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.response
+            
+            query_vector = self._normalize_embedding(embedding)
+            if query_vector is not None:
+                best_key, best_score = None, self.similarity_threshold
+                for candidate_key in list(self._by_fingerprint.get(fingerprint, ())):
+                    candidate = self._entries[candidate_key]
+                    if self._is_expired(candidate, now):
+                        self._remove(candidate_key)
+                        continue
+                    if candidate.embedding is None:
+                        continue
+                    score = float(np.dot(query_vector, candidate.embedding))
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    return self._entries[best_key].response
+            
+            self.misses += 1
+            return None
+    
+    def put(
+        self,
+        question: str,
+        fingerprint: str,
+        response: str,
+        embedding: Optional[List[float]] = None
+    ) -> None:
+        """Store a response, evicting the least recently used entry when full"""
+        if self.max_entries <= 0 or not response:
+            return
+        
+        key = (normalize_question(question), fingerprint)
+        entry = CachedResponse(
+            response=response,
+            fingerprint=fingerprint,
+            embedding=self._normalize_embedding(embedding),
+            created_at=time.monotonic()
+        )
+        
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._by_fingerprint.setdefault(fingerprint, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+    
+    def clear(self) -> None:
+        """Invalidate all cached responses (e.g. after content changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+    
+    def get_stats(self) -> Dict:
+        """Get cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+response_cache = SemanticResponseCache(
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    similarity_threshold=settings.response_cache_similarity_threshold
+)
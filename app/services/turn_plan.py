@@ -0,0 +1,148 @@
+"""Immutable pre-LLM turn plans and the per-session plan cache"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from app.core import settings
+
+
+@dataclass(frozen=True)
+class TurnPlan:
+    """
+    Everything decided for a chat turn before the LLM is called.
+    
+    Both /chat and /chat/stream consume the same plan: either answer with
+    ``cached_response`` or send ``messages`` to the model. Mappings are
+    read-only views; copy them before handing them to callers that mutate.
+    """
+    user_message: str
+    intent: Mapping
+    context: Tuple[str, ...]
+    query_embedding: Optional[Tuple[float, ...]]
+    fingerprint: str
+    recommendations: Optional[Tuple[Dict, ...]]
+    cacheable: bool
+    cached_response: Optional[str]
+    messages: Tuple[Mapping, ...]
+    timings: Mapping
+    
+    @classmethod
+    def create(
+        cls,
+        user_message: str,
+        intent: Dict,
+        context: List[str],
+        query_embedding: Optional[List[float]],
+        fingerprint: str,
+        recommendations: Optional[List[Dict]],
+        cacheable: bool,
+        cached_response: Optional[str],
+        messages: List[Dict],
+        timings: Dict[str, float]
+    ) -> "TurnPlan":
+        return cls(
+            user_message=user_message,
+            intent=MappingProxyType(dict(intent)),
+            context=tuple(context),
+            query_embedding=tuple(query_embedding) if query_embedding is not None else None,
+            fingerprint=fingerprint,
+            recommendations=tuple(recommendations) if recommendations is not None else None,
+            cacheable=cacheable,
+            cached_response=cached_response,
+            messages=tuple(MappingProxyType(dict(m)) for m in messages),
+            timings=MappingProxyType(dict(timings))
+        )
+    
+    def intent_dict(self) -> Dict:
+        return dict(self.intent)
+    
+    def recommendation_list(self) -> Optional[List[Dict]]:
+        return list(self.recommendations) if self.recommendations is not None else None
+    
+    def message_list(self) -> List[Dict]:
+        return [dict(m) for m in self.messages]
+
+
+def history_key(conversation_history: List[Dict]) -> str:
+    """Fingerprint of client-sent history, so a retry with the same history matches"""
+    digest = hashlib.sha1()
+    for message in conversation_history:
+        digest.update(str(message.get("role", "")).encode("utf-8"))
+        digest.update(b"\x1f")
+        digest.update(str(message.get("content", "")).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class TurnPlanCache:
+    """
+    The latest unfinished turn plan of each session.
+    
+    A plan is stored when it is built and dropped when its turn is saved,
+    so only a turn that failed after planning (e.g. the stream broke and the
+    client retries via /chat) is ever served from here. A hit requires the
+    same message and the same client-sent history.
+    """
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 120):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, str], float, TurnPlan]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, session_id: str, user_message: str, history: str) -> Optional[TurnPlan]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                key, created_at, plan = entry
+                expired = self.ttl_seconds > 0 and time.monotonic() - created_at > self.ttl_seconds
+                if expired:
+                    del self._entries[session_id]
+                elif key == (user_message, history):
+                    self._entries.move_to_end(session_id)
+                    self.hits += 1
+                    return plan
+            self.misses += 1
+            return None
+    
+    def put(self, session_id: str, user_message: str, history: str, plan: TurnPlan) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = ((user_message, history), time.monotonic(), plan)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard(self, session_id: str) -> None:
+        """Forget the session's plan once its turn has been answered"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+turn_plans = TurnPlanCache(
+    max_entries=settings.turn_plan_cache_max_entries,
+    ttl_seconds=settings.turn_plan_cache_ttl_seconds
+)
@@ -0,0 +1,127 @@
+"""Extraction of recommendation inputs (age, cover, budget...) from chat text"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+DEFAULT_USER_DETAILS = {
+    "age": None,
+    "coverage_needed": None,
+    "budget_monthly": None,
+    "family_size": 1,
+    "annual_income": None,
+    "smoker": False
+}
+
+LAKH = 100000
+CRORE = 10000000
+
+_UNIT = r"(?:(?P<crore>crores?|cr)|lakhs?|lacs?|l)\b"
+
+# All patterns run on the lowercased text
+_AGE = re.compile(r"(\d{2})\s*(?:years?|yrs?)?\s*old|\bage[:\s]+(\d{2})")
+_COVERAGE = re.compile(r"(\d+(?:\.\d+)?)\s*" + _UNIT)
+_BUDGET = re.compile(r"budget[:\s]+(?:₹|rs\.?|inr)?\s*(\d+[,\d]*)")
+_FAMILY = re.compile(r"family\s+(?:of\s+)?(\d+)|(\d+)\s*(?:members?|people)")
+_INCOME = re.compile(
+    r"(?P<monthly_prefix>monthly\s+)?(?:income|salary|earn(?:ings?)?)(?:\s+(?:is|of))?[:\s]+"
+    r"(?:₹|rs\.?|inr)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?:" + _UNIT + r")?"
+    r"(?P<monthly>\s*(?:(?:per|a|every|/)\s*month|monthly|p\.?m\b))?"
+)
+_NON_SMOKER = re.compile(
+    r"non[- ]?smok|(?:don'?t|do not|never|no longer)\s+smoke"
+    # Former smokers: "quit smoking", "ex-smoker", "was a smoker but quit"
+    r"|(?:quit|stopped|gave up)\s+(?:smoking|tobacco)|(?:ex|former)[- ]?smoker|used to smoke"
+    r"|(?:smoker|smoking|tobacco)\b.{0,40}\b(?:quit|stopped|gave (?:it )?up)"
+)
+_SMOKER = re.compile(r"smoke|smoking|tobacco")
+
+
+def _parse(text: str) -> Tuple[Tuple[str, object], ...]:
+    text = text.lower()
+    details = []
+    
+    match = _AGE.search(text)
+    if match:
+        details.append(("age", int(match.group(1) or match.group(2))))
+    
+    income = _INCOME.search(text)
+    # An amount that is the income ("salary 12 lakh") is not a cover amount
+    income_span = income.span() if income else (0, 0)
+    for match in _COVERAGE.finditer(text):
+        if not income_span[0] <= match.start() < income_span[1]:
+            unit = CRORE if match.group("crore") else LAKH
+            details.append(("coverage_needed", float(match.group(1)) * unit))
+            break
+    
+    match = _BUDGET.search(text)
+    if match:
+        details.append(("budget_monthly", float(match.group(1).replace(",", ""))))
+    
+    match = _FAMILY.search(text)
+    if match:
+        details.append(("family_size", int(match.group(1) or match.group(2))))
+    
+    if income:
+        amount = float(income.group("amount").replace(",", ""))
+        if income.group("crore"):
+            amount *= CRORE
+        elif amount < 100:  # "12" or "12 lakh"
+            amount *= LAKH
+        if income.group("monthly") or income.group("monthly_prefix"):
+            amount *= 12
+        details.append(("annual_income", amount))
+    
+    if _NON_SMOKER.search(text):
+        details.append(("smoker", False))
+    elif _SMOKER.search(text):
+        details.append(("smoker", True))
+    
+    return tuple(details)
+
+
+class UserDetailExtractor:
+    """
+    Parses user details out of chat messages.
+    
+    Each message is parsed on its own and the result memoized by text, so
+    a client re-sending its history only pays for the messages it has not
+    sent before. Details from later messages override earlier ones.
+    """
+    
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[Tuple[str, object], ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def parse(self, text: str) -> Dict:
+        """Only the details actually mentioned in ``text``"""
+        with self._lock:
+            parsed = self._cache.get(text)
+            if parsed is not None:
+                self._cache.move_to_end(text)
+                return dict(parsed)
+        
+        parsed = _parse(text)
+        with self._lock:
+            self._cache[text] = parsed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(parsed)
+    
+    def merge(self, texts: Iterable[str], details: Optional[Dict] = None) -> Dict:
+        """Fold the details of ``texts`` (oldest first) into ``details``"""
+        details = {} if details is None else details
+        for text in texts:
+            if text:
+                details.update(self.parse(text))
+        return details
+    
+    def extract(self, texts: Iterable[str]) -> Dict:
+        """Full details for ``texts`` (oldest first), defaults filled in"""
+        return {**DEFAULT_USER_DETAILS, **self.merge(texts)}
+
+
+# Singleton instance
+user_detail_extractor = UserDetailExtractor()
@@ -1,12 +1,36 @@
 """Vector store service for RAG-based content retrieval"""
+import logging
 import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Optional
+from chromadb.utils import embedding_functions
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple
 import hashlib
 from pathlib import Path
 
 from app.core import settings
+from app.services.embedding_cache import QueryEmbeddingCache, embedding_namespace
+from app.services.ingestion_manifest import IngestionManifest, hash_file, hash_text
+from app.services.ingestion_pipeline import EmbeddingWriter
+from app.services.chunker import Chunk, MarkdownTokenChunker
+from app.utils.document_extraction import DocumentReadError, extract_text, iter_pages
+
+logger = logging.getLogger(__name__)
+
+
+def _file_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _future_pages(future) -> Iterator[str]:
+    """Pages of a file extracted on the process pool; raises its read error"""
+    yield future.result()
 
 
 class VectorStoreService:
@@ -25,15 +49,37 @@ class VectorStoreService:
             )
         )
         
-        # Get or create collection with OpenAI embeddings
+        # Same embedding function Chroma uses by default, kept as a handle so
+        # queries can be embedded once and reused (e.g. by the response cache)
+        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        
+        # Get or create collection
         self.collection = self.client.get_or_create_collection(
             name=self.COLLECTION_NAME,
+            embedding_function=self.embedding_function,
             metadata={"description": "NYVO Insurance educational content"}
         )
+        
+        self.embedding_cache = QueryEmbeddingCache(
+            namespace=embedding_namespace(self.embedding_function),
+            max_entries=settings.embedding_cache_max_entries,
+            persist_path=settings.embedding_cache_path if settings.embedding_cache_persist else None
+        )
     
     def _generate_doc_id(self, content: str, source: str) -> str:
-        """Generate unique document ID"""
-        return hashlib.md5(f"{source}:{content[:100]}".encode()).hexdigest()
+        """Generate unique document ID from the full chunk content"""
+        return hashlib.sha256(f"{source}:{content}".encode()).hexdigest()
+    
+    @staticmethod
+    def chunk_id(source: str, content_hash: str, occurrence: int = 0) -> str:
+        """
+        ID of a chunk within a source file, derived from its content.
+        
+        ``occurrence`` numbers repeats of identical chunks in the same file.
+        Because the ID doesn't depend on position, text inserted above a
+        chunk doesn't change the chunk's ID (or force it to be re-embedded).
+        """
+        return hashlib.sha256(f"{source}#{content_hash}#{occurrence}".encode()).hexdigest()
     
     def add_documents(
         self,
@@ -61,15 +107,60 @@ class VectorStoreService:
                 ids=batch_ids
             )
     
+    def upsert_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict],
+        ids: List[str],
+        embeddings: Optional[List[List[float]]] = None
+    ) -> None:
+        """Insert or replace documents by ID, optionally with precomputed embeddings"""
+        batch_size = 100
+        for i in range(0, len(documents), batch_size):
+            self.collection.upsert(
+                documents=documents[i:i + batch_size],
+                metadatas=metadatas[i:i + batch_size],
+                ids=ids[i:i + batch_size],
+                embeddings=embeddings[i:i + batch_size] if embeddings is not None else None
+            )
+    
+    def delete_documents(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict] = None
+    ) -> None:
+        """Delete documents by ID or metadata filter"""
+        if ids:
+            batch_size = 500
+            for i in range(0, len(ids), batch_size):
+                self.collection.delete(ids=ids[i:i + batch_size])
+        elif where:
+            self.collection.delete(where=where)
+    
+    def _embed(self, text: str) -> List[float]:
+        return [float(x) for x in self.embedding_function([text])[0]]
+    
+    def embed_documents(self, documents: List[str]) -> List[List[float]]:
+        """Embed a batch of documents with the collection's embedding function"""
+        return [[float(x) for x in emb] for emb in self.embedding_function(documents)]
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing cached embeddings for repeated queries"""
+        return self.embedding_cache.get_or_compute(query, self._embed)
+    
     def search(
         self,
         query: str,
         n_results: int = 5,
-        filter_metadata: Optional[Dict] = None
+        filter_metadata: Optional[Dict] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> Dict:
         """Search for relevant documents"""
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[query_embedding],
             n_results=n_results,
             where=filter_metadata
         )
@@ -84,7 +175,8 @@ class VectorStoreService:
         """Get statistics about the collection"""
         return {
             "name": self.COLLECTION_NAME,
-            "count": self.collection.count()
+            "count": self.collection.count(),
+            "embedding_cache": self.embedding_cache.get_stats()
         }
     
     def clear_collection(self) -> None:
@@ -92,6 +184,7 @@ class VectorStoreService:
         self.client.delete_collection(self.COLLECTION_NAME)
         self.collection = self.client.create_collection(
             name=self.COLLECTION_NAME,
+            embedding_function=self.embedding_function,
             metadata={"description": "NYVO Insurance educational content"}
         )
 
@@ -102,58 +195,37 @@ class ContentIngestionService:
     def __init__(self, vector_store: VectorStoreService):
         self.vector_store = vector_store
         self.content_path = Path(settings.nyvo_content_path)
-    
-    def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        """Split text into overlapping chunks"""
-        chunks = []
-        start = 0
+        self.manifest = IngestionManifest(settings.ingestion_manifest_path)
+        self.chunker = MarkdownTokenChunker(
+            max_tokens=settings.chunk_max_tokens,
+            overlap_tokens=settings.chunk_overlap_tokens,
+            min_tokens=settings.chunk_min_tokens,
+            encoding_name=settings.chunk_encoding
+        )
         
-        while start < len(text):
-            end = start + chunk_size
-            chunk = text[start:end]
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = chunk.rfind('.')
-                last_newline = chunk.rfind('\n')
-                break_point = max(last_period, last_newline)
-                if break_point > chunk_size * 0.7:
-                    chunk = chunk[:break_point + 1]
-                    end = start + break_point + 1
-            
-            chunks.append(chunk.strip())
-            start = end - overlap
+        # Held for a whole run; the per-run state below belongs to its holder
+        self._ingest_lock = threading.Lock()
         
-        return [c for c in chunks if len(c) > 50]
+        # Per-run write tracking, updated from the writer thread
+        self._progress_lock = threading.Lock()
+        self._pending_writes: Dict[str, int] = {}
+        self._submitted: set = set()
+        self._removing: set = set()
+        self._writes_since_checkpoint = 0
+    
+    def _chunk_text(self, text: str, markdown: bool = True) -> List[str]:
+        """Split text into token-bounded, heading-aligned chunks"""
+        return [chunk.text for chunk in self.chunker.chunk_text(text, markdown=markdown)]
+    
+    def _iter_chunks(self, pages: Iterable[str], markdown: bool = True) -> Iterator[Chunk]:
+        """Stream chunks (with heading paths) from a sequence of text pieces"""
+        return self.chunker.iter_chunks(pages, markdown=markdown)
     
     def _extract_text_from_file(self, file_path: Path) -> str:
         """Extract text from various file formats"""
-        suffix = file_path.suffix.lower()
-        
-        if suffix in ['.txt', '.md']:
-            return file_path.read_text(encoding='utf-8')
-        
-        elif suffix == '.pdf':
-            try:
-                from pypdf import PdfReader
-                reader = PdfReader(str(file_path))
-                return "\n".join(page.extract_text() for page in reader.pages)
-            except Exception as e:
-                print(f"Error reading PDF {file_path}: {e}")
-                return ""
-        
-        elif suffix == '.docx':
-            try:
-                from docx import Document
-                doc = Document(str(file_path))
-                return "\n".join(para.text for para in doc.paragraphs)
-            except Exception as e:
-                print(f"Error reading DOCX {file_path}: {e}")
-                return ""
-        
-        return ""
+        return extract_text(str(file_path))
     
-    def _categorize_content(self, file_path: Path, content: str) -> Dict:
+    def _categorize_content(self, file_path: Path, content: str = "") -> Dict:
         """Categorize content based on file path and content"""
         path_str = str(file_path).lower()
         
@@ -183,42 +255,295 @@ class ContentIngestionService:
             "file_name": file_path.name
         }
     
+    def clear_content_library(self) -> Dict:
+        """
+        Remove all indexed content and forget the manifest, so the next
+        ingest re-indexes everything. Returns status "busy" while an ingest
+        is running rather than clearing underneath it.
+        """
+        if not self._ingest_lock.acquire(blocking=False):
+            return {"status": "busy", "message": "Ingestion already running"}
+        try:
+            self.vector_store.clear_collection()
+            self.manifest.reset()
+            return {"status": "success", "message": "Content cleared"}
+        finally:
+            self._ingest_lock.release()
+    
+    # ---- write tracking (called from the EmbeddingWriter thread) ----
+    
+    def _expect_writes(self, source: str, count: int) -> None:
+        with self._progress_lock:
+            self._pending_writes[source] = self._pending_writes.get(source, 0) + count
+    
+    def _mark_submitted(self, source: str) -> None:
+        with self._progress_lock:
+            self._submitted.add(source)
+            self._maybe_finish(source)
+    
+    def _maybe_finish(self, source: str) -> None:
+        if source not in self._submitted or self._pending_writes.get(source, 0) > 0:
+            return
+        if source in self._removing:
+            self.manifest.remove(source)
+            self._removing.discard(source)
+        else:
+            self.manifest.finish_file(source)
+        self._submitted.discard(source)
+        self._pending_writes.pop(source, None)
+    
+    def _checkpoint(self) -> None:
+        self._writes_since_checkpoint += 1
+        if self._writes_since_checkpoint >= settings.ingestion_checkpoint_batches:
+            self._writes_since_checkpoint = 0
+            self.manifest.save()
+    
+    def _on_upsert(self, ids: List[str], metadatas: List[Dict]) -> None:
+        committed: Dict[str, Dict[str, str]] = {}
+        for chunk_id, meta in zip(ids, metadatas):
+            committed.setdefault(meta["source"], {})[chunk_id] = meta["content_hash"]
+        
+        with self._progress_lock:
+            for source, chunks in committed.items():
+                self.manifest.commit_chunks(source, chunks)
+                self._pending_writes[source] -= len(chunks)
+                self._maybe_finish(source)
+            self._checkpoint()
+    
+    def _on_delete(self, ids: List[str], source: Optional[str]) -> None:
+        with self._progress_lock:
+            self.manifest.drop_chunks(source, ids)
+            self._pending_writes[source] -= len(ids)
+            self._maybe_finish(source)
+            self._checkpoint()
+    
+    # ---- ingestion ----
+    
+    def _index_file(
+        self,
+        file_path: Path,
+        pages: Iterable[str],
+        file_hash: str,
+        stats: Dict,
+        writer: EmbeddingWriter
+    ) -> None:
+        """
+        (Re)index a single new or changed file, touching only changed chunks.
+        
+        If reading the file fails part-way, the error propagates before stale
+        chunks are removed or the file is marked complete, so the chunks of
+        the unread tail are kept and the next ingest retries the file.
+        """
+        source = str(file_path)
+        is_new = self.manifest.get(source) is None
+        previous_chunks = self.manifest.begin_file(source, file_hash, self.chunker.signature)
+        
+        if is_new:
+            # Not tracked yet: drop anything indexed for this source under legacy IDs
+            self.vector_store.delete_documents(where={"source": source})
+        
+        base_metadata = self._categorize_content(file_path)
+        self._expect_writes(source, 0)
+        
+        markdown = file_path.suffix.lower() in ('.md', '.txt')
+        
+        # Chunk IDs come from chunk content, so an edit only adds the new
+        # chunks and removes the old ones; every other chunk keeps its ID
+        # and embedding wherever it moved to in the file
+        seen_ids = set()
+        occurrences: Dict[str, int] = {}
+        for chunk in self._iter_chunks(pages, markdown=markdown):
+            chunk_hash = hash_text(chunk.heading_path_str + "\n" + chunk.text)
+            occurrence = occurrences.get(chunk_hash, 0)
+            occurrences[chunk_hash] = occurrence + 1
+            chunk_id = self.vector_store.chunk_id(source, chunk_hash, occurrence)
+            seen_ids.add(chunk_id)
+            
+            if chunk_id in previous_chunks:
+                continue
+            
+            stats["chunks_added"] += 1
+            self._expect_writes(source, 1)
+            writer.add(chunk_id, chunk.text, {
+                **base_metadata,
+                "content_hash": chunk_hash,
+                "heading_path": chunk.heading_path_str,
+                "token_count": chunk.token_count
+            })
+        
+        stale_ids = [cid for cid in previous_chunks if cid not in seen_ids]
+        if stale_ids:
+            self._expect_writes(source, len(stale_ids))
+            writer.delete(stale_ids, source)
+            stats["chunks_removed"] += len(stale_ids)
+        
+        self._mark_submitted(source)
+        stats["files_processed"] += 1
+        if not is_new:
+            stats["files_updated"] += 1
+    
+    def _iter_changed_files(
+        self, changed: List[Tuple[Path, str]]
+    ) -> Iterator[Tuple[Path, str, Iterable[str]]]:
+        """
+        Yield (path, file_hash, pages) for changed files.
+        
+        Text files, and everything when only one extraction worker is
+        configured, are streamed page by page. PDF/DOCX parsing is CPU-bound,
+        so with multiple workers it runs on a process pool. A pooled file
+        comes back as one full text, so the window of files in flight is
+        bounded by INGESTION_MAX_BUFFER_MB (estimated from file size, with at
+        least one file in flight), and files larger than that are streamed
+        in-process instead.
+        """
+        workers = settings.ingestion_extract_workers or os.cpu_count() or 1
+        max_bytes = settings.ingestion_max_buffer_mb * 1024 * 1024
+        heavy = [(p, h) for p, h in changed if p.suffix.lower() in ('.pdf', '.docx')]
+        light = [(p, h) for p, h in changed if p.suffix.lower() not in ('.pdf', '.docx')]
+        
+        if workers > 1 and len(heavy) > 1:
+            sizes = {p: _file_size(p) for p, _ in heavy}
+            light += [(p, h) for p, h in heavy if sizes[p] > max_bytes]
+            heavy = [(p, h) for p, h in heavy if sizes[p] <= max_bytes]
+        
+        for file_path, file_hash in light:
+            yield file_path, file_hash, iter_pages(str(file_path))
+        
+        if workers <= 1 or len(heavy) <= 1:
+            for file_path, file_hash in heavy:
+                yield file_path, file_hash, iter_pages(str(file_path))
+            return
+        
+        workers = min(workers, len(heavy))
+        pending = deque(heavy)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            in_flight_bytes = 0
+            
+            def fill() -> None:
+                nonlocal in_flight_bytes
+                while pending and len(in_flight) < workers * 2:
+                    size = sizes[pending[0][0]]
+                    if in_flight and in_flight_bytes + size > max_bytes:
+                        break
+                    item = pending.popleft()
+                    in_flight[pool.submit(extract_text, str(item[0]))] = item
+                    in_flight_bytes += size
+            
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path, file_hash = in_flight.pop(future)
+                    yield file_path, file_hash, _future_pages(future)
+                    # Only count the text as released once it was consumed
+                    in_flight_bytes -= sizes[file_path]
+                    fill()
+    
     def ingest_content_library(self) -> Dict:
-        """Ingest all content from the NYVO content library"""
+        """
+        Incrementally ingest the NYVO content library.
+        
+        Files whose content hash matches the manifest are skipped, changed
+        chunks are upserted, and chunks of edited or deleted files that no
+        longer exist are removed from the vector store. Files are streamed
+        through extraction, chunking, embedding and vector-store writes with
+        bounded buffering. The manifest is checkpointed as batches commit, so
+        an interrupted run resumes from the last checkpoint.
+        
+        Only one run at a time: a call made while another is in progress
+        returns status "busy" instead of waiting.
+        """
+        if not self._ingest_lock.acquire(blocking=False):
+            return {"status": "busy", "message": "Ingestion already running"}
+        try:
+            return self._ingest()
+        finally:
+            self._ingest_lock.release()
+    
+    def _ingest(self) -> Dict:
         if not self.content_path.exists():
             os.makedirs(self.content_path, exist_ok=True)
             return {"status": "error", "message": "Content directory is empty"}
         
-        all_documents = []
-        all_metadatas = []
-        files_processed = 0
+        # The collection was cleared or recreated behind the manifest's back
+        if self.manifest.files and self.vector_store.collection.count() == 0:
+            self.manifest.reset()
+        
+        stats = {
+            "files_processed": 0,
+            "files_failed": 0,
+            "files_unchanged": 0,
+            "files_updated": 0,
+            "files_removed": 0,
+            "chunks_added": 0,
+            "chunks_removed": 0
+        }
+        seen_sources = set()
+        changed = []
+        errors = []
         
         # Supported extensions
         extensions = ['.txt', '.md', '.pdf', '.docx']
         
         for ext in extensions:
             for file_path in self.content_path.rglob(f"*{ext}"):
-                text = self._extract_text_from_file(file_path)
-                if not text:
-                    continue
+                source = str(file_path)
+                seen_sources.add(source)
                 
-                chunks = self._chunk_text(text)
-                base_metadata = self._categorize_content(file_path, text)
-                
-                for i, chunk in enumerate(chunks):
-                    all_documents.append(chunk)
-                    metadata = {**base_metadata, "chunk_index": i}
-                    all_metadatas.append(metadata)
+                file_hash = hash_file(file_path)
+                if self.manifest.is_current(source, file_hash, self.chunker.signature):
+                    stats["files_unchanged"] += 1
+                    continue
                 
-                files_processed += 1
+                changed.append((file_path, file_hash))
         
-        if all_documents:
-            self.vector_store.add_documents(all_documents, all_metadatas)
+        with self._progress_lock:
+            self._pending_writes.clear()
+            self._submitted.clear()
+            self._removing.clear()
+            self._writes_since_checkpoint = 0
+        
+        writer = EmbeddingWriter(
+            self.vector_store,
+            batch_size=settings.ingestion_batch_size,
+            embed_workers=settings.ingestion_embed_workers,
+            max_pending_batches=settings.ingestion_max_pending_batches,
+            max_buffer_bytes=settings.ingestion_max_buffer_mb * 1024 * 1024,
+            on_upsert=self._on_upsert,
+            on_delete=self._on_delete
+        )
+        try:
+            for file_path, file_hash, pages in self._iter_changed_files(changed):
+                try:
+                    self._index_file(file_path, pages, file_hash, stats, writer)
+                except DocumentReadError as e:
+                    logger.error(f"Skipped {file_path}: {e}")
+                    stats["files_failed"] += 1
+                    errors.append({"source": str(file_path), "error": str(e)})
+            
+            # Remove chunks of files that disappeared from the library
+            for source in [s for s in self.manifest.files if s not in seen_sources]:
+                stale_ids = list(self.manifest.get(source).get("chunks", {}))
+                with self._progress_lock:
+                    self._removing.add(source)
+                self._expect_writes(source, len(stale_ids))
+                writer.delete(stale_ids, source)
+                self._mark_submitted(source)
+                stats["chunks_removed"] += len(stale_ids)
+                stats["files_removed"] += 1
+        finally:
+            try:
+                writer.close()
+            finally:
+                # Persist whatever was committed, even if the run failed
+                self.manifest.save()
         
         return {
-            "status": "success",
-            "files_processed": files_processed,
-            "chunks_created": len(all_documents)
+            "status": "partial" if errors else "success",
+            "chunks_created": stats["chunks_added"],
+            **stats,
+            "errors": errors
         }
 
 
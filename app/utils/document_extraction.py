@@ -0,0 +1,54 @@
+"""Text extraction for content-library files
+
+Kept free of app imports so it can run inside ProcessPoolExecutor workers
+without initializing the vector store or database in each child process.
+"""
+from pathlib import Path
+from typing import Iterator
+
+
+class DocumentReadError(Exception):
+    """A content file could not be (fully) read"""
+
+
+def _iter_raw_pages(file_path: Path, block_chars: int) -> Iterator[str]:
+    suffix = file_path.suffix.lower()
+    
+    if suffix in ['.txt', '.md']:
+        with open(file_path, encoding='utf-8') as f:
+            for block in iter(lambda: f.read(block_chars), ""):
+                yield block
+    
+    elif suffix == '.pdf':
+        from pypdf import PdfReader
+        reader = PdfReader(str(file_path))
+        for i, page in enumerate(reader.pages):
+            text = page.extract_text()
+            yield text if i == 0 else "\n" + text
+    
+    elif suffix == '.docx':
+        from docx import Document
+        doc = Document(str(file_path))
+        for i, para in enumerate(doc.paragraphs):
+            yield para.text if i == 0 else "\n" + para.text
+
+
+def iter_pages(path: str, block_chars: int = 64 * 1024) -> Iterator[str]:
+    """
+    Stream a file's text as consecutive pieces (PDF pages, DOCX paragraphs,
+    fixed-size blocks of text files) without loading the whole file.
+    
+    Concatenating the pieces gives the same text as ``extract_text``. Read
+    errors raise DocumentReadError, even after some pieces were yielded, so
+    callers never mistake a truncated file for the whole of it.
+    """
+    file_path = Path(path)
+    try:
+        yield from _iter_raw_pages(file_path, block_chars)
+    except Exception as e:
+        raise DocumentReadError(f"Error reading {file_path}: {e}") from e
+
+
+def extract_text(path: str) -> str:
+    """Extract text from .txt, .md, .pdf and .docx files"""
+    return "".join(iter_pages(path))
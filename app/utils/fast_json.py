@@ -0,0 +1,65 @@
+"""Opt-in fast JSON encoding for API responses and SSE frames
+
+With ``FAST_JSON_ENABLED=true`` and orjson installed, responses are encoded
+with orjson and trusted engine output skips pydantic re-validation.
+Otherwise every helper produces the same bytes as the stdlib path.
+"""
+import json
+from typing import Any, Dict, Type, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core import settings
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+
+def fast_json_active() -> bool:
+    return settings.fast_json_enabled and orjson is not None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode compact JSON (same output as FastAPI's JSONResponse)"""
+    if fast_json_active():
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered through ``dumps``"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def trusted_response(content: Dict, model: Type[BaseModel]) -> Union[BaseModel, FastJSONResponse]:
+    """
+    Return content built by our own services.
+    
+    In fast mode it is encoded as-is, skipping the response_model validation
+    FastAPI would otherwise run; in normal mode it goes through ``model``.
+    """
+    if fast_json_active():
+        return FastJSONResponse(content)
+    return model(**content)
+
+
+def sse_content_frame(chunk: str) -> bytes:
+    """``data: {"content": ...}`` SSE frame for one chunk of streamed text"""
+    if fast_json_active():
+        # Only the string needs encoding; the envelope is constant
+        return b'data: {"content":' + orjson.dumps(chunk) + b'}\n\n'
+    return f"data: {json.dumps({'content': chunk})}\n\n".encode("utf-8")
@@ -0,0 +1,49 @@
+"""SQL statement counting, for catching N+1 query regressions"""
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Records the SQL statements executed on an engine while active"""
+    
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@contextmanager
+def assert_query_count(expected: int, engine: Optional[Engine] = None) -> Iterator[QueryCounter]:
+    """
+    Fail if the block runs more than ``expected`` SQL statements.
+    
+        with assert_query_count(1):
+            engine.compare_policies([1, 2, 3, 4, 5])
+    """
+    if engine is None:
+        from app.models.database import engine
+    
+    with QueryCounter(engine) as counter:
+        yield counter
+    
+    if counter.count > expected:
+        listing = "\n".join(f"  {i + 1}. {s}" for i, s in enumerate(counter.statements))
+        raise AssertionError(
+            f"Expected at most {expected} queries, got {counter.count}:\n{listing}"
+        )
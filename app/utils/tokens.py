@@ -0,0 +1,43 @@
+"""Shared tiktoken access with an offline fallback"""
+import logging
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ApproximateEncoding:
+    """
+    Stand-in used when a tiktoken encoding can't be loaded (e.g. the BPE file
+    can't be downloaded). Treats every 4 characters as one token, which is
+    close to cl100k for English text and round-trips through decode.
+    """
+    
+    name = "approximate"
+    
+    def encode(self, text: str, disallowed_special=()) -> List[str]:
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    
+    def decode(self, tokens: List[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: Optional[str] = None, model: Optional[str] = None):
+    """Return a tiktoken encoding by model or name, falling back to an approximation"""
+    try:
+        import tiktoken
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(encoding_name or "cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable ({e}); using approximate token counts")
+        return ApproximateEncoding()
+
+
+def count_tokens(text: str, encoding_name: Optional[str] = None, model: Optional[str] = None) -> int:
+    """Count tokens in text"""
+    return len(get_encoding(encoding_name, model).encode(text, disallowed_special=()))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Check intent classification against a labelled corpus and time it
+
+Usage: python scripts/benchmark_intent.py [--repeat 2000]
+
+The word-bounded classifier replaced the substring scans for accuracy; the
+timings show what that costs (about the same on short messages, more on
+long ones).
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from app.services.intent_classifier import IntentClassifier
+
+
+# (message, insurance_type, flags that must be set)
+CORPUS = [
+    ("Which policy is best for my parents' health?", "health", {"needs_recommendation"}),
+    ("Travelling with my kids, which health plan covers them?", "health", set()),
+    ("Recommend a mediclaim for a family of 4", "health", {"needs_recommendation"}),
+    ("Does it cover hospitalisation abroad?", "health", set()),
+    ("I want a 1 crore term plan, can you suggest one?", "term_life", {"needs_recommendation"}),
+    ("How do I determine the right cover?", None, set()),  # not "term"
+    ("What is the death benefit on these plans?", "term_life", set()),
+    ("Compare HDFC vs ICICI term plans", "term_life", {"needs_comparison"}),
+    ("canvas bags", None, set()),  # not "vs"
+    ("What's the difference between floater and individual health cover?", "health", {"needs_comparison"}),
+    ("How to claim for my car accident", "motor", {"asking_about_policy"}),
+    ("Is my two wheeler covered?", "motor", set()),
+    ("Travel insurance for a trip to Europe", "travel", set()),
+    ("What are the exclusions and waiting periods?", None, {"asking_about_policy"}),
+    ("Will premiums go up next year?", None, {"asking_about_policy"}),
+    ("I am looking for life cover", "term_life", {"needs_recommendation"}),
+    ("My lifestyle is healthy", None, set()),  # neither "life" nor "health"
+    ("What is IRDAI?", None, set()),
+    ("Cardiac cover or critical illness?", None, set()),  # not "car"
+    ("Any  waiting\n periods for maternity?", None, {"asking_about_policy"}),
+    # Inflected forms the old substring scans caught
+    ("best healthcare plan for me", "health", set()),
+    ("Health care plans with low premiums", "health", {"asking_about_policy"}),
+    ("Are medicals needed before buying?", "health", set()),
+    ("Compare policy terms of 20 and 30 years", "term_life", {"needs_comparison"}),
+    ("Are death benefits taxable?", "term_life", set()),
+    ("Is my motorcycle covered?", "motor", set()),
+    ("Insurance for my two cars", "motor", set()),
+    ("Recommend the best policies for seniors", None, {"needs_recommendation"}),
+    ("Which policies cover OPD?", None, {"needs_recommendation"}),
+    ("How does the claims process work?", None, {"asking_about_policy"}),
+    ("What coverages are included?", None, {"asking_about_policy"}),
+]
+
+FLAGS = ("needs_recommendation", "needs_comparison", "asking_about_policy")
+
+
+def legacy_detect_intent(message):
+    """The previous any() substring scans, for timing only"""
+    message_lower = message.lower()
+    intent = {"type": "general_query", "insurance_type": None, "needs_recommendation": False,
+              "needs_comparison": False, "asking_about_policy": False}
+    if any(word in message_lower for word in ["health", "medical", "hospitalization", "mediclaim"]):
+        intent["insurance_type"] = "health"
+    elif any(word in message_lower for word in ["term", "life", "death benefit"]):
+        intent["insurance_type"] = "term_life"
+    elif any(word in message_lower for word in ["car", "motor", "vehicle", "bike"]):
+        intent["insurance_type"] = "motor"
+    if any(phrase in message_lower for phrase in [
+        "recommend", "suggest", "best policy", "which policy",
+        "what should i buy", "help me choose", "find me", "looking for"
+    ]):
+        intent["needs_recommendation"] = True
+    if any(word in message_lower for word in ["compare", "comparison", "versus", "vs", "difference between"]):
+        intent["needs_comparison"] = True
+    if any(phrase in message_lower for phrase in [
+        "claim process", "how to claim", "documents required",
+        "exclusion", "waiting period", "premium", "coverage"
+    ]):
+        intent["asking_about_policy"] = True
+    return intent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    
+    classifier = IntentClassifier()
+    failures = 0
+    for message, insurance_type, flags in CORPUS:
+        intent = classifier.classify(message)
+        got_flags = {flag for flag in FLAGS if intent[flag]}
+        if intent["insurance_type"] != insurance_type or got_flags != flags:
+            failures += 1
+            print(f"  MISMATCH {message!r}: got {intent['insurance_type']} {sorted(got_flags)}")
+    print(f"corpus: {len(CORPUS) - failures}/{len(CORPUS)} correct")
+    
+    short = [message for message, _, _ in CORPUS]
+    long = [" ".join(short) * 3]
+    for label, messages in (("corpus messages", short), (f"{len(long[0])}-char message", long)):
+        print(label)
+        for name, fn in (("legacy any() scans", legacy_detect_intent), ("keyword automaton", classifier.classify)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for message in messages:
+                    fn(message)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<20} {elapsed / (args.repeat * len(messages)) * 1e6:.2f} us/message")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
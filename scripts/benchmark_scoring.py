@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Check vectorized policy scoring against the per-policy reference and time it
+
+Usage: python scripts/benchmark_scoring.py [--policies 20000] [--requests 200]
+
+The reference itself is pinned to the original ORM scores by
+tests/test_recommendation_scoring.py.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.policy_catalog import (
+    PolicyCatalog, PolicyRecord, _health_csr_bonus, _term_csr_bonus, _waiting_bonus
+)
+from app.services.policy_scoring import score_health, score_term, top_k
+from app.services.recommendation_engine import RecommendationEngine
+
+
+PREMIUM_FACTORS = [
+    None,
+    {"age_bands": [[18, 35, 1.0], [36, 45, 1.35], [46, 99, 2.1]], "smoker": 1.6},
+    {"family_size": {"1": 1.0, "2": 1.65, "4": 2.2}, "city_tier": {"1": 1.15, "3": 0.9}},
+    {"sum_insured_slabs": [[500000, 0.8], [1000000, 1.0], [10000000, 1.9]], "smoker": 1.45},
+]
+
+
+def make_records(count: int, insurance_type: str, rng: random.Random, first_id: int = 1):
+    """Synthetic policy variants covering every scoring branch"""
+    records = []
+    for i in range(count):
+        csr = rng.choice([None, 84.0, 88.5, 91.2, 95.0, 97.9, 98.5])
+        waiting = rng.choice([None, 0, 30, 60, 90, 365])
+        records.append(PolicyRecord(
+            id=first_id + i,
+            name=f"Policy {first_id + i}",
+            insurance_type=insurance_type,
+            description=None,
+            min_coverage=100000,
+            max_coverage=rng.choice([None, 5e5, 1e6, 5e6, 1e7, 2e7, 1e8]),
+            min_age=rng.choice([None, 18, 25]),
+            max_age=rng.choice([45, 60, 65, 99]),
+            base_premium=rng.choice([None, 0, 6000, 12000, rng.uniform(5000, 40000)]),
+            premium_frequency="yearly",
+            premium_factors=rng.choice(PREMIUM_FACTORS),
+            waiting_period_days=waiting,
+            key_features=(),
+            riders_available=(),
+            nyvo_rating=rng.choice([None, 0, 3.5, 4.2, 4.8, rng.uniform(1, 5)]),
+            customer_rating=None,
+            is_active=rng.random() > 0.1,
+            is_featured=rng.random() > 0.5,
+            has_provider=rng.random() > 0.02,
+            provider_name="Provider",
+            provider_logo=None,
+            claim_settlement_ratio=csr,
+            health_csr_bonus=_health_csr_bonus(csr),
+            term_csr_bonus=_term_csr_bonus(csr),
+            waiting_bonus=_waiting_bonus(waiting),
+            covers_pre_existing=rng.random() > 0.5,
+            valuable_rider_hits=rng.randint(0, 3)
+        ))
+    return records
+
+
+def reference_ranking(records, age, coverage_needed, score_fn, limit):
+    """The pre-vectorization path: filter, score one by one, stable sort"""
+    eligible = [
+        p for p in records
+        if p.is_active and p.has_provider
+        and p.min_age is not None and p.min_age <= age
+        and p.max_age is not None and p.max_age >= age
+        and p.max_coverage is not None and p.max_coverage >= coverage_needed
+    ]
+    scored = [(p, score_fn(p)) for p in eligible]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    return [(p.id, score) for p, score in scored[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    health = make_records(args.policies, "health", rng)
+    term = make_records(args.policies, "term_life", rng, first_id=args.policies + 1)
+    catalog = PolicyCatalog.from_records(tuple(health + term))
+    engine = RecommendationEngine(db=None, catalog=catalog)
+    health_matrix = catalog.matrix_of_type("health")
+    term_matrix = catalog.matrix_of_type("term_life")
+    
+    mismatches = 0
+    timings = []
+    for _ in range(args.requests):
+        age = rng.choice([20, 30, 45, 60, 64, 70])
+        coverage = rng.choice([3e5, 1e6, 1e7, 5e7])
+        budget = rng.choice([None, 500, 1000, 2000])
+        pec = rng.choice([None, ["diabetes"]])
+        income = rng.choice([None, 6e5, 1.2e6])
+        family_size = rng.choice([1, 2, 3, 5])
+        city = rng.choice([None, "Mumbai", "Jaipur", "Shimla"])
+        smoker = rng.random() > 0.7
+        limit = rng.choice([1, 5, 50])
+        
+        for matrix in (health_matrix, term_matrix):
+            if not np.array_equal(matrix.eligible(age, coverage), matrix.eligible_scan(age, coverage)):
+                mismatches += 1
+        
+        start = time.perf_counter()
+        idx = health_matrix.eligible(age, coverage)
+        scores = score_health(health_matrix, idx, age, coverage, budget, family_size, pec, city)
+        fast_health = top_k(idx, scores, limit)
+        timings.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        idx = term_matrix.eligible(age, coverage)
+        scores = score_term(term_matrix, idx, age, coverage, income, smoker, budget)
+        fast_term = top_k(idx, scores, limit)
+        timings.append(time.perf_counter() - start)
+        
+        expected_health = reference_ranking(
+            health, age, coverage,
+            lambda p: engine._calculate_health_score(p, age, coverage, budget, family_size, pec, city),
+            limit
+        )
+        expected_term = reference_ranking(
+            term, age, coverage,
+            lambda p: engine._calculate_term_score(p, age, coverage, income, smoker, None, budget),
+            limit
+        )
+        
+        got_health = [(health_matrix.records[i].id, s) for i, s in fast_health]
+        got_term = [(term_matrix.records[i].id, s) for i, s in fast_term]
+        for got, expected in ((got_health, expected_health), (got_term, expected_term)):
+            # repr() distinguishes any float that differs in its last bit
+            if [(i, repr(s)) for i, s in got] != [(i, repr(s)) for i, s in expected]:
+                mismatches += 1
+    
+    timings.sort()
+    print(f"{args.policies} policies per type, {args.requests} requests per type")
+    print(f"  median: {timings[len(timings) // 2] * 1000:.3f} ms")
+    print(f"  p95:    {timings[int(len(timings) * 0.95)] * 1000:.3f} ms")
+    print(f"  mismatches vs reference: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
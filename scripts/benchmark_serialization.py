@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compare CPU time of the default and fast (orjson) serialization paths
+
+Measures the work done per request after the handler has its data:
+- /recommend/*: response_model validation + JSON encoding, vs encoding the
+  engine's dicts directly
+- /chat/stream: building one SSE frame per streamed chunk
+
+Usage: python scripts/benchmark_serialization.py [--requests 2000] [--chunks 400]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+
+from fastapi.responses import JSONResponse
+
+from app.core import settings
+from app.api.schemas import RecommendationResponse
+from app.services.policy_catalog import PolicyCatalog
+from app.services.recommendation_engine import RecommendationEngine
+from app.utils.fast_json import fast_json_active, sse_content_frame, trusted_response
+from benchmark_scoring import make_records
+
+
+def recommendation_payload(limit: int):
+    """Realistic /recommend/health content built by the engine"""
+    rng = random.Random(11)
+    records = [
+        r for r in make_records(500, "health", rng)
+        if r.base_premium  # the response model requires a premium
+    ]
+    engine = RecommendationEngine(db=None, catalog=PolicyCatalog.from_records(tuple(records)))
+    recommendations = engine.get_health_insurance_recommendations(
+        age=35, coverage_needed=1e6, budget_monthly=1500, family_size=3, limit=limit
+    )
+    return {"recommendations": recommendations, "total_count": len(recommendations)}
+
+
+def encode_response(content):
+    """What FastAPI does with a handler's return value for this route"""
+    response = trusted_response(content, RecommendationResponse)
+    if isinstance(response, JSONResponse):
+        return response.body
+    validated = RecommendationResponse.model_validate(response)
+    return JSONResponse(validated.model_dump(mode="json")).body
+
+
+def cpu_per_call(fn, calls: int) -> float:
+    start = time.process_time()
+    for _ in range(calls):
+        fn()
+    return (time.process_time() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=400, help="SSE chunks per streamed answer")
+    parser.add_argument("--limit", type=int, default=5, help="recommendations per response")
+    args = parser.parse_args()
+    
+    content = recommendation_payload(args.limit)
+    words = ("Term insurance pays your nominee the sum assured if you die during "
+             "the policy term. Premiums are lowest when you buy young. ").split(" ")
+    chunks = [words[i % len(words)] + " " for i in range(args.chunks)]
+    
+    results = {}
+    for fast in (False, True):
+        settings.fast_json_enabled = fast
+        if fast and not fast_json_active():
+            print("orjson is not installed; only the default path was measured")
+            break
+        recommend = cpu_per_call(lambda: encode_response(content), args.requests)
+        stream = cpu_per_call(lambda: [sse_content_frame(c) for c in chunks], max(args.requests // 10, 1))
+        results["fast" if fast else "default"] = (recommend, stream)
+    
+    print(f"/recommend/* ({args.limit} recommendations), CPU per response:")
+    for name, (recommend, _) in results.items():
+        print(f"  {name:8} {recommend * 1e6:9.1f} us")
+    print(f"/chat/stream ({args.chunks} chunks), CPU per streamed answer:")
+    for name, (_, stream) in results.items():
+        print(f"  {name:8} {stream * 1e6:9.1f} us")
+    if len(results) == 2:
+        print(f"savings: recommend {1 - results['fast'][0] / results['default'][0]:.0%}, "
+              f"stream {1 - results['fast'][1] / results['default'][1]:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Time user-detail extraction over a growing conversation
+
+Usage: python scripts/benchmark_user_details.py [--turns 40] [--repeat 200]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import re
+import time
+
+from app.services.user_details import UserDetailExtractor
+
+
+# Typical user messages; parse results are checked in tests/test_user_details.py
+MESSAGES = [
+    "I am 32 years old",
+    "Need 5 lakh coverage",
+    "my budget: ₹12,000",
+    "family of 4",
+    "my income is 12 lakh per annum",
+    "I don't smoke",
+    "what is the coverage: 50 lakh?",
+    "What is a waiting period?",
+]
+
+
+def legacy_parse(text):
+    """The previous inline implementation, for timing only"""
+    details = {}
+    age_match = re.search(r'(\d{2})\s*(?:years?|yrs?)?\s*old|age[:\s]+(\d{2})', text.lower())
+    if age_match:
+        details["age"] = int(age_match.group(1) or age_match.group(2))
+    coverage_match = re.search(r'(\d+)\s*(?:lakhs?|lacs?|L)\s*(?:coverage|cover|sum assured)?', text, re.IGNORECASE)
+    if coverage_match:
+        details["coverage_needed"] = float(coverage_match.group(1)) * 100000
+    budget_match = re.search(r'budget[:\s]+(?:₹|rs\.?|inr)?\s*(\d+[,\d]*)', text, re.IGNORECASE)
+    if budget_match:
+        details["budget_monthly"] = float(budget_match.group(1).replace(",", ""))
+    family_match = re.search(r'family\s+(?:of\s+)?(\d+)|(\d+)\s*(?:members?|people)', text, re.IGNORECASE)
+    if family_match:
+        details["family_size"] = int(family_match.group(1) or family_match.group(2))
+    income_match = re.search(r'(?:income|salary|earn)[:\s]+(?:₹|rs\.?|inr)?\s*(\d+)\s*(?:lakhs?|lacs?|L)?\s*(?:per\s+(?:annum|year)|pa|p\.a\.)?', text, re.IGNORECASE)
+    if income_match:
+        income_val = float(income_match.group(1))
+        details["annual_income"] = income_val * 100000 if income_val < 100 else income_val
+    if any(word in text.lower() for word in ["smoker", "smoking", "smoke", "tobacco"]):
+        details["smoker"] = not ("non-smoker" in text.lower() or "non smoker" in text.lower())
+    return details
+
+
+def make_history(turns):
+    history = []
+    for i in range(turns):
+        message = MESSAGES[i % len(MESSAGES)]
+        history.append({"role": "user", "content": message})
+        history.append({"role": "assistant", "content": (
+            "Here is some general guidance on health and term plans, waiting periods, "
+            "exclusions and claim settlement ratios for policies in your range. " * 4
+        )})
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    # One conversation growing turn by turn, re-sent by the client each time
+    history = make_history(args.turns)
+    
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for turn in range(1, len(history), 2):
+            past = history[:turn]
+            legacy_parse("new message " + " ".join(m["content"] for m in past))
+    legacy = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        extractor = UserDetailExtractor()
+        for turn in range(1, len(history), 2):
+            past = [m["content"] for m in history[:turn] if m["role"] == "user"]
+            extractor.extract(past + ["new message"])
+    current = time.perf_counter() - start
+    
+    calls = args.repeat * (len(history) // 2)
+    print(f"{args.turns}-turn conversation, {calls} extractions")
+    print(f"  legacy (concatenate + 6 searches): {legacy / calls * 1e6:.1f} us/turn")
+    print(f"  memoized per-message extractor:    {current / calls * 1e6:.1f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
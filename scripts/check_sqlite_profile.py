@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Show the database profile in effect and check reads during a held write lock
+
+Usage: python scripts/check_sqlite_profile.py [--hold 1.0]
+
+Uses DATABASE_URL; the write goes to a scratch table that is dropped after.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import threading
+import time
+
+from app.models import engine
+from app.models.db_profile import get_profile_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hold", type=float, default=1.0, help="seconds the writer holds its lock")
+    args = parser.parse_args()
+    
+    print(json.dumps(get_profile_stats(engine), indent=2))
+    if engine.url.get_backend_name() != "sqlite":
+        return
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE IF NOT EXISTS _profile_check (id INTEGER PRIMARY KEY)")
+    
+    locked = threading.Event()
+    
+    def writer():
+        with engine.connect() as connection:
+            # EXCLUSIVE is the lock a commit takes; WAL readers are not blocked by it
+            connection.exec_driver_sql("BEGIN EXCLUSIVE")
+            connection.exec_driver_sql("INSERT INTO _profile_check DEFAULT VALUES")
+            locked.set()
+            time.sleep(args.hold)
+            connection.exec_driver_sql("COMMIT")
+    
+    thread = threading.Thread(target=writer)
+    thread.start()
+    locked.wait()
+    
+    reads, error = 0, None
+    while thread.is_alive():
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql("SELECT COUNT(*) FROM _profile_check").scalar()
+            reads += 1
+        except Exception as e:
+            error = e
+            break
+    thread.join()
+    
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE _profile_check")
+    
+    print(f"reads while a writer held the lock for {args.hold}s: {reads}")
+    if error is not None:
+        print(f"  read failed: {error.__class__.__name__}: {str(error).splitlines()[0]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
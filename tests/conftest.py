@@ -0,0 +1,103 @@
+"""Shared fixtures: the app runs against an in-memory SQLite database"""
+import os
+import tempfile
+
+# Settings are read at import time, so point them away from ./data first
+_scratch = tempfile.mkdtemp(prefix="nyvo-tests-")
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["CHROMA_PERSIST_DIR"] = os.path.join(_scratch, "chroma_db")
+os.environ["INGESTION_MANIFEST_PATH"] = os.path.join(_scratch, "ingestion_manifest.json")
+os.environ["EMBEDDING_CACHE_PERSIST"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import pytest
+
+from app.models import Base, SessionLocal, engine, InsuranceProvider, InsurancePolicy, InsuranceType
+
+
+PROVIDERS = [
+    # (id, name, claim_settlement_ratio)
+    (1, "Star Health", 82.3),
+    (2, "Care Health", 91.5),
+    (3, "HDFC Life", 98.6),
+    (4, "ICICI Lombard", 95.4),
+    (5, "Niva Bupa", None),
+]
+
+PEC_COVERED = {"pre_existing_coverage": {"covered_after_waiting": True, "waiting_years": 3}}
+
+
+def _riders(*types):
+    return [{"type": t, "name": t.replace("_", " ").title()} for t in types]
+
+
+POLICIES = [
+    # Health
+    dict(id=1, provider_id=2, name="Care Supreme", insurance_type=InsuranceType.HEALTH,
+         min_coverage=3e5, max_coverage=1e6, min_age=18, max_age=65, base_premium=9600,
+         waiting_period_days=30, nyvo_rating=2.7, is_featured=True, coverage_details=PEC_COVERED),
+    dict(id=2, provider_id=1, name="Star Comprehensive", insurance_type=InsuranceType.HEALTH,
+         min_coverage=5e5, max_coverage=5e6, min_age=18, max_age=65, base_premium=14500,
+         waiting_period_days=90, nyvo_rating=3.7, is_featured=False, coverage_details={}),
+    dict(id=3, provider_id=4, name="ICICI Elevate", insurance_type=InsuranceType.HEALTH,
+         min_coverage=5e5, max_coverage=2.5e6, min_age=21, max_age=60, base_premium=21000,
+         waiting_period_days=365, nyvo_rating=3.3, is_featured=True, coverage_details=PEC_COVERED),
+    dict(id=4, provider_id=5, name="Niva ReAssure", insurance_type=InsuranceType.HEALTH,
+         min_coverage=5e5, max_coverage=1e7, min_age=18, max_age=99, base_premium=None,
+         waiting_period_days=0, nyvo_rating=None, is_featured=False, coverage_details=None),
+    dict(id=5, provider_id=2, name="Care Classic (withdrawn)", insurance_type=InsuranceType.HEALTH,
+         min_coverage=3e5, max_coverage=1e7, min_age=18, max_age=65, base_premium=5000,
+         waiting_period_days=30, nyvo_rating=5.0, is_featured=True, is_active=False),
+    dict(id=6, provider_id=2, name="Care Senior", insurance_type=InsuranceType.HEALTH,
+         min_coverage=3e5, max_coverage=1e7, min_age=None, max_age=80, base_premium=30000,
+         waiting_period_days=30, nyvo_rating=4.9, is_featured=True),
+    dict(id=7, provider_id=4, name="ICICI Basic", insurance_type=InsuranceType.HEALTH,
+         min_coverage=1e5, max_coverage=3e5, min_age=18, max_age=65, base_premium=4200,
+         waiting_period_days=60, nyvo_rating=2.1, is_featured=False),
+    # Term
+    dict(id=8, provider_id=3, name="HDFC Click 2 Protect", insurance_type=InsuranceType.TERM_LIFE,
+         min_coverage=2.5e6, max_coverage=1e8, min_age=18, max_age=65, base_premium=7800,
+         nyvo_rating=3.4, is_featured=True, riders_available=_riders("critical_illness", "accidental_death")),
+    dict(id=9, provider_id=4, name="ICICI iProtect", insurance_type=InsuranceType.TERM_LIFE,
+         min_coverage=2.5e6, max_coverage=5e7, min_age=18, max_age=60, base_premium=11200,
+         nyvo_rating=3.1, is_featured=False, riders_available=_riders("waiver_of_premium")),
+    dict(id=10, provider_id=2, name="Care Term Shield", insurance_type=InsuranceType.TERM_LIFE,
+         min_coverage=1e6, max_coverage=2e7, min_age=18, max_age=70, base_premium=5400,
+         nyvo_rating=3.9, is_featured=True, riders_available=[]),
+    dict(id=11, provider_id=1, name="Star Life Secure", insurance_type=InsuranceType.TERM_LIFE,
+         min_coverage=5e6, max_coverage=1e8, min_age=25, max_age=65, base_premium=15000,
+         nyvo_rating=4.8, is_featured=False,
+         riders_available=_riders("critical_illness", "accidental_death", "waiver_of_premium")),
+]
+
+
+def seed_policies(db) -> None:
+    """Insert the fixed provider/policy catalog the tests assert against"""
+    for provider_id, name, csr in PROVIDERS:
+        db.add(InsuranceProvider(
+            id=provider_id, name=name, claim_settlement_ratio=csr,
+            logo_url=f"https://example.com/{provider_id}.png",
+            website=f"https://example.com/{provider_id}", customer_support="1800-000-000"
+        ))
+    for values in POLICIES:
+        db.add(InsurancePolicy(premium_frequency="yearly", **values))
+    db.commit()
+
+
+@pytest.fixture
+def db():
+    """A session on a freshly created and seeded in-memory database"""
+    Base.metadata.create_all(bind=engine)
+    seeding = SessionLocal()
+    try:
+        seed_policies(seeding)
+    finally:
+        seeding.close()
+    
+    # Fresh session, so nothing is already in its identity map
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,94 @@
+"""Write-behind batching of chat history rows"""
+import asyncio
+
+from app.models import ChatSession
+from app.services.chat_history import ChatHistoryWriter
+
+
+def _row(i, session_id="s1", **values):
+    return {"session_id": session_id, "user_message": f"question {i}", "assistant_response": f"answer {i}", **values}
+
+
+def _stored(db):
+    return [m for (m,) in db.query(ChatSession.user_message).order_by(ChatSession.id)]
+
+
+def test_rows_are_written_in_batches(db):
+    writer = ChatHistoryWriter(batch_size=3, flush_interval=0.01)
+    
+    async def scenario():
+        writer.start()
+        for i in range(7):
+            await writer.submit(_row(i))
+        await writer.stop()
+    
+    asyncio.run(scenario())
+    
+    assert _stored(db) == [f"question {i}" for i in range(7)]
+    stats = writer.get_stats()
+    assert (stats["written"], stats["batches"], stats["dropped"]) == (7, 3, 0)
+    assert stats["running"] is False
+
+
+def test_queued_rows_are_flushed_on_shutdown(db):
+    writer = ChatHistoryWriter(batch_size=100, flush_interval=0.2)
+    
+    async def scenario():
+        writer.start()
+        await writer.submit(_row(0))
+        await writer.submit(_row(1, session_id="s2"))
+        await asyncio.sleep(0)
+        before = _stored(db)
+        await writer.stop()
+        return before
+    
+    assert asyncio.run(scenario()) == []
+    assert _stored(db) == ["question 0", "question 1"]
+    assert writer.pending_turns("s1") == writer.pending_turns("s2") == []
+
+
+def test_failed_commit_falls_back_to_single_rows(db):
+    writer = ChatHistoryWriter(batch_size=10, flush_interval=0.01)
+    # Not JSON serializable, so the batch insert fails
+    bad = _row(1, context_used={"intent": object()})
+    
+    async def scenario():
+        writer.start()
+        for row in (_row(0), bad, _row(2)):
+            await writer.submit(row)
+        await asyncio.sleep(0.1)
+        await writer.submit(_row(3))
+        await writer.stop()
+    
+    asyncio.run(scenario())
+    
+    assert _stored(db) == ["question 0", "question 2", "question 3"]
+    stats = writer.get_stats()
+    assert (stats["written"], stats["failed_batches"], stats["dropped"]) == (3, 1, 1)
+
+
+def test_writer_survives_unexpected_errors(db, monkeypatch):
+    writer = ChatHistoryWriter(batch_size=10, flush_interval=0.01)
+    write = writer._write
+    calls = []
+    
+    def flaky_write(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("worker thread died")
+        write(rows)
+    
+    monkeypatch.setattr(writer, "_write", flaky_write)
+    
+    async def scenario():
+        writer.start()
+        await writer.submit(_row(0))
+        await asyncio.sleep(0.1)
+        await writer.submit(_row(1))
+        await writer.stop()
+    
+    asyncio.run(scenario())
+    
+    assert _stored(db) == ["question 1"]
+    assert writer.get_stats()["dropped"] == 1
+    assert writer.pending_turns("s1") == []
@@ -0,0 +1,104 @@
+"""Token limits, overlap and heading boundaries of the markdown chunker"""
+import pytest
+
+from app.services.chunker import MarkdownTokenChunker
+from app.utils.tokens import ApproximateEncoding
+
+
+def _chunker(**options) -> MarkdownTokenChunker:
+    # Pin the encoding (4 characters per token) so counts don't depend on tiktoken
+    chunker = MarkdownTokenChunker(**options)
+    chunker._encoding = ApproximateEncoding()
+    return chunker
+
+
+def _paragraph(label: str, lines: int) -> str:
+    return "\n".join(f"{label} line {i:02d}: waiting periods apply." for i in range(lines))
+
+
+def test_signature_names_the_encoding_in_use():
+    chunker = MarkdownTokenChunker(max_tokens=128, encoding_name="no_such_encoding")
+    
+    assert chunker.signature == "md-token-v1:approximate:128:32:32"
+    assert _chunker(max_tokens=128).signature == "md-token-v1:approximate:128:32:32"
+
+
+def test_chunks_stay_within_max_tokens():
+    chunker = _chunker(max_tokens=64, overlap_tokens=16, min_tokens=8)
+    
+    chunks = chunker.chunk_text("# Guide\n\n" + _paragraph("Body", 60))
+    
+    assert len(chunks) > 5
+    for chunk in chunks:
+        assert chunk.token_count <= 64
+        assert chunker.count_tokens(chunk.text) <= 64
+
+
+def test_consecutive_chunks_overlap():
+    chunker = _chunker(max_tokens=64, overlap_tokens=24, min_tokens=8)
+    
+    chunks = chunker.chunk_text(_paragraph("Body", 30))
+    
+    for previous, current in zip(chunks, chunks[1:]):
+        previous_lines = previous.text.splitlines()
+        current_lines = current.text.splitlines()
+        # Whole trailing lines worth up to overlap_tokens are carried over
+        assert current_lines[:2] == previous_lines[-2:]
+        assert current_lines[2] not in previous_lines
+
+
+def test_headings_start_new_chunks_with_their_path():
+    chunker = _chunker(max_tokens=256, min_tokens=8)
+    text = "\n\n".join([
+        "# Health", _paragraph("Intro", 3),
+        "## Waiting periods", _paragraph("Waiting", 3),
+        "## Exclusions", _paragraph("Exclusions", 3),
+        "# Term", _paragraph("Term", 3),
+    ])
+    
+    chunks = chunker.chunk_text(text)
+    
+    assert [chunk.heading_path for chunk in chunks] == [
+        ["Health"], ["Health", "Waiting periods"], ["Health", "Exclusions"], ["Term"],
+    ]
+    assert chunks[1].text.startswith("## Waiting periods")
+    assert chunks[1].heading_path_str == "Health > Waiting periods"
+
+
+def test_short_sections_merge_until_min_tokens():
+    chunker = _chunker(max_tokens=256, min_tokens=64)
+    
+    chunks = chunker.chunk_text("# A\n\nshort\n\n# B\n\n" + _paragraph("Body", 20))
+    
+    assert chunks[0].text.startswith("# A\n\nshort\n\n# B")
+    assert chunks[0].heading_path == ["A"]
+
+
+def test_headings_inside_code_fences_are_ignored():
+    chunker = _chunker(max_tokens=256, min_tokens=0)
+    
+    chunks = chunker.chunk_text("# Real\n\ntext\n\n```\n# not a heading\n```\n\nmore")
+    
+    assert len(chunks) == 1
+    assert chunks[0].heading_path == ["Real"]
+
+
+def test_long_line_is_cut_into_windows():
+    chunker = _chunker(max_tokens=32, overlap_tokens=8, min_tokens=0)
+    line = "".join(f"{i:04d}" for i in range(100))  # 100 tokens, one line
+    
+    chunks = chunker.chunk_text(line)
+    
+    assert all(chunk.token_count <= 32 for chunk in chunks)
+    assert chunks[0].text == line[:128]
+    assert chunks[1].text.startswith(line[96:128])
+    assert chunks[-1].text.endswith(line[-16:])
+
+
+@pytest.mark.parametrize("piece_size", [7, 100, 4096])
+def test_streamed_pieces_match_whole_text(piece_size):
+    chunker = _chunker(max_tokens=64, overlap_tokens=16, min_tokens=8)
+    text = "# Guide\n\n" + _paragraph("Body", 40) + "\n\n## More\n\n" + _paragraph("More", 10)
+    pieces = [text[i:i + piece_size] for i in range(0, len(text), piece_size)]
+    
+    assert list(chunker.iter_chunks(pieces)) == chunker.chunk_text(text)
@@ -0,0 +1,85 @@
+"""Server-side conversation memory: rollover, summaries and reloading evicted sessions"""
+import asyncio
+import importlib
+
+from app.models import ChatSession
+from app.services.chat_history import ChatHistoryWriter
+from app.services.chatbot import ChatbotService
+from app.services.conversation_memory import ConversationMemoryStore, SessionMemory
+
+conversation_memory_module = importlib.import_module("app.services.conversation_memory")
+
+
+def _add_turns(memory, count):
+    for i in range(count):
+        memory.add_turn(f"question {i}", f"answer {i}")
+
+
+def test_oldest_turn_rolls_into_earlier_questions():
+    memory = SessionMemory(max_turns=2, max_summary_items=2)
+    _add_turns(memory, 5)
+    
+    assert memory.history() == [
+        {"role": "user", "content": "question 3"},
+        {"role": "assistant", "content": "answer 3"},
+        {"role": "user", "content": "question 4"},
+        {"role": "assistant", "content": "answer 4"},
+    ]
+    # Bounded: only the most recent rolled-out questions are kept
+    assert list(memory.earlier_questions) == ["question 1", "question 2"]
+
+
+def test_rolled_out_questions_are_summarised_in_the_prompt():
+    memory = SessionMemory(max_turns=1, max_summary_items=5)
+    memory.add_turn("I am 34 and need 10 lakh family cover", "Noted.")
+    memory.add_turn("What about maternity?", "Most plans wait 2-4 years.")
+    
+    messages = ChatbotService(db=None)._build_messages(
+        "and OPD?", memory.history(), [], None, memory
+    )
+    
+    summaries = [m["content"] for m in messages[1:] if m["role"] == "system"]
+    assert len(summaries) == 1
+    assert "- I am 34 and need 10 lakh family cover" in summaries[0]
+    assert messages[-3:] == [
+        {"role": "user", "content": "What about maternity?"},
+        {"role": "assistant", "content": "Most plans wait 2-4 years."},
+        {"role": "user", "content": "and OPD?"},
+    ]
+
+
+def test_evicted_session_is_reloaded_from_the_database(db):
+    for i in range(4):
+        db.add(ChatSession(session_id="s1", user_message=f"question {i}", assistant_response=f"answer {i}"))
+    db.commit()
+    store = ConversationMemoryStore(max_sessions=1, max_turns=2, max_summary_items=1)
+    
+    store.get("s1", db)
+    store.get("s2", db)  # evicts s1
+    memory = store.get("s1", db)
+    
+    assert store.get_stats()["loads"] == 3
+    assert [m["content"] for m in memory.history() if m["role"] == "user"] == ["question 2", "question 3"]
+    assert list(memory.earlier_questions) == ["question 1"]
+
+
+def test_reload_includes_turns_still_queued_for_writing(db, monkeypatch):
+    writer = ChatHistoryWriter(flush_interval=0.01)
+    monkeypatch.setattr(conversation_memory_module, "chat_history", writer)
+    store = ConversationMemoryStore(max_turns=5)
+    
+    async def scenario():
+        writer.start()
+        await writer.submit({"session_id": "s1", "user_message": "I am 30", "assistant_response": "Noted."})
+        queued = store.get("s1", db)
+        await writer.stop()
+        store.forget("s1")
+        return queued, store.get("s1", db)
+    
+    queued, reloaded = asyncio.run(scenario())
+    
+    expected = [{"role": "user", "content": "I am 30"}, {"role": "assistant", "content": "Noted."}]
+    assert queued.history() == expected
+    # Once committed the turn comes from the table, not twice
+    assert reloaded.history() == expected
+    assert writer.pending_turns("s1") == []
@@ -0,0 +1,107 @@
+"""Two-tier query embedding cache"""
+import sqlite3
+
+import pytest
+
+from app.services.embedding_cache import QueryEmbeddingCache, embedding_namespace
+
+
+class Embedder:
+    """Counts calls; the vector encodes the call number"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    def __call__(self, text):
+        self.calls.append(text)
+        return [float(len(self.calls)), 0.5, -0.25]
+
+
+@pytest.fixture
+def persist_path(tmp_path):
+    return str(tmp_path / "cache" / "embeddings.sqlite3")
+
+
+def test_memory_hit_skips_compute():
+    cache = QueryEmbeddingCache("model-a")
+    embed = Embedder()
+    
+    first = cache.get_or_compute("What is a  waiting\nperiod?", embed)
+    second = cache.get_or_compute("What is a waiting period?", embed)
+    
+    assert first == second == [1.0, 0.5, -0.25]
+    assert len(embed.calls) == 1
+    stats = cache.get_stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 1)
+
+
+def test_memory_tier_is_bounded():
+    cache = QueryEmbeddingCache("model-a", max_entries=2)
+    embed = Embedder()
+    for text in ("a", "b", "c", "a"):
+        cache.get_or_compute(text, embed)
+    
+    assert embed.calls == ["a", "b", "c", "a"]
+    assert cache.get_stats()["size"] == 2
+
+
+def test_disk_tier_survives_restart(persist_path):
+    first = QueryEmbeddingCache("model-a", persist_path=persist_path)
+    first.get_or_compute("co-pay", Embedder())
+    first.close()
+    
+    restarted = QueryEmbeddingCache("model-a", persist_path=persist_path)
+    embed = Embedder()
+    
+    assert restarted.get_or_compute("co-pay", embed) == [1.0, 0.5, -0.25]
+    assert restarted.get_or_compute("co-pay", embed) == [1.0, 0.5, -0.25]
+    assert embed.calls == []
+    stats = restarted.get_stats()
+    assert (stats["persistent"], stats["disk_hits"], stats["memory_hits"]) == (True, 1, 1)
+
+
+def test_entries_are_keyed_by_model(persist_path):
+    QueryEmbeddingCache("model-a", persist_path=persist_path).get_or_compute("co-pay", Embedder())
+    other_model = QueryEmbeddingCache("model-b", persist_path=persist_path)
+    embed = Embedder()
+    
+    other_model.get_or_compute("co-pay", embed)
+    
+    assert embed.calls == ["co-pay"]
+    assert other_model.get_stats()["disk_hits"] == 0
+
+
+def test_namespace_includes_the_model():
+    class OpenAIEmbeddingFunction:
+        def __init__(self, model_name):
+            self.model_name = model_name
+    
+    class ConfiguredEmbeddingFunction:
+        def get_config(self):
+            return {"model_name": "all-MiniLM-L6-v2"}
+    
+    class PlainEmbeddingFunction:
+        pass
+    
+    assert embedding_namespace(OpenAIEmbeddingFunction("text-embedding-3-small")) == (
+        "OpenAIEmbeddingFunction:text-embedding-3-small"
+    )
+    assert embedding_namespace(OpenAIEmbeddingFunction("text-embedding-3-large")) != (
+        embedding_namespace(OpenAIEmbeddingFunction("text-embedding-3-small"))
+    )
+    assert embedding_namespace(ConfiguredEmbeddingFunction()) == "ConfiguredEmbeddingFunction:all-MiniLM-L6-v2"
+    assert embedding_namespace(PlainEmbeddingFunction()) == "PlainEmbeddingFunction"
+
+
+def test_disk_errors_are_cache_misses(persist_path):
+    cache = QueryEmbeddingCache("model-a", persist_path=persist_path)
+    # Another process dropped the table out from under us
+    with sqlite3.connect(persist_path) as other:
+        other.execute("DROP TABLE query_embeddings")
+    embed = Embedder()
+    
+    assert cache.get_or_compute("co-pay", embed) == [1.0, 0.5, -0.25]
+    assert cache.get_or_compute("co-pay", embed) == [1.0, 0.5, -0.25]
+    assert embed.calls == ["co-pay"]
+    cache.clear()  # logged, not raised
+    assert cache.get_stats()["misses"] == 1
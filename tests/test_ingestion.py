@@ -0,0 +1,224 @@
+"""Incremental content ingestion against an in-memory vector store"""
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from app.core import settings
+from app.services.ingestion_manifest import IngestionManifest
+from app.services.vector_store import ContentIngestionService, VectorStoreService
+from app.utils.document_extraction import DocumentReadError
+
+# The module, not the ``vector_store`` singleton app.services re-exports
+vector_store_module = importlib.import_module("app.services.vector_store")
+
+
+class FakeVectorStore:
+    """The parts of VectorStoreService ingestion uses, backed by a dict"""
+    
+    chunk_id = staticmethod(VectorStoreService.chunk_id)
+    
+    def __init__(self):
+        self.documents = {}
+        self.embedded = []
+        self.collection = self
+    
+    def count(self) -> int:
+        return len(self.documents)
+    
+    def embed_documents(self, documents):
+        self.embedded.extend(documents)
+        return [[float(len(d))] for d in documents]
+    
+    def upsert_documents(self, documents, metadatas, ids, embeddings=None):
+        for chunk_id, document in zip(ids, documents):
+            self.documents[chunk_id] = document
+    
+    def delete_documents(self, ids=None, where=None):
+        for chunk_id in ids or []:
+            self.documents.pop(chunk_id, None)
+    
+    def clear_collection(self):
+        self.documents.clear()
+
+
+def _sections(count, prefix="Section"):
+    return "\n\n".join(
+        f"## {prefix} {i}\n\n" + f"Waiting periods and exclusions for plan {i}. " * 20
+        for i in range(count)
+    )
+
+
+@pytest.fixture
+def ingestion(tmp_path):
+    content = tmp_path / "content"
+    content.mkdir()
+    service = ContentIngestionService(FakeVectorStore())
+    service.content_path = content
+    service.manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    return service
+
+
+def test_unchanged_files_are_skipped(ingestion):
+    (ingestion.content_path / "guide.md").write_text(_sections(6), encoding="utf-8")
+    
+    first = ingestion.ingest_content_library()
+    second = ingestion.ingest_content_library()
+    
+    assert first["status"] == "success"
+    assert first["chunks_added"] > 1
+    assert second["files_unchanged"] == 1
+    assert second["files_processed"] == 0
+
+
+def test_read_error_keeps_previous_chunks_and_retries(ingestion, monkeypatch):
+    path = ingestion.content_path / "guide.md"
+    path.write_text(_sections(6), encoding="utf-8")
+    ingestion.ingest_content_library()
+    indexed = dict(ingestion.vector_store.documents)
+    
+    path.write_text(_sections(6, prefix="Chapter"), encoding="utf-8")
+    real_iter_pages = vector_store_module.iter_pages
+    
+    def truncated(file_path, block_chars=64 * 1024):
+        yield next(real_iter_pages(file_path, block_chars=200))
+        raise DocumentReadError("disk read failed")
+    
+    monkeypatch.setattr(vector_store_module, "iter_pages", truncated)
+    result = ingestion.ingest_content_library()
+    
+    assert result["status"] == "partial"
+    assert result["files_failed"] == 1
+    assert result["errors"] == [{"source": str(path), "error": "disk read failed"}]
+    assert result["chunks_removed"] == 0
+    # The tail of the file was never read, so its chunks are still indexed
+    assert len(ingestion.vector_store.documents) >= len(indexed)
+    assert not ingestion.manifest.is_current(
+        str(path), ingestion.manifest.get(str(path))["file_hash"], ingestion.chunker.signature
+    )
+    
+    monkeypatch.setattr(vector_store_module, "iter_pages", real_iter_pages)
+    retried = ingestion.ingest_content_library()
+    
+    assert retried["status"] == "success"
+    assert retried["files_processed"] == 1
+    assert all("Chapter" in doc for doc in ingestion.vector_store.documents.values())
+
+
+def _block_embedding(ingestion):
+    """Make the next embed call wait; returns (embedding started, release)"""
+    embedding = threading.Event()
+    release = threading.Event()
+    store = ingestion.vector_store
+    embed_documents = store.embed_documents
+    
+    def slow_embed(documents):
+        embedding.set()
+        release.wait(timeout=10)
+        return embed_documents(documents)
+    
+    store.embed_documents = slow_embed
+    return embedding, release
+
+
+def test_concurrent_ingest_is_rejected(ingestion):
+    (ingestion.content_path / "guide.md").write_text(_sections(2), encoding="utf-8")
+    embedding, release = _block_embedding(ingestion)
+    results = []
+    first = threading.Thread(target=lambda: results.append(ingestion.ingest_content_library()))
+    first.start()
+    try:
+        assert embedding.wait(timeout=10)
+        assert ingestion.ingest_content_library() == {
+            "status": "busy", "message": "Ingestion already running"
+        }
+    finally:
+        release.set()
+        first.join(timeout=10)
+    
+    assert results[0]["status"] == "success"
+    assert ingestion.ingest_content_library()["files_unchanged"] == 1
+
+
+def test_insert_near_top_only_embeds_new_chunks(ingestion):
+    path = ingestion.content_path / "guide.md"
+    path.write_text(_sections(8), encoding="utf-8")
+    first = ingestion.ingest_content_library()
+    store = ingestion.vector_store
+    store.embedded.clear()
+    
+    path.write_text("## Overview\n\nA short note on choosing cover.\n\n" + _sections(8), encoding="utf-8")
+    second = ingestion.ingest_content_library()
+    
+    # The short new section merges into the first chunk; the other seven
+    # chunks shifted position but keep their IDs and are not re-embedded
+    assert first["chunks_added"] == 8
+    assert (first["files_updated"], second["files_updated"]) == (0, 1)
+    assert second["chunks_added"] == 1
+    assert second["chunks_removed"] == 1
+    assert len(store.embedded) == 1
+    assert store.embedded[0].startswith("## Overview")
+    assert store.count() == 8
+
+
+def test_clear_is_rejected_while_ingesting(ingestion):
+    (ingestion.content_path / "guide.md").write_text(_sections(2), encoding="utf-8")
+    embedding, release = _block_embedding(ingestion)
+    first = threading.Thread(target=ingestion.ingest_content_library)
+    first.start()
+    try:
+        assert embedding.wait(timeout=10)
+        assert ingestion.clear_content_library()["status"] == "busy"
+    finally:
+        release.set()
+        first.join(timeout=10)
+    
+    assert ingestion.vector_store.count() > 0
+    assert ingestion.clear_content_library()["status"] == "success"
+    assert ingestion.vector_store.count() == 0
+    assert ingestion.manifest.files == {}
+
+
+def test_pooled_extraction_is_bounded_by_buffer_size(ingestion, monkeypatch):
+    for i in range(6):
+        (ingestion.content_path / f"policy{i}.pdf").write_bytes(b"%PDF" + b"x" * 400 * 1024)
+    (ingestion.content_path / "huge.pdf").write_bytes(b"%PDF" + b"x" * 2 * 1024 * 1024)
+    monkeypatch.setattr(settings, "ingestion_extract_workers", 4)
+    monkeypatch.setattr(settings, "ingestion_max_buffer_mb", 1)
+    # Threads stand in for worker processes so the fakes below are visible
+    monkeypatch.setattr(vector_store_module, "ProcessPoolExecutor", ThreadPoolExecutor)
+    
+    lock = threading.Lock()
+    held = set()
+    max_held = []
+    pooled = []
+    
+    def fake_extract_text(file_path):
+        with lock:
+            held.add(file_path)
+            pooled.append(Path(file_path).name)
+            max_held.append(len(held))
+        return _sections(1, prefix=file_path)
+    
+    def fake_future_pages(future):
+        text = future.result()
+        yield text
+        with lock:
+            held.discard(text.split("\n")[0][3:-2])
+    
+    def fake_iter_pages(file_path, block_chars=64 * 1024):
+        yield _sections(1, prefix=file_path)
+    
+    monkeypatch.setattr(vector_store_module, "extract_text", fake_extract_text)
+    monkeypatch.setattr(vector_store_module, "_future_pages", fake_future_pages)
+    monkeypatch.setattr(vector_store_module, "iter_pages", fake_iter_pages)
+    result = ingestion.ingest_content_library()
+    
+    assert result["status"] == "success"
+    assert result["files_processed"] == 7
+    # 1 MB buffer: at most two 400 KB files extracted and not yet indexed
+    assert max(max_held) == 2
+    # Too big for the buffer: streamed in-process, never pooled
+    assert sorted(pooled) == [f"policy{i}.pdf" for i in range(6)]
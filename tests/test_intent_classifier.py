@@ -0,0 +1,29 @@
+"""Keyword intent classification: whole words, with inflected forms listed"""
+import pytest
+
+from app.services.intent_classifier import IntentClassifier
+
+
+@pytest.mark.parametrize("message, insurance_type", [
+    ("best healthcare plan for me", "health"),
+    ("Are medicals needed before buying?", "health"),
+    ("Compare policy terms of 20 and 30 years", "term_life"),
+    ("Is my motorcycle covered?", "motor"),
+    ("Travel insurance for a trip to Europe", "travel"),
+    # Keywords inside other words don't count
+    ("How do I determine the right cover?", None),
+    ("My lifestyle is healthy", None),
+    ("Cardiac cover or critical illness?", None),
+])
+def test_insurance_type(message, insurance_type):
+    assert IntentClassifier().classify(message)["insurance_type"] == insurance_type
+
+
+def test_flags():
+    classifier = IntentClassifier()
+    
+    assert classifier.classify("Which policies cover OPD?")["needs_recommendation"]
+    assert classifier.classify("How does the claims process work?")["asking_about_policy"]
+    assert classifier.classify("What coverages are included?")["asking_about_policy"]
+    assert classifier.classify("Compare HDFC vs ICICI")["needs_comparison"]
+    assert not classifier.classify("canvas bags")["needs_comparison"]
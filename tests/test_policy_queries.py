@@ -0,0 +1,50 @@
+"""Policy detail and comparison lookups must not issue a query per policy"""
+import pytest
+
+from app.services.recommendation_engine import RecommendationEngine
+from app.utils.query_count import assert_query_count
+
+
+def test_get_policy_details_is_one_query(db):
+    engine = RecommendationEngine(db)
+    
+    with assert_query_count(1):
+        details = engine.get_policy_details(8)
+        # Provider fields come from the eager load, not a lazy query
+        provider = details["provider"]
+    
+    assert details["policy_id"] == 8
+    assert provider["name"] == "HDFC Life"
+    assert provider["claim_settlement_ratio"] == 98.6
+    assert provider["website"] == "https://example.com/3"
+
+
+def test_get_policy_details_missing_policy(db):
+    engine = RecommendationEngine(db)
+    
+    with assert_query_count(1):
+        assert engine.get_policy_details(999) is None
+
+
+def test_compare_policies_is_one_query(db):
+    engine = RecommendationEngine(db)
+    policy_ids = [1, 2, 3, 8, 9, 11]
+    
+    with assert_query_count(1):
+        compared = engine.compare_policies(policy_ids)
+    
+    assert sorted(p["policy_id"] for p in compared) == policy_ids
+    providers = {p["policy_id"]: p["provider"]["name"] for p in compared}
+    assert providers == {
+        1: "Care Health", 2: "Star Health", 3: "ICICI Lombard",
+        8: "HDFC Life", 9: "ICICI Lombard", 11: "Star Health"
+    }
+
+
+def test_assert_query_count_reports_extra_queries(db):
+    engine = RecommendationEngine(db)
+    
+    with pytest.raises(AssertionError, match="Expected at most 1 queries, got 2"):
+        with assert_query_count(1):
+            engine.get_policy_details(1)
+            engine.get_policy_details(2)
@@ -0,0 +1,88 @@
+"""ETag / If-None-Match handling of the cached policy endpoints"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.main import app
+from app.models import InsurancePolicy, engine
+from app.services import policy_catalog, policy_responses
+
+
+@pytest.fixture
+def client(db):
+    policy_catalog.refresh(db)
+    policy_responses.clear()
+    # No context manager: the lifespan (poller, writer, LLM clients) isn't needed
+    yield TestClient(app)
+    policy_responses.clear()
+    policy_catalog.invalidate()
+
+
+def test_detail_is_served_with_an_etag(client):
+    response = client.get("/api/v1/policy/1")
+    
+    assert response.status_code == 200
+    assert response.json()["name"] == "Care Supreme"
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_matching_if_none_match_gets_304(client):
+    etag = client.get("/api/v1/policy/1").headers["etag"]
+    
+    cached = client.get("/api/v1/policy/1", headers={"If-None-Match": etag})
+    weak = client.get("/api/v1/policy/1", headers={"If-None-Match": f'"other", W/{etag}'})
+    other = client.get("/api/v1/policy/1", headers={"If-None-Match": '"other"'})
+    
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert weak.status_code == 304
+    assert other.status_code == 200
+    assert policy_responses.get_stats()["hits"] == 3
+
+
+def test_out_of_process_edit_shows_after_catalog_refresh(client):
+    etag = client.get("/api/v1/policy/1").headers["etag"]
+    
+    # As another worker or a script would: no ORM events in this process
+    with engine.begin() as connection:
+        connection.execute(
+            update(InsurancePolicy.__table__).where(InsurancePolicy.id == 1).values(base_premium=9900)
+        )
+    stale = client.get("/api/v1/policy/1", headers={"If-None-Match": etag})
+    assert client.post("/api/v1/catalog/refresh").status_code == 200
+    fresh = client.get("/api/v1/policy/1", headers={"If-None-Match": etag})
+    
+    assert stale.status_code == 304
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["premium"]["base"] == 9900
+
+
+def test_in_process_edit_changes_the_etag_immediately(client, db):
+    etag = client.get("/api/v1/policy/1").headers["etag"]
+    
+    db.get(InsurancePolicy, 1).base_premium = 9900
+    db.commit()
+    response = client.get("/api/v1/policy/1", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_unknown_policy_is_404(client):
+    assert client.get("/api/v1/policy/999").status_code == 404
+    assert client.post("/api/v1/policy/compare", json={"policy_ids": [998, 999]}).status_code == 404
+
+
+def test_comparison_etag(client):
+    first = client.post("/api/v1/policy/compare", json={"policy_ids": [1, 2]})
+    again = client.post(
+        "/api/v1/policy/compare", json={"policy_ids": [1, 2]},
+        headers={"If-None-Match": first.headers["etag"]}
+    )
+    
+    assert first.status_code == 200
+    assert first.json()["count"] == 2
+    assert again.status_code == 304
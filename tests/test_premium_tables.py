@@ -0,0 +1,96 @@
+"""Premium quotes compiled from policy premium_factors"""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.premium_tables import PremiumTable
+
+
+FACTORS = {
+    "age_bands": [[18, 35, 1.0], [36, 45, 1.5], [46, 65, 2.0]],
+    "family_size": {"1": 1.0, "2": 1.6, "4": 2.2},
+    "city_tier": {"1": 1.2, "2": 1.0, "3": 0.9},
+    "smoker": 1.5,
+    "sum_insured_slabs": [[500000, 1.0], [1000000, 1.4], [2500000, 2.0]],
+}
+
+
+def _policy(policy_id, base_premium=10000, premium_factors=None):
+    return SimpleNamespace(id=policy_id, base_premium=base_premium, premium_factors=premium_factors)
+
+
+@pytest.fixture
+def policies():
+    return [
+        _policy(1, premium_factors=FACTORS),
+        _policy(2, base_premium=8000),
+        _policy(3, base_premium=None, premium_factors=FACTORS),
+        _policy(4, premium_factors={"family_size": [1.0, 1.6], "smoker": 1.5}),
+        _policy(5, premium_factors={"city_tier": ["1.2"]}),
+    ]
+
+
+@pytest.fixture
+def table(policies):
+    return PremiumTable(policies)
+
+
+@pytest.mark.parametrize("age, expected", [(18, 10000), (35, 10000), (36, 15000), (45, 15000), (60, 20000), (70, 10000)])
+def test_age_bands(table, policies, age, expected):
+    assert table.quote(policies[0], age) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("family_size, expected", [(1, 10000), (2, 16000), (3, 16000), (4, 22000), (9, 22000)])
+def test_family_size_uses_largest_listed_size_below(table, policies, family_size, expected):
+    assert table.quote(policies[0], 30, family_size=family_size) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("city, expected", [("Mumbai", 12000), (" pune ", 12000), ("Jaipur", 10000), ("Shimla", 10000), (None, 10000)])
+def test_city_tier(table, policies, city, expected):
+    assert table.quote(policies[0], 30, city=city) == pytest.approx(expected)
+
+
+def test_smoker_loading(table, policies):
+    assert table.quote(policies[0], 30, smoker=True) == pytest.approx(15000)
+    assert table.quote(policies[0], 30, smoker=False) == pytest.approx(10000)
+    # No factors: smokers pay the base premium
+    assert table.quote(policies[1], 30, smoker=True) == pytest.approx(8000)
+
+
+@pytest.mark.parametrize("sum_insured, expected", [
+    (300000, 10000), (500000, 10000), (500001, 14000), (1000000, 14000),
+    (2000000, 20000), (5000000, 20000),
+])
+def test_coverage_slabs(table, policies, sum_insured, expected):
+    assert table.quote(policies[0], 30, sum_insured=sum_insured) == pytest.approx(expected)
+
+
+def test_factors_combine(table, policies):
+    quote = table.quote(policies[0], 40, family_size=2, city="Delhi", smoker=True, sum_insured=1000000)
+    
+    assert quote == pytest.approx(10000 * 1.5 * 1.6 * 1.2 * 1.5 * 1.4)
+
+
+def test_missing_base_premium_is_unpriced(table, policies):
+    assert table.quote(policies[2], 30) is None
+    
+    rows = table.quote_rows(np.arange(len(policies)), 30)
+    assert np.isnan(rows[2])
+    assert not np.isnan(np.delete(rows, 2)).any()
+
+
+@pytest.mark.parametrize("index", [3, 4])
+def test_malformed_factors_fall_back_to_base_premium(table, policies, index):
+    policy = policies[index]
+    
+    assert table.quote(policy, 50, family_size=2, city="Mumbai", smoker=True, sum_insured=2e6) == pytest.approx(10000)
+
+
+def test_quote_rows_matches_quote(table, policies):
+    rows = table.quote_rows(np.array([0, 1, 3]), 40, family_size=4, city="Mumbai", smoker=True, sum_insured=7e5)
+    
+    assert list(rows) == [
+        table.quote(policies[i], 40, family_size=4, city="Mumbai", smoker=True, sum_insured=7e5)
+        for i in (0, 1, 3)
+    ]
@@ -0,0 +1,78 @@
+"""Prompt assembly stays within the token budget"""
+import pytest
+
+from app.services.chatbot import ChatbotService, SYSTEM_PROMPT
+from app.services.prompt_builder import TOKENS_PER_MESSAGE, TOKENS_REPLY_PRIMING, PromptBuilder
+from app.utils.tokens import ApproximateEncoding
+
+
+def _builder(**options) -> PromptBuilder:
+    builder = PromptBuilder("You are a helpful insurance advisor.", model="gpt-4", **options)
+    builder._encoding = ApproximateEncoding()
+    return builder
+
+
+def _history(turns: int):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Question {i}: " + "what does the policy cover? " * 5})
+        history.append({"role": "assistant", "content": f"Answer {i}: " + "it covers hospitalisation. " * 20})
+    return history
+
+
+def _prompt_tokens(builder: PromptBuilder, messages) -> int:
+    return sum(builder._message_tokens(m["content"]) for m in messages) + TOKENS_REPLY_PRIMING
+
+
+@pytest.mark.parametrize("max_prompt_tokens", [400, 800, 1500])
+def test_history_is_trimmed_to_the_budget(max_prompt_tokens):
+    builder = _builder(max_prompt_tokens=max_prompt_tokens, max_history_messages=50)
+    history = _history(20)
+    
+    messages = builder.build("And maternity?", history, ["Maternity cover starts after 2 years."] * 3)
+    usage = builder.last_usage
+    
+    assert usage.budget == max_prompt_tokens
+    assert _prompt_tokens(builder, messages) <= max_prompt_tokens
+    assert usage.total_tokens == _prompt_tokens(builder, messages)
+    assert 0 < usage.history_kept < len(history)
+    # The newest messages are the ones kept
+    kept = messages[-1 - usage.history_kept:-1]
+    assert kept == history[-usage.history_kept:]
+
+
+def test_trimmed_history_is_summarised():
+    builder = _builder(max_prompt_tokens=600, max_history_messages=50, summary_tokens=120)
+    history = _history(20)
+    
+    messages = builder.build("And maternity?", history, [])
+    
+    assert messages[1]["role"] == "system"
+    assert messages[1]["content"].startswith("Summary of earlier conversation")
+    assert "- Question 0:" not in messages[1]["content"]  # oldest questions give way first
+    assert builder.last_usage.summary_tokens > 0
+    assert _prompt_tokens(builder, messages) <= 600
+
+
+def test_lowest_ranked_context_is_dropped_first():
+    builder = _builder(max_prompt_tokens=300)
+    chunks = [f"chunk {i} " + "x" * 300 for i in range(5)]
+    
+    messages = builder.build("What is a co-pay?", [], chunks)
+    
+    usage = builder.last_usage
+    assert 0 < usage.context_kept < len(chunks)
+    assert all(chunk in messages[-1]["content"] for chunk in chunks[:usage.context_kept])
+    assert chunks[usage.context_kept] not in messages[-1]["content"]
+
+
+def test_chat_services_share_one_builder():
+    first, second = ChatbotService(db=None), ChatbotService(db=None)
+    
+    first._build_messages("hi", [], [], None)
+    
+    assert first.prompt_builder is second.prompt_builder
+    assert first.prompt_builder.system_prompt == SYSTEM_PROMPT
+    # Counted once, on the first build, and reused by every later request
+    assert second.prompt_builder._system_tokens == first.prompt_builder._message_tokens(SYSTEM_PROMPT)
+    assert second.prompt_builder._system_tokens >= TOKENS_PER_MESSAGE
@@ -0,0 +1,129 @@
+"""Recommendation scores and rankings are pinned to the original ORM implementation"""
+import pytest
+
+from app.services.policy_catalog import PolicyCatalogService
+from app.services.policy_scoring import score_health, score_term, top_k
+from app.services.recommendation_engine import RecommendationEngine
+
+
+# (request, [(policy_id, unrounded score)]) as returned, in order, by the
+# per-policy ORM scorer this code replaced, run on the conftest catalog.
+# Scores are compared by repr(), so a difference in the last bit fails.
+BASELINE_HEALTH = [
+    (dict(age=30, coverage_needed=5e5, budget_monthly=1000, family_size=1,
+          pre_existing_conditions=["diabetes"], city="Mumbai"),
+     [(1, 100), (3, 97.9), (2, 69.1), (4, 55.0)]),
+    (dict(age=62, coverage_needed=1e6),
+     [(1, 93.1), (2, 69.1), (4, 55.0)]),
+    (dict(age=40, coverage_needed=2e6, budget_monthly=1300, family_size=3, limit=2),
+     [(3, 94.9), (2, 79.1)]),
+    (dict(age=25, coverage_needed=3e5, budget_monthly=700, pre_existing_conditions=["asthma"], limit=10),
+     [(1, 100), (7, 99.3), (3, 97.9), (2, 69.1), (4, 55.0)]),
+]
+
+BASELINE_TERM = [
+    (dict(age=30, coverage_needed=1e7, annual_income=1e6, budget_monthly=800),
+     [(8, 100), (10, 96.7), (9, 92.3), (11, 83.4)]),
+    (dict(age=55, coverage_needed=3e7, smoker=True),
+     [(8, 96.2), (9, 82.3), (11, 73.4)]),
+    (dict(age=22, coverage_needed=5e6, annual_income=8e5, budget_monthly=1000, limit=2),
+     [(8, 100), (9, 92.3)]),
+    (dict(age=68, coverage_needed=1e7),
+     [(10, 76.7)]),
+]
+
+
+def _health_args(request):
+    return (
+        request["age"], request["coverage_needed"], request.get("budget_monthly"),
+        request.get("family_size", 1), request.get("pre_existing_conditions"), request.get("city")
+    )
+
+
+def _term_args(request):
+    return (
+        request["age"], request["coverage_needed"], request.get("annual_income"),
+        request.get("smoker", False), request.get("budget_monthly")
+    )
+
+
+def _exact(ranked):
+    return [(policy_id, repr(score)) for policy_id, score in ranked]
+
+
+@pytest.fixture
+def engine(db):
+    catalog = PolicyCatalogService().refresh(db)
+    return RecommendationEngine(db, catalog=catalog)
+
+
+@pytest.mark.parametrize("request_, expected", BASELINE_HEALTH)
+def test_health_recommendations_match_baseline(engine, request_, expected):
+    results = engine.get_health_insurance_recommendations(**request_)
+    
+    assert [(r["policy_id"], r["match_score"]) for r in results] == [
+        (policy_id, round(score, 1)) for policy_id, score in expected
+    ]
+
+
+@pytest.mark.parametrize("request_, expected", BASELINE_TERM)
+def test_term_recommendations_match_baseline(engine, request_, expected):
+    results = engine.get_term_insurance_recommendations(**request_)
+    
+    assert [(r["policy_id"], r["match_score"]) for r in results] == [
+        (policy_id, round(score, 1)) for policy_id, score in expected
+    ]
+
+
+@pytest.mark.parametrize("request_, expected", BASELINE_HEALTH)
+def test_health_scores_are_bit_for_bit(engine, request_, expected):
+    matrix = engine.catalog.matrix_of_type("health")
+    idx = matrix.eligible(request_["age"], request_["coverage_needed"])
+    scores = score_health(matrix, idx, *_health_args(request_))
+    ranked = top_k(idx, scores, request_.get("limit", 5))
+    
+    assert _exact((matrix.records[i].id, s) for i, s in ranked) == _exact(expected)
+    
+    # The scalar reference used by scripts/benchmark_scoring.py agrees too
+    reference = [
+        (policy_id, engine._calculate_health_score(engine.catalog.by_id[policy_id], *_health_args(request_)))
+        for policy_id, _ in expected
+    ]
+    assert _exact(reference) == _exact(expected)
+
+
+@pytest.mark.parametrize("request_, expected", BASELINE_TERM)
+def test_term_scores_are_bit_for_bit(engine, request_, expected):
+    matrix = engine.catalog.matrix_of_type("term_life")
+    idx = matrix.eligible(request_["age"], request_["coverage_needed"])
+    scores = score_term(matrix, idx, *_term_args(request_))
+    ranked = top_k(idx, scores, request_.get("limit", 5))
+    
+    assert _exact((matrix.records[i].id, s) for i, s in ranked) == _exact(expected)
+    
+    age, coverage_needed, annual_income, smoker, budget_monthly = _term_args(request_)
+    reference = [
+        (policy_id, engine._calculate_term_score(
+            engine.catalog.by_id[policy_id], age, coverage_needed,
+            annual_income, smoker, None, budget_monthly
+        ))
+        for policy_id, _ in expected
+    ]
+    assert _exact(reference) == _exact(expected)
+
+
+def test_batch_recommendations_match_baseline(engine):
+    health = list(engine.batch_health_insurance_recommendations(
+        [request for request, _ in BASELINE_HEALTH if "limit" not in request]
+    ))
+    term = list(engine.batch_term_insurance_recommendations(
+        [request for request, _ in BASELINE_TERM if "limit" not in request]
+    ))
+    
+    expected_health = [expected for request, expected in BASELINE_HEALTH if "limit" not in request]
+    expected_term = [expected for request, expected in BASELINE_TERM if "limit" not in request]
+    for results, expected in zip(health + term, expected_health + expected_term):
+        assert [(r["policy_id"], r["match_score"]) for r in results] == [
+            (policy_id, round(score, 1)) for policy_id, score in expected
+        ]
+    assert len(health + term) == len(expected_health + expected_term)
@@ -0,0 +1,123 @@
+"""Semantic response cache: exact and near-duplicate hits, expiry, invalidation"""
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import content_ingestion, response_cache
+from app.services.response_cache import SemanticResponseCache, context_fingerprint
+
+
+FINGERPRINT = context_fingerprint(["Pre-existing diseases are covered after a waiting period."])
+
+
+def _rotated(base, cosine):
+    """A unit vector at the given cosine similarity to ``base`` (a unit vector)"""
+    base = np.asarray(base, dtype=np.float64)
+    orthogonal = np.zeros_like(base)
+    orthogonal[1] = 1.0
+    return list(cosine * base + np.sqrt(1 - cosine ** 2) * orthogonal)
+
+
+BASE = [1.0, 0.0, 0.0]
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = SemanticResponseCache()
+    cache.put("What is a PED?", FINGERPRINT, "A pre-existing disease.")
+    
+    assert cache.get("what is a ped", FINGERPRINT) == "A pre-existing disease."
+    assert cache.get("what is a ped", context_fingerprint(["other context"])) is None
+    assert cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.parametrize("cosine, hit", [(1.0, True), (0.96, True), (0.951, True), (0.949, False), (0.5, False)])
+def test_semantic_hit_threshold(cosine, hit):
+    cache = SemanticResponseCache(similarity_threshold=0.95)
+    cache.put("What is a PED?", FINGERPRINT, "A pre-existing disease.", embedding=BASE)
+    
+    response = cache.get("Explain pre-existing diseases", FINGERPRINT, embedding=_rotated(BASE, cosine))
+    
+    assert (response == "A pre-existing disease.") is hit
+    assert cache.get_stats()["semantic_hits"] == int(hit)
+
+
+def test_semantic_hit_needs_the_same_context():
+    cache = SemanticResponseCache(similarity_threshold=0.95)
+    cache.put("What is a PED?", FINGERPRINT, "A pre-existing disease.", embedding=BASE)
+    
+    assert cache.get("Explain PEDs", context_fingerprint(["newer content"]), embedding=BASE) is None
+
+
+def test_entries_expire_after_ttl():
+    cache = SemanticResponseCache(ttl_seconds=0.05)
+    cache.put("What is a PED?", FINGERPRINT, "A pre-existing disease.", embedding=BASE)
+    
+    assert cache.get("What is a PED?", FINGERPRINT) is not None
+    time.sleep(0.1)
+    
+    assert cache.get("What is a PED?", FINGERPRINT) is None
+    assert cache.get("Explain PEDs", FINGERPRINT, embedding=BASE) is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticResponseCache(max_entries=2)
+    cache.put("q1", FINGERPRINT, "a1")
+    cache.put("q2", FINGERPRINT, "a2")
+    cache.get("q1", FINGERPRINT)
+    cache.put("q3", FINGERPRINT, "a3")
+    
+    assert cache.get("q2", FINGERPRINT) is None
+    assert cache.get("q1", FINGERPRINT) == "a1"
+    assert cache.get("q3", FINGERPRINT) == "a3"
+
+
+def _ingest_result(status="success"):
+    return {
+        "status": status, "files_processed": 1, "chunks_created": 3, "files_unchanged": 0,
+        "files_removed": 0, "chunks_added": 3, "chunks_removed": 0, "files_failed": 0, "errors": []
+    }
+
+
+@pytest.fixture
+def cached_answer():
+    response_cache.clear()
+    response_cache.put("What is a PED?", FINGERPRINT, "A pre-existing disease.")
+    yield
+    response_cache.clear()
+
+
+def test_ingest_clears_the_cache(cached_answer, monkeypatch):
+    monkeypatch.setattr(content_ingestion, "ingest_content_library", _ingest_result)
+    
+    response = TestClient(app).post("/api/v1/content/ingest")
+    
+    assert response.status_code == 200
+    assert response_cache.get_stats()["size"] == 0
+
+
+def test_rejected_ingest_keeps_the_cache(cached_answer, monkeypatch):
+    monkeypatch.setattr(
+        content_ingestion, "ingest_content_library",
+        lambda: {"status": "busy", "message": "Ingestion already running"}
+    )
+    
+    response = TestClient(app).post("/api/v1/content/ingest")
+    
+    assert response.status_code == 409
+    assert response_cache.get_stats()["size"] == 1
+
+
+def test_content_clear_clears_the_cache(cached_answer, monkeypatch):
+    monkeypatch.setattr(
+        content_ingestion, "clear_content_library",
+        lambda: {"status": "success", "message": "Content cleared"}
+    )
+    
+    response = TestClient(app).delete("/api/v1/content/clear")
+    
+    assert response.status_code == 200
+    assert response_cache.get_stats()["size"] == 0
@@ -0,0 +1,114 @@
+"""Coalescing, heartbeats and disconnect handling of the chat SSE stream"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.sse import HEARTBEAT_FRAME, SSEStreamShaper
+from app.main import app
+from app.services.chatbot import ChatbotService
+from app.utils.fast_json import sse_content_frame
+
+
+class FakeRequest:
+    """Reports a disconnect once ``connected`` is cleared"""
+    
+    def __init__(self):
+        self.connected = True
+        self.checks = 0
+    
+    async def is_disconnected(self) -> bool:
+        self.checks += 1
+        return not self.connected
+
+
+async def _deltas(texts, delay=0.0, closed=None):
+    try:
+        for text in texts:
+            await asyncio.sleep(delay)
+            yield text
+    finally:
+        if closed is not None:
+            closed.set()
+
+
+def _content(frame: bytes) -> str:
+    return json.loads(frame.decode("utf-8").removeprefix("data: "))["content"]
+
+
+def _collect(shaper, source, request=None):
+    async def run():
+        return [frame async for frame in shaper.stream(source, request)]
+    return asyncio.run(run())
+
+
+def test_deltas_are_coalesced_after_the_first_frame():
+    shaper = SSEStreamShaper(flush_interval=0.05, max_chunk_bytes=1024)
+    texts = [f"tok{i} " for i in range(50)]
+    
+    frames = _collect(shaper, _deltas(texts))
+    
+    # The first delta goes out at once; the rest share a frame or two
+    assert frames[0] == sse_content_frame("tok0 ")
+    assert 2 <= len(frames) <= 3
+    assert "".join(_content(frame) for frame in frames) == "".join(texts)
+
+
+def test_large_deltas_flush_at_max_chunk_bytes():
+    shaper = SSEStreamShaper(flush_interval=10, max_chunk_bytes=10)
+    
+    frames = _collect(shaper, _deltas(["a" * 6] * 4))
+    
+    assert frames == [sse_content_frame("a" * 6), sse_content_frame("a" * 12), sse_content_frame("a" * 6)]
+
+
+def test_idle_stream_gets_heartbeats():
+    shaper = SSEStreamShaper(heartbeat_interval=0.02)
+    
+    frames = _collect(shaper, _deltas(["slow"], delay=0.1))
+    
+    assert frames[0] == HEARTBEAT_FRAME
+    assert frames[-1] == sse_content_frame("slow")
+
+
+def test_disconnect_stops_the_stream_and_closes_upstream():
+    shaper = SSEStreamShaper(flush_interval=0.01, heartbeat_interval=10)
+    request = FakeRequest()
+    
+    async def run():
+        closed = asyncio.Event()
+        frames = []
+        async for frame in shaper.stream(_deltas(["x"] * 1000, delay=0.005, closed=closed), request):
+            frames.append(frame)
+            request.connected = False
+        await asyncio.wait_for(closed.wait(), timeout=1)
+        return frames
+    
+    frames = asyncio.run(run())
+    
+    assert frames == [sse_content_frame("x")]
+    assert request.checks == 2
+
+
+def test_upstream_error_is_raised():
+    async def failing():
+        yield "partial"
+        raise RuntimeError("LLM stream failed")
+    
+    with pytest.raises(RuntimeError, match="LLM stream failed"):
+        _collect(SSEStreamShaper(), failing())
+
+
+def test_stream_endpoint_ends_with_done(db, monkeypatch):
+    async def chat_stream(self, user_message, session_id, conversation_history=None):
+        for text in ("Term ", "insurance ", "pays out."):
+            yield text
+    
+    monkeypatch.setattr(ChatbotService, "chat_stream", chat_stream)
+    response = TestClient(app).post("/api/v1/chat/stream", json={"message": "hi", "session_id": "s1"})
+    
+    frames = [f for f in response.content.split(b"\n\n") if f]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert frames[0] + b"\n\n" == sse_content_frame("Term ")
+    assert frames[-1] == b"data: [DONE]"
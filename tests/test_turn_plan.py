@@ -0,0 +1,126 @@
+"""Turn plans: immutability, reuse on retry and invalidation on content changes"""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import content_ingestion, conversation_memory, response_cache, turn_plans
+from app.services.chatbot import ChatbotService
+from app.services.turn_plan import TurnPlan, TurnPlanCache, history_key
+
+
+def _plan(user_message="What is a waiting period?"):
+    return TurnPlan.create(
+        user_message=user_message, intent={"insurance_type": None, "needs_recommendation": False},
+        context=["Waiting periods apply to pre-existing diseases."], query_embedding=[0.1, 0.2],
+        fingerprint="abc", recommendations=None, cacheable=True, cached_response=None,
+        messages=[{"role": "user", "content": user_message}], timings={"pre_llm": 12.5}
+    )
+
+
+HISTORY = history_key([])
+
+
+def test_plan_is_read_only():
+    plan = _plan()
+    
+    with pytest.raises(AttributeError):
+        plan.cached_response = "changed"
+    with pytest.raises(TypeError):
+        plan.intent["insurance_type"] = "health"
+    # Callers get copies they may mutate
+    messages = plan.message_list()
+    messages[0]["content"] = "changed"
+    assert plan.messages[0]["content"] == "What is a waiting period?"
+
+
+def test_plan_is_reused_only_for_the_same_turn():
+    cache = TurnPlanCache()
+    plan = _plan()
+    cache.put("s1", plan.user_message, HISTORY, plan)
+    
+    assert cache.get("s1", plan.user_message, HISTORY) is plan
+    assert cache.get("s1", "Something else", HISTORY) is None
+    assert cache.get("s1", plan.user_message, history_key([{"role": "user", "content": "hi"}])) is None
+    assert cache.get("s2", plan.user_message, HISTORY) is None
+    
+    cache.discard("s1")
+    assert cache.get("s1", plan.user_message, HISTORY) is None
+    assert (cache.get_stats()["hits"], cache.get_stats()["misses"]) == (1, 4)
+
+
+def test_plans_expire():
+    cache = TurnPlanCache(ttl_seconds=0.05)
+    plan = _plan()
+    cache.put("s1", plan.user_message, HISTORY, plan)
+    time.sleep(0.1)
+    
+    assert cache.get("s1", plan.user_message, HISTORY) is None
+    assert cache.get_stats()["size"] == 0
+
+
+def test_retried_turn_reuses_the_plan(db, monkeypatch):
+    retrievals = []
+    
+    async def fake_retrieval(self, query):
+        retrievals.append(query)
+        return ["Waiting periods apply to pre-existing diseases."], [0.1, 0.2]
+    
+    monkeypatch.setattr(ChatbotService, "_get_relevant_context_async", fake_retrieval)
+    turn_plans.clear()
+    chatbot = ChatbotService(db)
+    
+    async def scenario():
+        first = await chatbot._plan_turn("What is a waiting period?", "retry-session", [])
+        retried = await chatbot._plan_turn("What is a waiting period?", "retry-session", [])
+        # Once answered, the next turn is planned afresh
+        await chatbot._finish_turn(retried, "retry-session", "Usually 2-4 years.")
+        after = await chatbot._plan_turn("What is a waiting period?", "retry-session", [])
+        return first, retried, after
+    
+    try:
+        first, retried, after = asyncio.run(scenario())
+    finally:
+        turn_plans.clear()
+        response_cache.clear()
+        conversation_memory.forget("retry-session")
+    
+    assert retried.messages == first.messages
+    assert set(retried.timings) == {"pre_llm"}
+    assert after is not first
+    assert len(retrievals) == 2
+
+
+def _ingest_result():
+    return {
+        "status": "success", "files_processed": 1, "chunks_created": 3, "files_unchanged": 0,
+        "files_removed": 0, "chunks_added": 3, "chunks_removed": 0, "files_failed": 0, "errors": []
+    }
+
+
+@pytest.fixture
+def planned_turn():
+    turn_plans.clear()
+    plan = _plan()
+    turn_plans.put("s1", plan.user_message, HISTORY, plan)
+    yield plan
+    turn_plans.clear()
+
+
+def test_ingest_drops_plans(planned_turn, monkeypatch):
+    monkeypatch.setattr(content_ingestion, "ingest_content_library", _ingest_result)
+    
+    assert TestClient(app).post("/api/v1/content/ingest").status_code == 200
+    assert turn_plans.get("s1", planned_turn.user_message, HISTORY) is None
+
+
+def test_content_clear_drops_plans(planned_turn, monkeypatch):
+    monkeypatch.setattr(
+        content_ingestion, "clear_content_library",
+        lambda: {"status": "success", "message": "Content cleared"}
+    )
+    
+    assert TestClient(app).delete("/api/v1/content/clear").status_code == 200
+    assert turn_plans.get("s1", planned_turn.user_message, HISTORY) is None
@@ -0,0 +1,72 @@
+"""User details for recommendations come from the user's own messages"""
+import pytest
+
+from app.services.chatbot import ChatbotService
+from app.services.user_details import UserDetailExtractor
+
+
+# (message, details expected from that message alone)
+CORPUS = [
+    ("I am 32 years old", {"age": 32}),
+    ("age: 45, looking for health cover", {"age": 45}),
+    ("I'm 28 yrs old and a non-smoker", {"age": 28, "smoker": False}),
+    ("Need 5 lakh coverage", {"coverage_needed": 500000.0}),
+    ("need a 7.5 lakh floater", {"coverage_needed": 750000.0}),
+    ("10 lacs sum assured please", {"coverage_needed": 1000000.0}),
+    ("a 1 crore term plan", {"coverage_needed": 10000000.0}),
+    ("cover of 1.5 cr", {"coverage_needed": 15000000.0}),
+    ("my budget: ₹12,000", {"budget_monthly": 12000.0}),
+    ("budget rs. 1500 a month", {"budget_monthly": 1500.0}),
+    ("family of 4", {"family_size": 4}),
+    ("we are 3 members", {"family_size": 3}),
+    ("family 2, both 30 years old", {"family_size": 2, "age": 30}),
+    ("my income is 12 lakh per annum", {"annual_income": 1200000.0}),
+    ("income: 12 lakh per annum", {"annual_income": 1200000.0}),
+    ("salary 85000", {"annual_income": 85000.0}),
+    ("income ₹12,00,000", {"annual_income": 1200000.0}),
+    ("earn 1.2 crore", {"annual_income": 12000000.0}),
+    ("my salary is 50,000 per month", {"annual_income": 600000.0}),
+    ("monthly income 80000", {"annual_income": 960000.0}),
+    ("salary 1 lakh a month", {"annual_income": 1200000.0}),
+    ("I smoke occasionally", {"smoker": True}),
+    ("I chew tobacco", {"smoker": True}),
+    ("I don't smoke", {"smoker": False}),
+    ("non smoker, 40 years old", {"smoker": False, "age": 40}),
+    ("I was a smoker but quit", {"smoker": False}),
+    ("I quit smoking 3 years ago", {"smoker": False}),
+    ("ex-smoker, 45 years old", {"smoker": False, "age": 45}),
+    ("I quit my job last month", {}),
+    ("2 lovely kids and a dog", {}),  # not "2 l(akh)"
+    ("what is the coverage: 50 lakh?", {"coverage_needed": 5000000.0}),  # not "age 50"
+    ("need 50 lakh cover, salary 18 lakh", {"coverage_needed": 5000000.0, "annual_income": 1800000.0}),
+    ("What is a waiting period?", {}),
+]
+
+
+@pytest.mark.parametrize("message, expected", CORPUS)
+def test_parse_corpus(message, expected):
+    assert UserDetailExtractor().parse(message) == expected
+
+
+def test_later_user_messages_override_earlier_ones():
+    details = UserDetailExtractor().extract([
+        "I am 30 years old, need 5 lakh cover",
+        "Actually I am 32 years old",
+    ])
+    
+    assert details["age"] == 32
+    assert details["coverage_needed"] == 500000
+
+
+def test_client_history_ignores_assistant_replies():
+    chatbot = ChatbotService(db=None)
+    history = [
+        {"role": "user", "content": "I am 30 years old, need 5 lakh cover"},
+        {"role": "assistant", "content": "A 45 years old person typically needs 20 lakh cover"},
+    ]
+    
+    details = chatbot._extract_user_details("ok recommend health plan", history)
+    
+    assert details["age"] == 30
+    assert details["coverage_needed"] == 500000
+    assert details["family_size"] == 1